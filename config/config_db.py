@@ -17,6 +17,13 @@ DB_CONFIG = {
     'raise_on_warnings': False
 }
 
+# Pool de conexões (src/database/connection.py)
+DB_POOL = {
+    'tamanho': 8,              # conexões abertas no máximo
+    'verificar_apos_s': 30,    # ping em conexões ociosas há mais tempo que isso
+    'timeout_s': 60            # espera máxima por uma conexão livre
+}
+
 try:
     from config.config_db_local import DB_CONFIG_LOCAL
     DB_CONFIG.update(DB_CONFIG_LOCAL)
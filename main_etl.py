@@ -1,58 +1,303 @@
 """
 Script principal para execução do processo ETL CNAE
-Uso: python main_etl.py [--mode full|download|process]
+Uso: python main_etl.py [--mode full|download|process] [--memory-limit-mb MB] [--workers N] [--download-workers N] [--from-zip] [--csv] [--engine pandas|duckdb] [--incremental] [--dataset [uf|uf-situacao]] [--no-cluster] [--no-cnae-bridge] [--duckdb-db] [--cubes] [--search-index] [--ownership-graph]
+                         [--metrics-json ARQ] [--metrics-prom ARQ] [--profile ETAPA] [--profile-mode cprofile|amostragem]
+                         [--serial] [--cpu-slots N] [--io-slots N] [--force] [--resume] [--no-benchmark]
 """
 
 import sys
-import os
+from functools import partial
 from pathlib import Path
 
+import pyarrow.parquet as pq
+
 sys.path.append(str(Path(__file__).resolve().parent))
 
+from src.services import getEmpresas, getEstabelecimentos, getSocios
 from src.services.getEmpresas import baixar_empresas
 from src.services.getEstabelecimentos import baixar_estabelecimentos  
 from src.services.getSocios import baixar_socios
 from src.processors.empresasConstructor import empresasConstructor
 from src.processors.estabelecimentoConstructor import estabelecimentoConstructor
 from src.processors.sociosConstructor import sociosConstructor
+from src.processors.incremental import esta_atualizado, gerar_delta, release_disponivel
+from src.processors.dataset import (BANCO_DUCKDB, clusterizar_parquet, criar_banco_duckdb, diretorio_dataset,
+                                    esta_clusterizado, escrever_dataset, parquet_final)
+from src.processors.checkpoint import consolidacao_retomavel
+from src.processors.fontes import ENTRADAS, zips_do_release
+from src.processors.agendador import Agendador, saidas_atualizadas
+from src.processors.cubos import cubos_atualizados, gerar_cubos
+from src.processors.ponte_cnae import gerar_ponte_cnae, ponte_atualizada
+from src.processors.indice_busca import construir_indice_busca, indice_busca_atualizado
+from src.processors.grafo_societario import construir_grafo, grafo_atualizado
+from src.processors.referencia import compilar_referencia, referencia_atualizada
+from src.processors import metricas
+from src.processors.metricas import etapa
+from src.processors.streaming import definir_limite_processo
+
+CONSTRUCTORS = {
+    "empresas": empresasConstructor,
+    "estabelecimentos": estabelecimentoConstructor,
+    "socios": sociosConstructor
+}
+
+# Download, extração e consolidação em CSV de cada entidade
+OBTENCAO = {
+    "empresas": (getEmpresas.baixar_arquivos_empresas, getEmpresas.extrair_e_limpar,
+                 getEmpresas.processar_empresas),
+    "estabelecimentos": (getEstabelecimentos.baixar_arquivos_estabelecimentos, getEstabelecimentos.extrair_e_limpar,
+                         getEstabelecimentos.consolidar_estabelecimentos),
+    "socios": (getSocios.baixar_arquivos_socios, getSocios.extrair_e_limpar_socios, getSocios.processar_socios)
+}
+
+def processar_entidade(entidade, opcoes, incremental=False, clusterizar=True, ponte_cnae=True):
+    """Executa o constructor da entidade e ordena o Parquet por cnpj_basico
+
+    No modo incremental pula entidades já no release e gera o delta do release.
+    Estabelecimentos geram também a ponte estabelecimento × CNAE.
+    """
+    if incremental:
+        release = release_disponivel(entidade)
+        if esta_atualizado(entidade, release):
+            print(f"⏭️  {entidade}: snapshot já corresponde ao release {release}")
+            return None
+    
+    with etapa(f"processamento_{entidade}", engine=opcoes['engine']) as registro:
+        total = CONSTRUCTORS[entidade](**opcoes)
+        registro["linhas"] = total
+    if total is not None and clusterizar:
+        with etapa(f"clusterizacao_{entidade}") as registro:
+            registro["linhas"] = clusterizar_parquet(entidade, limite_memoria_mb=opcoes['limite_memoria_mb'])
+    if total is not None and ponte_cnae and entidade == "estabelecimentos":
+        with etapa("ponte_cnae") as registro:
+            registro["linhas"] = gerar_ponte_cnae(limite_memoria_mb=opcoes['limite_memoria_mb'])
+    if total is not None and incremental:
+        with etapa(f"delta_{entidade}"):
+            gerar_delta(entidade, release, limite_memoria_mb=opcoes['limite_memoria_mb'])
+    return total
+
+def _parquet_legivel(caminho):
+    try:
+        pq.read_metadata(caminho)
+        return True
+    except Exception:
+        return False
+
+def _processamento_atualizado(entidade, opcoes, incremental):
+    """Saídas da entidade mais novas que as entradas (ou snapshot já no release, se incremental)"""
+    if incremental:
+        return esta_atualizado(entidade, release_disponivel(entidade))
+    csv_final, prefixo, _ = ENTRADAS[entidade]
+    if opcoes['origem'] == 'zip':
+        entradas = zips_do_release(Path("Data"), prefixo)
+    else:
+        entradas = [Path("Data") / csv_final]
+    saidas = [parquet_final(entidade)]
+    if opcoes['csv']:
+        saidas.append(saidas[0].with_suffix('.csv'))
+    # Um Parquet interrompido no meio da escrita não tem rodapé e não conta como atualizado
+    return saidas_atualizadas(entradas, saidas) and _parquet_legivel(saidas[0])
+
+def _processar(entidade, opcoes):
+    total = CONSTRUCTORS[entidade](**opcoes)
+    if total is None:
+        raise RuntimeError(f"{entidade}: nenhum registro processado")
+    return total
+
+def _dataset_atualizado(dataset):
+    diretorio = diretorio_dataset("estabelecimentos")
+    por_situacao = any(diretorio.glob("uf=*/situacao_cadastral=*"))
+    return (por_situacao == (dataset == 'uf-situacao') and
+            saidas_atualizadas([parquet_final("estabelecimentos")], [diretorio]))
+
+def _banco_atualizado():
+    parquets = [parquet_final(entidade) for entidade in CONSTRUCTORS if parquet_final(entidade).exists()]
+    return saidas_atualizadas(parquets, [BANCO_DUCKDB])
+
+def montar_grafo(agendador, opcoes, baixar=True, download_workers=4, incremental=False,
+                 dataset=None, clusterizar=True, duckdb_db=False, cubos=False, ponte_cnae=True,
+                 indice_busca=False, grafo_societario=False, validar=False, consultas=False):
+    """Registra no agendador as tarefas da ETL, por entidade, com suas dependências
+
+    Cada entidade segue download → [extração → consolidação] → processamento →
+    clusterização → delta, com o processamento esperando também a compilação
+    das tabelas auxiliares (database/referencia/); as cadeias são independentes entre si, e as etapas
+    finais (ponte de CNAEs, validação, dataset, banco DuckDB, cubos, índice de
+    busca, grafo societário) esperam as entidades de que leem.
+    """
+    limite = opcoes['limite_memoria_mb']
+    finais = {}
+    referencia = agendador.adicionar("referencia", compilar_referencia, atualizada=referencia_atualizada)
+    for entidade in CONSTRUCTORS:
+        anteriores = []
+        if baixar:
+            baixar_arquivos, extrair, consolidar = OBTENCAO[entidade]
+            # Na retomada de uma consolidação interrompida os CSVs extraídos já estão em Data/
+            retomavel = None
+            if opcoes['origem'] == 'csv' and opcoes['retomar']:
+                retomavel = partial(consolidacao_retomavel, Path("Data") / ENTRADAS[entidade][0])
+            anteriores = [agendador.adicionar(f"download_{entidade}", partial(baixar_arquivos, workers=download_workers),
+                                              recurso="io", atualizada=retomavel)]
+            if opcoes['origem'] == 'csv':
+                anteriores = [agendador.adicionar(f"extracao_{entidade}", partial(extrair, Path("Data")),
+                                                  anteriores, recurso="io", atualizada=retomavel)]
+                anteriores = [agendador.adicionar(f"consolidacao_{entidade}", partial(consolidar, opcoes['retomar']),
+                                                  anteriores,
+                                                  memoria_mb=limite or 0)]
+
+        ultima = agendador.adicionar(f"processamento_{entidade}", partial(_processar, entidade, opcoes),
+                                     anteriores + [referencia], memoria_mb=limite or 0,
+                                     atualizada=partial(_processamento_atualizado, entidade, opcoes, incremental))
+        if clusterizar:
+            ultima = agendador.adicionar(f"clusterizacao_{entidade}",
+                                         partial(clusterizar_parquet, entidade, limite_memoria_mb=limite),
+                                         [ultima], memoria_mb=limite or 0,
+                                         atualizada=partial(esta_clusterizado, parquet_final(entidade)))
+        if incremental:
+            ultima = agendador.adicionar(
+                f"delta_{entidade}",
+                lambda entidade=entidade: gerar_delta(entidade, release_disponivel(entidade), limite_memoria_mb=limite),
+                [ultima], memoria_mb=limite or 0,
+                atualizada=lambda entidade=entidade: esta_atualizado(entidade, release_disponivel(entidade)))
+        finais[entidade] = ultima
 
-def run_full_etl():
+    if ponte_cnae:
+        agendador.adicionar("ponte_cnae", partial(gerar_ponte_cnae, limite_memoria_mb=limite),
+                            [finais["estabelecimentos"]], memoria_mb=limite or 0, atualizada=ponte_atualizada)
+    if validar:
+        from optimize_data import validate_parquet_files, benchmark_queries
+        validacao = agendador.adicionar("validacao", validate_parquet_files, list(finais.values()))
+        if consultas:
+            agendador.adicionar("consultas", benchmark_queries, [validacao])
+    if dataset:
+        agendador.adicionar("dataset",
+                            partial(escrever_dataset, "estabelecimentos", por_situacao=dataset == 'uf-situacao',
+                                    limite_memoria_mb=limite),
+                            [finais["estabelecimentos"]], memoria_mb=limite or 0,
+                            atualizada=partial(_dataset_atualizado, dataset))
+    if duckdb_db:
+        agendador.adicionar("banco_duckdb", partial(criar_banco_duckdb, limite_memoria_mb=limite),
+                            list(finais.values()), memoria_mb=limite or 0, atualizada=_banco_atualizado)
+    if cubos:
+        agendador.adicionar("cubos", partial(gerar_cubos, limite_memoria_mb=limite),
+                            [finais["empresas"], finais["estabelecimentos"]], memoria_mb=limite or 0,
+                            atualizada=cubos_atualizados)
+    if indice_busca:
+        agendador.adicionar("indice_busca", partial(construir_indice_busca, limite_memoria_mb=limite),
+                            [finais["empresas"], finais["estabelecimentos"]], memoria_mb=limite or 0,
+                            atualizada=indice_busca_atualizado)
+    if grafo_societario:
+        agendador.adicionar("grafo_societario", partial(construir_grafo, limite_memoria_mb=limite),
+                            [finais["socios"]], memoria_mb=limite or 0, atualizada=grafo_atualizado)
+    return agendador
+
+def executar_grafo(limite_memoria_mb=None, workers=1, cpu_slots=1, io_slots=2, forcar=False, **kwargs):
+    """Monta e executa o DAG da ETL; retorna True se todas as tarefas terminaram
+
+    O teto de memória é repartido entre as vagas de CPU: cada tarefa de
+    processamento recebe sua fração como limite_memoria_mb para dimensionar
+    chunks e o DuckDB. Como as tarefas são threads do mesmo processo, o RSS é
+    conferido contra o teto inteiro, não contra a fração.
+    """
+    origem = kwargs.pop('origem')
+    opcoes = dict(limite_memoria_mb=limite_memoria_mb / cpu_slots if limite_memoria_mb else None,
+                  workers=workers, origem=origem, csv=kwargs.pop('csv'), engine=kwargs.pop('engine'),
+                  retomar=kwargs.pop('retomar'))
+    agendador = Agendador(cpu=cpu_slots, io=io_slots, memoria_mb=limite_memoria_mb, forcar=forcar)
+    montar_grafo(agendador, opcoes, **kwargs)
+    definir_limite_processo(limite_memoria_mb)
+    try:
+        ok = agendador.executar()
+    finally:
+        definir_limite_processo(None)
+    if not ok:
+        falhas = [nome for nome, status in agendador.resumo().items() if status in ("erro", "cancelada")]
+        print(f"⚠️  Tarefas não concluídas: {', '.join(falhas)}")
+    return ok
+
+def gerar_layouts(dataset=None, duckdb_db=False, limite_memoria_mb=None, cubos=False, indice_busca=False,
+                  grafo_societario=False):
+    """Grava o dataset particionado, o banco DuckDB, os cubos, o índice de busca e/ou o grafo societário
+    a partir dos Parquets finais"""
+    if dataset:
+        with etapa("dataset"):
+            escrever_dataset("estabelecimentos", por_situacao=dataset == 'uf-situacao',
+                             limite_memoria_mb=limite_memoria_mb)
+    if duckdb_db:
+        with etapa("banco_duckdb"):
+            criar_banco_duckdb(limite_memoria_mb=limite_memoria_mb)
+    if cubos:
+        with etapa("cubos"):
+            gerar_cubos(limite_memoria_mb=limite_memoria_mb)
+    if indice_busca:
+        with etapa("indice_busca") as registro:
+            registro["linhas"] = construir_indice_busca(limite_memoria_mb=limite_memoria_mb)
+    if grafo_societario:
+        with etapa("grafo_societario") as registro:
+            registro["linhas"] = construir_grafo(limite_memoria_mb=limite_memoria_mb)
+
+def validar_saidas(consultas=True):
+    """Valida os Parquets finais e, com consultas, mede as consultas de referência sobre eles"""
+    from optimize_data import validate_parquet_files, benchmark_queries
+    with etapa("validacao"):
+        validate_parquet_files()
+    if consultas:
+        with etapa("consultas"):
+            benchmark_queries()
+
+def run_full_etl(limite_memoria_mb=None, workers=1, download_workers=4, from_zip=False,
+                 csv=False, engine='pandas', incremental=False, dataset=None, clusterizar=True,
+                 duckdb_db=False, serial=False, cpu_slots=1, io_slots=2, forcar=False, retomar=False,
+                 cubos=False, ponte_cnae=True, indice_busca=False, grafo_societario=False, consultas=True):
     """Executa o processo ETL completo"""
     print("🚀 Iniciando processo ETL completo para dados CNAE...")
+    opcoes = dict(limite_memoria_mb=limite_memoria_mb, workers=workers,
+                  origem='zip' if from_zip else 'csv', csv=csv, engine=engine, retomar=retomar)
+    
+    if not serial:
+        ok = executar_grafo(cpu_slots=cpu_slots, io_slots=io_slots, forcar=forcar, baixar=True,
+                            download_workers=download_workers, incremental=incremental, dataset=dataset,
+                            clusterizar=clusterizar, duckdb_db=duckdb_db, cubos=cubos, ponte_cnae=ponte_cnae,
+                            indice_busca=indice_busca, grafo_societario=grafo_societario, validar=True,
+                            consultas=consultas, **opcoes)
+        if ok:
+            print("\n🎉 Processo ETL concluído com sucesso!")
+            print("📁 Arquivos Parquet otimizados em: ./database/")
+        return ok
     
     try:
         print("\n📥 FASE 1: Download e Extração de Dados")
         print("=" * 50)
         
         print("📊 Baixando dados de Empresas...")
-        baixar_empresas()
+        baixar_empresas(download_workers, extrair=not from_zip, retomar=retomar)
         
         print("🏢 Baixando dados de Estabelecimentos...")
-        baixar_estabelecimentos()
+        baixar_estabelecimentos(download_workers, extrair=not from_zip, retomar=retomar)
         
         print("👥 Baixando dados de Sócios...")
-        baixar_socios()
+        baixar_socios(download_workers, extrair=not from_zip, retomar=retomar)
         
         print("\n⚙️  FASE 2: Processamento e Enriquecimento")
         print("=" * 50)
         
         print("📊 Processando dados de Empresas...")
-        empresasConstructor()
+        processar_entidade("empresas", opcoes, incremental, clusterizar)
         
         print("🏢 Processando dados de Estabelecimentos...")
-        estabelecimentoConstructor()
+        processar_entidade("estabelecimentos", opcoes, incremental, clusterizar, ponte_cnae)
         
         print("👥 Processando dados de Sócios...")
-        sociosConstructor()
+        processar_entidade("socios", opcoes, incremental, clusterizar)
         
-        print("\n🚀 FASE 3: Otimização - Convertendo para Parquet")
+        print("\n🚀 FASE 3: Validação dos arquivos Parquet")
         print("=" * 50)
-        from optimize_data import convert_to_parquet, benchmark_queries
-        convert_to_parquet()
-        benchmark_queries()
+        validar_saidas(consultas)
+        gerar_layouts(dataset, duckdb_db, limite_memoria_mb, cubos, indice_busca, grafo_societario)
         
         print("\n🎉 Processo ETL concluído com sucesso!")
-        print("📁 Arquivos CSV disponíveis em: ./database/")
+        if csv:
+            print("📁 Arquivos CSV disponíveis em: ./database/")
         print("📁 Arquivos Parquet otimizados em: ./database/")
             
     except Exception as e:
@@ -63,19 +308,56 @@ def run_full_etl():
     
     return True
 
-def run_download_only():
+def run_download_only(download_workers=4, from_zip=False, retomar=False):
     """Executa apenas o download dos dados"""
     print("📥 Executando apenas download de dados...")
-    baixar_empresas()
-    baixar_estabelecimentos() 
-    baixar_socios()
+    baixar_empresas(download_workers, extrair=not from_zip, retomar=retomar)
+    baixar_estabelecimentos(download_workers, extrair=not from_zip, retomar=retomar) 
+    baixar_socios(download_workers, extrair=not from_zip, retomar=retomar)
 
-def run_processing_only():
+def run_processing_only(limite_memoria_mb=None, workers=1, from_zip=False, csv=False, engine='pandas',
+                        incremental=False, dataset=None, clusterizar=True, duckdb_db=False,
+                        serial=False, cpu_slots=1, io_slots=2, forcar=False, retomar=False, cubos=False,
+                        ponte_cnae=True, indice_busca=False, grafo_societario=False, consultas=True):
     """Executa apenas o processamento dos dados"""
     print("⚙️ Executando apenas processamento de dados...")
-    empresasConstructor()
-    estabelecimentoConstructor()
-    sociosConstructor()
+    opcoes = dict(limite_memoria_mb=limite_memoria_mb, workers=workers,
+                  origem='zip' if from_zip else 'csv', csv=csv, engine=engine, retomar=retomar)
+    if not serial:
+        return executar_grafo(cpu_slots=cpu_slots, io_slots=io_slots, forcar=forcar, baixar=False,
+                              incremental=incremental, dataset=dataset, clusterizar=clusterizar,
+                              duckdb_db=duckdb_db, cubos=cubos, ponte_cnae=ponte_cnae,
+                              indice_busca=indice_busca, grafo_societario=grafo_societario, validar=True,
+                              consultas=consultas, **opcoes)
+    for entidade in CONSTRUCTORS:
+        processar_entidade(entidade, opcoes, incremental, clusterizar, ponte_cnae)
+    validar_saidas(consultas)
+    gerar_layouts(dataset, duckdb_db, limite_memoria_mb, cubos, indice_busca, grafo_societario)
+    return True
+
+def executar_modo(args):
+    """Executa o modo escolhido na linha de comando; retorna True se terminou sem falhas"""
+    if args.mode == 'full':
+        return run_full_etl(limite_memoria_mb=args.memory_limit_mb, workers=args.workers,
+                     download_workers=args.download_workers, from_zip=args.from_zip,
+                     csv=args.csv, engine=args.engine, incremental=args.incremental,
+                     dataset=args.dataset, clusterizar=not args.no_cluster, duckdb_db=args.duckdb_db,
+                     serial=args.serial, cpu_slots=args.cpu_slots, io_slots=args.io_slots, forcar=args.force,
+                     retomar=args.resume, cubos=args.cubes, ponte_cnae=not args.no_cnae_bridge,
+                     indice_busca=args.search_index, grafo_societario=args.ownership_graph,
+                     consultas=not args.no_benchmark)
+    elif args.mode == 'download':
+        run_download_only(download_workers=args.download_workers, from_zip=args.from_zip, retomar=args.resume)
+        return True
+    elif args.mode == 'process':
+        return run_processing_only(limite_memoria_mb=args.memory_limit_mb, workers=args.workers,
+                            from_zip=args.from_zip, csv=args.csv, engine=args.engine,
+                            incremental=args.incremental, dataset=args.dataset,
+                            clusterizar=not args.no_cluster, duckdb_db=args.duckdb_db,
+                            serial=args.serial, cpu_slots=args.cpu_slots, io_slots=args.io_slots,
+                            forcar=args.force, retomar=args.resume, cubos=args.cubes,
+                            ponte_cnae=not args.no_cnae_bridge, indice_busca=args.search_index,
+                            grafo_societario=args.ownership_graph, consultas=not args.no_benchmark)
 
 if __name__ == "__main__":
     import argparse
@@ -83,12 +365,69 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Sistema ETL para dados CNAE')
     parser.add_argument('--mode', choices=['full', 'download', 'process'], 
                        default='full', help='Modo de execução')
+    parser.add_argument('--memory-limit-mb', type=int, default=None,
+                       help='Teto de memória (MB) respeitado pelo processamento em chunks')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Número de processos para o enriquecimento paralelo')
+    parser.add_argument('--download-workers', type=int, default=4,
+                       help='Número de downloads simultâneos')
+    parser.add_argument('--from-zip', action='store_true',
+                       help='Lê os dados direto dos zips, sem extrair CSVs intermediários')
+    parser.add_argument('--csv', action='store_true',
+                       help='Gera também os CSVs finais, além do Parquet')
+    parser.add_argument('--engine', choices=['pandas', 'duckdb'], default='pandas',
+                       help='Engine de enriquecimento')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Pula entidades já no release atual e gera deltas em database/incremental/')
+    parser.add_argument('--dataset', nargs='?', const='uf', choices=['uf', 'uf-situacao'], default=None,
+                       help='Grava estabelecimentos particionado (Hive) em database/dataset/')
+    parser.add_argument('--no-cluster', action='store_true',
+                       help='Não reordena os Parquets finais por cnpj_basico')
+    parser.add_argument('--no-cnae-bridge', action='store_true',
+                       help='Não gera a ponte estabelecimento × CNAE nem o índice invertido de CNAEs')
+    parser.add_argument('--duckdb-db', action='store_true',
+                       help='Cria database/cnae.duckdb com índices em cnpj_basico')
+    parser.add_argument('--cubes', action='store_true',
+                       help='Gera cubos pré-agregados em database/cubos/')
+    parser.add_argument('--search-index', action='store_true',
+                       help='Gera o índice de busca por razão social e nome fantasia em database/indice_busca/')
+    parser.add_argument('--ownership-graph', action='store_true',
+                       help='Gera o grafo de participações entre empresas (sócios PJ) em database/grafo_societario/')
+    parser.add_argument('--metrics-json', default=None,
+                       help='Grava tempo, linhas/s, bytes e pico de memória de cada etapa em JSON')
+    parser.add_argument('--metrics-prom', default=None,
+                       help='Grava as mesmas métricas no formato textfile do Prometheus')
+    parser.add_argument('--profile', default=None, metavar='ETAPA',
+                       help='Perfila uma etapa (ex.: processamento_estabelecimentos) em database/perfis/')
+    parser.add_argument('--profile-mode', choices=['cprofile', 'amostragem'], default='cprofile',
+                       help='cProfile determinístico ou amostragem de pilhas (flame graph)')
+    parser.add_argument('--serial', action='store_true',
+                       help='Executa as fases em sequência, sem o agendador de tarefas')
+    parser.add_argument('--cpu-slots', type=int, default=1,
+                       help='Tarefas de processamento simultâneas no agendador')
+    parser.add_argument('--io-slots', type=int, default=2,
+                       help='Downloads/extrações simultâneos no agendador')
+    parser.add_argument('--force', action='store_true',
+                       help='Reexecuta tarefas mesmo com saídas já atualizadas')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continua processamento e consolidação do último checkpoint de uma execução interrompida')
+    parser.add_argument('--no-benchmark', action='store_true',
+                       help='Não mede as consultas de referência sobre os Parquets ao final')
     
     args = parser.parse_args()
+    if args.profile:
+        metricas.configurar_perfil(args.profile, args.profile_mode)
     
-    if args.mode == 'full':
-        run_full_etl()
-    elif args.mode == 'download':
-        run_download_only()
-    elif args.mode == 'process':
-        run_processing_only()
+    ok = False
+    try:
+        ok = executar_modo(args)
+    finally:
+        metricas.exibir_resumo()
+        if args.metrics_json:
+            metricas.gravar_json(args.metrics_json)
+            print(f"📈 Métricas gravadas em {args.metrics_json}")
+        if args.metrics_prom:
+            metricas.gravar_prometheus(args.metrics_prom)
+            print(f"📈 Métricas Prometheus gravadas em {args.metrics_prom}")
+    if not ok:
+        sys.exit(1)
@@ -8,9 +8,18 @@ import pandas as pd
 import time
 from pathlib import Path
 import os
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from src.processors.dataset import escrever_dataset
+from src.queries.benchmark import conectar_parquets, exibir_consultas, medir_consultas
 
 def convert_to_parquet():
-    """Converte CSVs finais para Parquet para consultas eficientes"""
+    """Converte CSVs finais para Parquet para consultas eficientes
+
+    Os constructors já gravam Parquet diretamente; esta conversão só é
+    necessária para CSVs gerados por execuções antigas.
+    """
     
     base_path = Path("database")
     
@@ -27,7 +36,9 @@ def convert_to_parquet():
         csv_path = base_path / csv_file
         parquet_path = base_path / parquet_file
         
-        if csv_path.exists():
+        if parquet_path.exists() and csv_path.exists() and parquet_path.stat().st_mtime >= csv_path.stat().st_mtime:
+            print(f"   ⏭️  {parquet_file} já está atualizado")
+        elif csv_path.exists():
             print(f"🔄 Convertendo {csv_file} → {parquet_file}...")
             
             try:
@@ -86,58 +97,44 @@ def convert_to_parquet():
         total_compression = (1 - total_parquet_size/total_csv_size) * 100
         print(f"\n📊 Total: {total_csv_size:.1f}MB → {total_parquet_size:.1f}MB (economia: {total_compression:.1f}%)")
 
-def benchmark_queries():
-    """Compara performance entre CSV e Parquet"""
+def benchmark_queries(repeticoes=5):
+    """Mede o conjunto representativo de consultas sobre os Parquets finais
+
+    Cada consulta roda uma vez para aquecimento e depois `repeticoes` vezes.
+    A suíte completa, com todas as etapas do pipeline, fica em
+    scripts/benchmark_pipeline.py.
+    """
     
-    print("\n🏃 Executando benchmark de performance...")
+    print(f"\n🏃 Executando benchmark de consultas ({repeticoes} repetições)...")
     
-    # Testes de performance
-    tests = [
-        {
-            'name': 'Contagem simples',
-            'query_csv': "SELECT COUNT(*) FROM read_csv_auto('database/empresas_final.csv', sep=';')",
-            'query_parquet': "SELECT COUNT(*) FROM 'database/empresas_final.parquet'"
-        },
-        {
-            'name': 'Filtro por porte',
-            'query_csv': "SELECT COUNT(*) FROM read_csv_auto('database/empresas_final.csv', sep=';') WHERE porte_empresa = 'MICRO EMPRESA'",
-            'query_parquet': "SELECT COUNT(*) FROM 'database/empresas_final.parquet' WHERE porte_empresa = 'MICRO EMPRESA'"
-        }
-    ]
+    con = conectar_parquets()
+    try:
+        resultados = medir_consultas(con, repeticoes)
+    finally:
+        con.close()
     
-    for test in tests:
-        print(f"\n📊 Teste: {test['name']}")
-        
-        try:
-            # CSV
-            start = time.time()
-            result_csv = duckdb.sql(test['query_csv']).fetchone()[0]
-            csv_time = time.time() - start
-            
-            # Parquet
-            start = time.time()  
-            result_parquet = duckdb.sql(test['query_parquet']).fetchone()[0]
-            parquet_time = time.time() - start
-            
-            if csv_time > 0:
-                speedup = csv_time / parquet_time
-                print(f"   CSV: {csv_time:.2f}s (resultado: {result_csv:,})")
-                print(f"   Parquet: {parquet_time:.2f}s (resultado: {result_parquet:,})")
-                print(f"   🚀 Speedup: {speedup:.1f}x mais rápido")
-            
-        except Exception as e:
-            print(f"   ❌ Erro no benchmark: {e}")
+    exibir_consultas(resultados)
+    return resultados
 
 def create_optimized_queries_examples():
     """Cria exemplos de consultas otimizadas usando DuckDB + Parquet"""
     
     examples_path = Path("Tables/examples_optimized.py")
+    examples_path.parent.mkdir(exist_ok=True)
     
     example_code = '''"""
 Exemplos de consultas otimizadas usando DuckDB + Parquet
 Performance muito superior aos CSVs tradicionais
+
+As junções usam cnpj_basico, presente e tipado em todas as entidades, com os
+Parquets ordenados por essa chave. Se database/cnae.duckdb existir
+(python main_etl.py --duckdb-db), as consultas usam suas tabelas indexadas;
+senão, estabelecimentos lê o dataset particionado por UF (--dataset), se
+estiver atualizado, e os filtros por UF/situação descartam partições inteiras.
 """
 
+from pathlib import Path
+
 import duckdb
 import pandas as pd
 
@@ -145,8 +142,33 @@ import pandas as pd
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', None)
 
-def grupos_empresariais():
-    """Identifica grupos empresariais de forma otimizada"""
+BANCO = Path("database/cnae.duckdb")
+DATASET = Path("database/dataset")
+
+def fonte(entidade):
+    """Dataset particionado da entidade, se mais novo que o Parquet final; senão o Parquet final"""
+    final = Path(f"database/{entidade}_final.parquet")
+    particoes = DATASET / entidade
+    if particoes.exists() and particoes.stat().st_mtime >= final.stat().st_mtime:
+        return (f"read_parquet('{particoes.as_posix()}/**/*.parquet', "
+                f"hive_partitioning = true, hive_types_autocast = false)")
+    return f"read_parquet('{final.as_posix()}')"
+
+def conectar():
+    """Conexão com as tabelas empresas, estabelecimentos e socios"""
+    if BANCO.exists():
+        return duckdb.connect(str(BANCO), read_only=True)
+    con = duckdb.connect()
+    for entidade in ("empresas", "estabelecimentos", "socios"):
+        con.execute(f"CREATE VIEW {entidade} AS SELECT * FROM {fonte(entidade)}")
+    return con
+
+def grupos_empresariais(con):
+    """Identifica grupos empresariais de forma otimizada
+    
+    Só participações diretas; para grupos em vários níveis e controladoras
+    finais use o grafo societário (main_etl.py --ownership-graph e src/queries/grafo.py).
+    """
     
     query = """
     SELECT 
@@ -155,74 +177,75 @@ def grupos_empresariais():
         COUNT(DISTINCT s.cnpj_basico) AS qtd_empresas_controladas,
         LISTAGG(DISTINCT e.razao_social, '; ') AS empresas_controladas,
         LISTAGG(DISTINCT s.cnpj_basico, '; ') AS cnpjs_controlados
-    FROM 'database/socios_final.parquet' s
-    JOIN 'database/empresas_final.parquet' e ON s.cnpj_basico = e.cnpj_basico
-    WHERE s.identificador_socio = 'PESSOA JURÍDICA'
+    FROM socios s
+    JOIN empresas e ON s.cnpj_basico = e.cnpj_basico
+    WHERE s.identificador_socio = 1  -- pessoa jurídica
     GROUP BY s.cnpj_cpf_socio, s.nome_socio
     HAVING COUNT(DISTINCT s.cnpj_basico) >= 2
     ORDER BY qtd_empresas_controladas DESC
     LIMIT 100
     """
     
-    result = duckdb.sql(query).df()
+    result = con.sql(query).df()
     print(f"🏢 Grupos empresariais encontrados: {len(result)}")
     return result
 
-def empresas_por_porte_e_uf():
+def empresas_por_porte_e_uf(con):
     """Análise por porte e localização usando joins otimizados"""
     
     query = """
     SELECT 
         est.uf,
-        emp.porte_empresa,
+        emp.descricao_porte AS porte_empresa,
         COUNT(*) as quantidade,
-        ROUND(AVG(CAST(REPLACE(emp.capital_social, ',', '.') AS DOUBLE)), 2) as capital_medio
-    FROM 'database/estabelecimentos_final.parquet' est
-    JOIN 'database/empresas_final.parquet' emp ON LEFT(est.CNPJ, 8) = emp.cnpj_basico
-    WHERE est.identificador_matriz = 'MATRIZ'
-      AND emp.porte_empresa != 'NÃO INFORMADO'
+        ROUND(AVG(emp.capital_social), 2) as capital_medio
+    FROM estabelecimentos est
+    JOIN empresas emp ON est.cnpj_basico = emp.cnpj_basico
+    WHERE est.identificador_matriz = 1  -- matriz
+      AND emp.porte_empresa != '00'     -- não informado
       AND emp.capital_social IS NOT NULL
-    GROUP BY est.uf, emp.porte_empresa
+    GROUP BY ALL
     ORDER BY est.uf, quantidade DESC
     """
     
-    result = duckdb.sql(query).df()
+    result = con.sql(query).df()
     print(f"📊 Distribuição por UF e porte: {len(result)} registros")
     return result
 
-def top_cnaes():
+def top_cnaes(con):
     """Top CNAEs por quantidade de empresas"""
     
     query = """
     SELECT 
         est.cnae_fiscal_principal,
         COUNT(*) as quantidade_empresas,
-        COUNT(DISTINCT LEFT(est.CNPJ, 8)) as quantidade_cnpjs_basicos
-    FROM 'database/estabelecimentos_final.parquet' est
+        COUNT(DISTINCT est.cnpj_basico) as quantidade_cnpjs_basicos
+    FROM estabelecimentos est
     WHERE est.cnae_fiscal_principal IS NOT NULL
-      AND est.situacao_cadastral = 'ATIVA'
+      AND est.situacao_cadastral = '02'  -- ativa
     GROUP BY est.cnae_fiscal_principal
     ORDER BY quantidade_empresas DESC
     LIMIT 50
     """
     
-    result = duckdb.sql(query).df()
+    result = con.sql(query).df()
     print(f"🎯 Top CNAEs: {len(result)} categorias")
     return result
 
 if __name__ == "__main__":
     print("🚀 Executando consultas otimizadas...")
+    con = conectar()
     
     print("\\n1️⃣ Grupos Empresariais:")
-    grupos = grupos_empresariais()
+    grupos = grupos_empresariais(con)
     print(grupos.head())
     
     print("\\n2️⃣ Empresas por Porte e UF:")
-    porte_uf = empresas_por_porte_e_uf()
+    porte_uf = empresas_por_porte_e_uf(con)
     print(porte_uf.head(10))
     
     print("\\n3️⃣ Top CNAEs:")
-    cnaes = top_cnaes()
+    cnaes = top_cnaes(con)
     print(cnaes.head(10))
 '''
     
@@ -256,6 +279,7 @@ def validate_parquet_files():
 if __name__ == "__main__":
     print("🚀 Iniciando otimização dos dados...")
     convert_to_parquet()
+    escrever_dataset("estabelecimentos")
     benchmark_queries()
     create_optimized_queries_examples()
     validate_parquet_files()
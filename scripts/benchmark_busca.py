@@ -0,0 +1,138 @@
+"""
+Benchmark do índice de busca por nome: tempo de construção e latência das consultas
+
+As buscas são montadas a partir de razões sociais e nomes fantasia sorteados:
+de um a três termos iniciais, com o último truncado em 2 ou mais letras (busca
+por prefixo, como em um campo de autocompletar). Para comparação, parte delas roda também como
+LIKE '%...%' sobre os Parquets finais.
+Uso: python scripts/benchmark_busca.py [--construir] [--consultas 1000] [--like 20] [--json ARQ]
+"""
+
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.processors.indice_busca import DIRETORIO_BUSCA, construir_indice_busca, normalizar_termos
+from src.processors.metricas import MonitorMemoria
+from src.queries.benchmark import conectar_parquets
+from src.queries.busca import IndiceBusca
+
+def percentil(valores, p):
+    """Percentil p (0-100) de uma lista ordenada"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+def estatisticas(latencias):
+    latencias = sorted(latencias)
+    ms = lambda segundos: round(segundos * 1000, 3)
+    return {
+        "consultas": len(latencias),
+        "p50_ms": ms(percentil(latencias, 50)),
+        "p90_ms": ms(percentil(latencias, 90)),
+        "p99_ms": ms(percentil(latencias, 99)),
+        "max_ms": ms(latencias[-1]) if latencias else 0.0
+    }
+
+def sortear_buscas(con, quantidade, semente):
+    """Buscas de 1 a 3 termos tiradas de nomes reais, com o último termo truncado"""
+    nomes = [linha[0] for linha in con.execute(f"""
+        SELECT razao_social FROM empresas USING SAMPLE {int(quantidade)} ROWS
+        UNION ALL
+        SELECT nome_fantasia FROM estabelecimentos WHERE nome_fantasia IS NOT NULL USING SAMPLE {int(quantidade)} ROWS
+    """).fetchall()]
+    rng = random.Random(semente)
+    rng.shuffle(nomes)
+    buscas = []
+    for nome in nomes:
+        termos = normalizar_termos(nome)
+        if not termos:
+            continue
+        termos = termos[:rng.randint(1, min(3, len(termos)))]
+        ultimo = termos[-1]
+        termos[-1] = ultimo[:rng.randint(min(2, len(ultimo)), len(ultimo))]
+        buscas.append(" ".join(termos))
+        if len(buscas) == quantidade:
+            break
+    return buscas
+
+def consultar_like(con, busca):
+    """Mesma busca com LIKE sobre os Parquets (sem acentos nem ranking)"""
+    termos = normalizar_termos(busca)
+    condicao = lambda coluna: " AND ".join(f"upper(strip_accents({coluna})) LIKE ?" for _ in termos)
+    padroes = [f"%{termo}%" for termo in termos]
+    return con.execute(f"""
+        SELECT cnpj_basico FROM empresas WHERE {condicao('razao_social')}
+        UNION
+        SELECT cnpj_basico FROM estabelecimentos WHERE {condicao('nome_fantasia')}
+    """, padroes * 2).fetchall()
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark do índice de busca por nome')
+    parser.add_argument('--construir', action='store_true', help='Reconstrói o índice e mede o tempo')
+    parser.add_argument('--consultas', type=int, default=1000, help='Buscas sorteadas')
+    parser.add_argument('--limite', type=int, default=20, help='Resultados por busca')
+    parser.add_argument('--like', type=int, default=20, help='Buscas repetidas com LIKE para comparação (0 desativa)')
+    parser.add_argument('--memory-limit-mb', type=int, default=None)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--json', default=None, help='Grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    resultado = {}
+    if args.construir or not (DIRETORIO_BUSCA / "indice.json").exists():
+        with MonitorMemoria() as monitor:
+            inicio = time.perf_counter()
+            postings = construir_indice_busca(limite_memoria_mb=args.memory_limit_mb)
+            segundos = time.perf_counter() - inicio
+        if postings is None:
+            sys.exit(1)
+        resultado["construcao"] = {"segundos": round(segundos, 2), "postings": postings,
+                                   "pico_rss_mb": round(monitor.pico_mb, 1)}
+        print(f"🏗️  Construção: {segundos:.1f}s, pico {monitor.pico_mb:.0f}MB")
+
+    indice = IndiceBusca()
+    resultado["indice"] = indice.resumo
+    con = conectar_parquets()
+    buscas = sortear_buscas(con, args.consultas, args.semente)
+
+    # Aquecimento: páginas do vocabulário e das postings mais usadas
+    for busca in buscas[:50]:
+        indice.buscar(busca, args.limite)
+
+    latencias, vazias, incompletas = [], 0, 0
+    for busca in buscas:
+        inicio = time.perf_counter()
+        encontrados = indice.buscar(busca, args.limite)
+        latencias.append(time.perf_counter() - inicio)
+        vazias += not encontrados
+        incompletas += not encontrados.completo
+    resultado["indice_consultas"] = {**estatisticas(latencias), "sem_resultado": vazias,
+                                     "prefixo_truncado": incompletas}
+    medida = resultado["indice_consultas"]
+    print(f"🔎 Índice: {medida['consultas']} buscas | p50 {medida['p50_ms']}ms | p90 {medida['p90_ms']}ms | "
+          f"p99 {medida['p99_ms']}ms | max {medida['max_ms']}ms | {incompletas} com prefixo truncado")
+
+    if args.like:
+        latencias = []
+        for busca in buscas[:args.like]:
+            inicio = time.perf_counter()
+            consultar_like(con, busca)
+            latencias.append(time.perf_counter() - inicio)
+        resultado["like_consultas"] = estatisticas(latencias)
+        medida = resultado["like_consultas"]
+        print(f"🐢 LIKE:   {medida['consultas']} buscas | p50 {medida['p50_ms']}ms | p99 {medida['p99_ms']}ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado gravado em {args.json}")
+    indice.fechar()
+    con.close()
+
+if __name__ == "__main__":
+    main()
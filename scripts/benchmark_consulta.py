@@ -0,0 +1,107 @@
+"""
+Benchmark de latência da consulta de CNPJ a uma taxa alvo (QPS)
+
+As requisições são disparadas em malha aberta: a i-ésima é agendada para
+inicio + i/qps e a latência é medida a partir do horário agendado, então
+filas formadas por lentidão do serviço aparecem no p99.
+Uso: python scripts/benchmark_consulta.py [--qps 200] [--duracao 30] [--threads 8] [--url http://127.0.0.1:8080]
+"""
+
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.processors.dataset import BANCO_DUCKDB
+from src.queries.consulta_cnpj import ConsultaCNPJ
+
+def percentil(valores, p):
+    """Percentil p (0-100) de uma lista ordenada"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+def consultar_http(url, cnpj):
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/cnpj/{cnpj}", timeout=30) as resposta:
+            resposta.read()
+    except urllib.error.HTTPError as e:
+        if e.code != 404:
+            raise
+
+def executar_benchmark(consultar, cnpjs, qps, duracao, threads):
+    """Dispara consultas a `qps` por `duracao` segundos; retorna as estatísticas"""
+    total = int(qps * duracao)
+    latencias, erros = [], 0
+
+    def tarefa(i, agendado):
+        atraso = agendado - time.perf_counter()
+        if atraso > 0:
+            time.sleep(atraso)
+        consultar(cnpjs[i % len(cnpjs)])
+        return time.perf_counter() - agendado
+
+    inicio = time.perf_counter() + 0.1
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futuros = [executor.submit(tarefa, i, inicio + i / qps) for i in range(total)]
+        for futuro in futuros:
+            try:
+                latencias.append(futuro.result())
+            except Exception:
+                erros += 1
+    decorrido = time.perf_counter() - inicio
+
+    latencias.sort()
+    ms = lambda segundos: round(segundos * 1000, 3)
+    return {
+        "qps_alvo": qps,
+        "qps_obtido": round(len(latencias) / decorrido, 1),
+        "consultas": len(latencias),
+        "erros": erros,
+        "p50_ms": ms(percentil(latencias, 50)),
+        "p90_ms": ms(percentil(latencias, 90)),
+        "p99_ms": ms(percentil(latencias, 99)),
+        "max_ms": ms(latencias[-1]) if latencias else 0.0
+    }
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark de latência da consulta de CNPJ')
+    parser.add_argument('--qps', type=float, default=200, help='Taxa alvo de consultas por segundo')
+    parser.add_argument('--duracao', type=float, default=30, help='Duração em segundos')
+    parser.add_argument('--threads', type=int, default=8, help='Consultas simultâneas')
+    parser.add_argument('--amostra', type=int, default=10000, help='Quantidade de CNPJs sorteados')
+    parser.add_argument('--url', default=None, help='Mede o servidor HTTP em vez da consulta em processo')
+    parser.add_argument('--banco', default=str(BANCO_DUCKDB))
+    parser.add_argument('--json', default=None, help='Grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    consulta = ConsultaCNPJ(args.banco)
+    cnpjs = consulta.amostra_cnpjs(args.amostra)
+    if args.url:
+        consultar = lambda cnpj: consultar_http(args.url, cnpj)
+    else:
+        consultar = consulta.consultar
+
+    # Aquecimento: cache de páginas e cursores de cada thread
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(consultar, cnpjs[:min(len(cnpjs), args.threads * 20)]))
+
+    print(f"🏃 {args.qps:g} consultas/s por {args.duracao:g}s ({args.threads} threads, "
+          f"{'HTTP ' + args.url if args.url else 'em processo'})...")
+    resultado = executar_benchmark(consultar, cnpjs, args.qps, args.duracao, args.threads)
+    print(f"📊 p50 {resultado['p50_ms']}ms | p90 {resultado['p90_ms']}ms | p99 {resultado['p99_ms']}ms | "
+          f"max {resultado['max_ms']}ms | {resultado['qps_obtido']} consultas/s | {resultado['erros']} erros")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2)
+    consulta.fechar()
+
+if __name__ == "__main__":
+    main()
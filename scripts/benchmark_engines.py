@@ -0,0 +1,88 @@
+"""
+Script para comparar as engines de enriquecimento (pandas x DuckDB)
+Executa as duas engines sobre as mesmas entradas em Data/ e compara tempo e registros
+Uso: python scripts/benchmark_engines.py [--origem csv|zip] [--entidades empresas ...]
+"""
+
+import sys
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.processors.fontes import fontes_entidade
+from src.processors.paralelo import executar_enriquecimento
+from src.processors.duckdb_engine import enriquecer_com_duckdb
+from src.processors.streaming import Saida
+from src.processors.empresasConstructor import carregar_tabelas_empresas, enriquecer_empresas
+from src.processors.estabelecimentoConstructor import carregar_tabelas_estabelecimentos, enriquecer_estabelecimentos
+from src.processors.sociosConstructor import carregar_tabelas_socios, enriquecer_socios
+from src.schemas.empSchema import EMPRESAS_SCHEMA, EMPRESAS_TIPOS, EMPRESAS_ENRIQUECIMENTO
+from src.schemas.estabSchema import ESTABELECIMENTOS_SCHEMA, ESTABELECIMENTOS_TIPOS, ESTABELECIMENTOS_ENRIQUECIMENTO
+from src.schemas.sociosSchema import SOCIOS_SCHEMA, SOCIOS_TIPOS, SOCIOS_ENRIQUECIMENTO
+
+ENTIDADES = {
+    "empresas": (EMPRESAS_SCHEMA, EMPRESAS_TIPOS, EMPRESAS_ENRIQUECIMENTO, None,
+                 carregar_tabelas_empresas, enriquecer_empresas),
+    "estabelecimentos": (ESTABELECIMENTOS_SCHEMA, ESTABELECIMENTOS_TIPOS, ESTABELECIMENTOS_ENRIQUECIMENTO,
+                         {'CNPJ': "t.cnpj_basico || t.cnpj_ordem || t.cnpj_dv"},
+                         carregar_tabelas_estabelecimentos, enriquecer_estabelecimentos),
+    "socios": (SOCIOS_SCHEMA, SOCIOS_TIPOS, SOCIOS_ENRIQUECIMENTO, None,
+               carregar_tabelas_socios, enriquecer_socios)
+}
+
+def comparar_entidade(entidade, origem, workers, diretorio_saida):
+    """Executa pandas e DuckDB para uma entidade e exibe o comparativo"""
+    colunas, tipos, enriquecimento, calculadas, carregar, enriquecer = ENTIDADES[entidade]
+
+    fontes = fontes_entidade(entidade, colunas, origem, partes=max(1, workers * 4))
+    if not fontes:
+        print(f"⚠️  Entrada de {entidade} não encontrada em Data/ (origem={origem})")
+        return None
+
+    print(f"\n📊 {entidade} ({len(fontes)} partes, origem={origem})")
+
+    inicio = time.perf_counter()
+    saida_pandas = Saida(diretorio_saida / f"{entidade}_pandas", tipos)
+    registros_pandas = executar_enriquecimento(fontes, saida_pandas, carregar, enriquecer, workers)
+    tempo_pandas = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    saida_duckdb = Saida(diretorio_saida / f"{entidade}_duckdb", tipos)
+    registros_duckdb = enriquecer_com_duckdb(fontes, saida_duckdb, colunas, tipos, enriquecimento,
+                                             calculadas, threads=workers if workers > 1 else None)
+    tempo_duckdb = time.perf_counter() - inicio
+
+    print(f"   pandas: {tempo_pandas:.2f}s ({registros_pandas:,} registros, "
+          f"{registros_pandas / tempo_pandas:,.0f} linhas/s)")
+    print(f"   DuckDB: {tempo_duckdb:.2f}s ({registros_duckdb:,} registros, "
+          f"{registros_duckdb / tempo_duckdb:,.0f} linhas/s)")
+    print(f"   🚀 Speedup DuckDB: {tempo_pandas / tempo_duckdb:.1f}x")
+
+    if registros_pandas != registros_duckdb:
+        print(f"   ⚠️  Contagens divergentes entre as engines")
+
+    return {"entidade": entidade, "pandas_s": tempo_pandas, "duckdb_s": tempo_duckdb,
+            "registros_pandas": registros_pandas, "registros_duckdb": registros_duckdb}
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark das engines de enriquecimento')
+    parser.add_argument('--origem', choices=['csv', 'zip'], default='csv')
+    parser.add_argument('--entidades', nargs='+', choices=list(ENTIDADES), default=list(ENTIDADES))
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    print("🏃 Comparando engines de enriquecimento...")
+
+    diretorio_saida = Path(tempfile.mkdtemp(prefix="cnae_engines_"))
+    try:
+        for entidade in args.entidades:
+            comparar_entidade(entidade, args.origem, args.workers, diretorio_saida)
+    finally:
+        shutil.rmtree(diretorio_saida, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Suíte de benchmark de todas as etapas do pipeline sobre dados sintéticos
+
+Gera (e reaproveita do cache) um release sintético na escala pedida, serve os
+zips por um servidor HTTP local no lugar da Receita e executa, a cada
+repetição em um diretório de trabalho limpo: download, extração, aplicação
+de schema, cada constructor, clusterização/dataset Parquet, banco DuckDB,
+índice de busca por nome, grafo societário, carga MySQL (se houver servidor) e o conjunto de consultas de src/queries/benchmark.py.
+
+Para cada etapa são registrados os tempos de todas as repetições, a mediana,
+as linhas/s e o pico de memória (RSS do processo e dos workers). O JSON
+gravado pode ser comparado com o de outro commit via --comparar.
+Uso: python scripts/benchmark_pipeline.py [--escala 1M] [--repeticoes 3] [--saida bench.json] [--comparar base.json]
+"""
+
+import functools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+from src.processors.dataset import clusterizar_parquet, criar_banco_duckdb, escrever_dataset
+from src.processors.empresasConstructor import empresasConstructor
+from src.processors.estabelecimentoConstructor import estabelecimentoConstructor
+from src.processors.fontes import ENTRADAS
+from src.processors.grafo_societario import construir_grafo
+from src.processors.indice_busca import construir_indice_busca
+from src.processors.metricas import MonitorMemoria
+from src.processors.sociosConstructor import sociosConstructor
+from src.queries.benchmark import conectar_parquets, exibir_consultas, medir_consultas
+from src.schemas.estabSchema import ESTABELECIMENTOS_SCHEMA
+from src.services import getEmpresas, getEstabelecimentos, getSocios
+from src.services.downloader import baixar_release
+from src.services.sintetico import gerar_release, interpretar_escala
+
+CONSTRUCTORS = {
+    "empresas": empresasConstructor,
+    "estabelecimentos": estabelecimentoConstructor,
+    "socios": sociosConstructor
+}
+
+ETAPAS = ["download", "extracao", "esquema", "constructor_empresas", "constructor_estabelecimentos",
+          "constructor_socios", "clusterizacao", "dataset", "banco_duckdb", "indice_busca",
+          "grafo_societario", "carga_mysql"]
+
+def servidor_local(diretorio):
+    """Servidor HTTP que imita a Receita: /AAAA-MM/{prefixo}{j}.zip → {prefixo}{j}_*.zip"""
+
+    class Handler(SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            nome = Path(path.split("?")[0]).name
+            encontrados = sorted(Path(diretorio).glob(f"{Path(nome).stem}_*.zip"))
+            return str(encontrados[0]) if encontrados else str(Path(diretorio) / "inexistente")
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def preparar_dados(escala, semente, partes, cache):
+    """Gera o release sintético uma única vez por escala/semente"""
+    diretorio = Path(cache) / f"{escala}_{semente}_{partes}"
+    marcador = diretorio / "contagens.json"
+    if marcador.exists():
+        print(f"♻️  Usando release sintético em cache: {diretorio}")
+        with open(marcador, encoding='utf-8') as f:
+            return diretorio, json.load(f)
+
+    print(f"🧪 Gerando release sintético com {escala:,} estabelecimentos em {diretorio}...")
+    contagens = gerar_release(diretorio, escala, partes=partes, semente=semente,
+                              diretorio_auxiliar=RAIZ / "Auxiliar")
+    with open(marcador, 'w', encoding='utf-8') as f:
+        json.dump(contagens, f)
+    return diretorio, contagens
+
+def mysql_disponivel():
+    from src.database.connection import obter_pool
+    try:
+        with obter_pool().conexao():
+            return True
+    except Exception:
+        return False
+
+def definir_etapas(url_base, partes, contagens, opcoes):
+    """Etapas na ordem do pipeline: nome → (função, linhas processadas)"""
+    total = sum(contagens.values())
+    constructor = dict(workers=opcoes.workers, engine=opcoes.engine, origem=opcoes.origem,
+                       limite_memoria_mb=opcoes.memory_limit_mb)
+
+    def download():
+        for entidade in ENTRADAS:
+            _, prefixo, _ = ENTRADAS[entidade]
+            baixar_release(prefixo, range(partes), Path("Data"), workers=opcoes.download_workers,
+                           url_base=url_base, meses=1)
+
+    def extracao():
+        getEmpresas.extrair_e_limpar(Path("Data"))
+        getEstabelecimentos.extrair_e_limpar(Path("Data"))
+        getSocios.extrair_e_limpar_socios(Path("Data"))
+
+    def esquema():
+        getEmpresas.processar_empresas()
+        getEstabelecimentos.aplicar_schema_estabelecimentos(Path("Data"), ESTABELECIMENTOS_SCHEMA)
+        getSocios.processar_socios()
+
+    def carga_mysql():
+        from src.database.loader import carregar_tudo
+        carregar_tudo(conexoes=opcoes.conexoes)
+
+    etapas = {"download": (download, total)}
+    if opcoes.origem == 'csv':
+        # Com origem zip os constructors leem os zips e não há extração nem consolidação
+        etapas["extracao"] = (extracao, total)
+        etapas["esquema"] = (esquema, total)
+    for entidade, funcao in CONSTRUCTORS.items():
+        etapas[f"constructor_{entidade}"] = (functools.partial(funcao, **constructor), contagens[entidade])
+    etapas["clusterizacao"] = (lambda: [clusterizar_parquet(entidade) for entidade in CONSTRUCTORS], total)
+    etapas["dataset"] = (lambda: escrever_dataset("estabelecimentos"), contagens["estabelecimentos"])
+    etapas["banco_duckdb"] = (criar_banco_duckdb, total)
+    etapas["indice_busca"] = (construir_indice_busca, contagens["empresas"] + contagens["estabelecimentos"])
+    etapas["grafo_societario"] = (construir_grafo, contagens["socios"])
+    if opcoes.mysql:
+        etapas["carga_mysql"] = (carga_mysql, total)
+    return {nome: etapas[nome] for nome in ETAPAS if nome in etapas and nome in opcoes.etapas}
+
+def executar_repeticao(repeticao, url_base, partes, contagens, opcoes, resultados):
+    """Executa todas as etapas em um diretório de trabalho novo"""
+    diretorio_trabalho = Path(tempfile.mkdtemp(prefix="cnae_bench_", dir=opcoes.diretorio_trabalho))
+    (diretorio_trabalho / "Auxiliar").symlink_to(RAIZ / "Auxiliar", target_is_directory=True)
+    (diretorio_trabalho / "Data").mkdir()
+    (diretorio_trabalho / "database").mkdir()
+    diretorio_original = Path.cwd()
+    os.chdir(diretorio_trabalho)
+    try:
+        for nome, (funcao, linhas) in definir_etapas(url_base, partes, contagens, opcoes).items():
+            print(f"\n⏱️  [{repeticao}] {nome}")
+            with MonitorMemoria() as monitor:
+                inicio = time.perf_counter()
+                funcao()
+                segundos = time.perf_counter() - inicio
+            etapa = resultados.setdefault(nome, {"segundos": [], "pico_rss_mb": 0.0, "linhas": linhas})
+            etapa["segundos"].append(round(segundos, 4))
+            etapa["pico_rss_mb"] = round(max(etapa["pico_rss_mb"], monitor.pico_mb), 1)
+            etapa["pico_rss_workers_mb"] = round(monitor.pico_filhos_mb, 1)
+
+        if opcoes.consultas:
+            print(f"\n⏱️  [{repeticao}] consultas")
+            con = conectar_parquets()
+            try:
+                return medir_consultas(con, repeticoes=opcoes.repeticoes_consultas)
+            finally:
+                con.close()
+    finally:
+        os.chdir(diretorio_original)
+        shutil.rmtree(diretorio_trabalho, ignore_errors=True)
+
+def resumir(resultados):
+    for etapa in resultados.values():
+        etapa["mediana_s"] = round(statistics.median(etapa["segundos"]), 4)
+        etapa["min_s"] = min(etapa["segundos"])
+        etapa["linhas_por_s"] = round(etapa["linhas"] / etapa["mediana_s"]) if etapa["mediana_s"] > 0 else None
+    return resultados
+
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def comparar(atual, base, tolerancia):
+    """Compara medianas com um resultado anterior; retorna as etapas que regrediram"""
+    print(f"\n📈 Comparação com {base.get('commit')} (tolerância {tolerancia:.0%}):")
+    regressoes = []
+    pares = [("etapas", nome) for nome in atual["etapas"]] + [("consultas", nome) for nome in atual["consultas"]]
+    for grupo, nome in pares:
+        novo, antigo = atual[grupo].get(nome, {}), base.get(grupo, {}).get(nome, {})
+        if "mediana_s" not in novo or "mediana_s" not in antigo or antigo["mediana_s"] <= 0:
+            continue
+        variacao = novo["mediana_s"] / antigo["mediana_s"] - 1
+        marcador = "🔴" if variacao > tolerancia else ("🟢" if variacao < -tolerancia else "⚪")
+        print(f"   {marcador} {nome}: {antigo['mediana_s']:.3f}s → {novo['mediana_s']:.3f}s ({variacao:+.1%})")
+        if variacao > tolerancia:
+            regressoes.append(nome)
+    return regressoes
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark do pipeline completo sobre dados sintéticos')
+    parser.add_argument('--escala', default='1M', help='Estabelecimentos sintéticos: 100k, 1M, 10M, 100M ou número')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--repeticoes-consultas', type=int, default=5)
+    parser.add_argument('--partes', type=int, default=4, help='Zips por entidade')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=ETAPAS)
+    parser.add_argument('--sem-consultas', dest='consultas', action='store_false')
+    parser.add_argument('--origem', choices=['csv', 'zip'], default='csv')
+    parser.add_argument('--engine', choices=['pandas', 'duckdb'], default='pandas')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--download-workers', type=int, default=4)
+    parser.add_argument('--memory-limit-mb', type=int, default=None)
+    parser.add_argument('--conexoes', type=int, default=4, help='Conexões da carga MySQL')
+    parser.add_argument('--cache', default=str(Path(tempfile.gettempdir()) / "cnae_bench_cache"))
+    parser.add_argument('--diretorio-trabalho', default=None, help='Onde criar os diretórios de cada repetição')
+    parser.add_argument('--saida', default=None, help='Arquivo JSON de resultados')
+    parser.add_argument('--comparar', default=None, help='JSON de uma execução anterior')
+    parser.add_argument('--tolerancia', type=float, default=0.10, help='Piora relativa aceita na comparação')
+    opcoes = parser.parse_args()
+
+    escala = interpretar_escala(opcoes.escala)
+    opcoes.mysql = "carga_mysql" in opcoes.etapas and mysql_disponivel()
+    if "carga_mysql" in opcoes.etapas and not opcoes.mysql:
+        print("⚠️  MySQL indisponível: etapa carga_mysql será pulada")
+
+    diretorio_dados, contagens = preparar_dados(escala, opcoes.semente, opcoes.partes, opcoes.cache)
+    servidor = servidor_local(diretorio_dados)
+    url_base = f"http://127.0.0.1:{servidor.server_address[1]}/{{ano}}-{{mes:02d}}/"
+
+    etapas, consultas = {}, {}
+    try:
+        for repeticao in range(1, opcoes.repeticoes + 1):
+            medidas = executar_repeticao(repeticao, url_base, opcoes.partes, contagens, opcoes, etapas)
+            for nome, medida in (medidas or {}).items():
+                acumulado = consultas.setdefault(nome, {"segundos": [], "linhas": medida.get("linhas")})
+                if "erro" in medida:
+                    acumulado["erro"] = medida["erro"]
+                else:
+                    acumulado["segundos"] += medida["segundos"]
+    finally:
+        servidor.shutdown()
+
+    for medida in consultas.values():
+        if medida["segundos"]:
+            medida["mediana_s"] = round(statistics.median(medida["segundos"]), 6)
+            medida["p95_s"] = round(sorted(medida["segundos"])[int(0.95 * (len(medida["segundos"]) - 1))], 6)
+
+    resultado = {
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(), "cpus": os.cpu_count()},
+        "escala": escala,
+        "linhas": contagens,
+        "repeticoes": opcoes.repeticoes,
+        "opcoes": {"origem": opcoes.origem, "engine": opcoes.engine, "workers": opcoes.workers,
+                   "memory_limit_mb": opcoes.memory_limit_mb, "partes": opcoes.partes},
+        "etapas": resumir(etapas),
+        "consultas": consultas
+    }
+
+    print(f"\n📊 Resultado ({escala:,} estabelecimentos, {opcoes.repeticoes} repetições):")
+    for nome, etapa in resultado["etapas"].items():
+        print(f"   {nome}: mediana {etapa['mediana_s']:.2f}s, {etapa['linhas_por_s'] or 0:,} linhas/s, "
+              f"pico {etapa['pico_rss_mb']:.0f}MB")
+    exibir_consultas({nome: medida for nome, medida in consultas.items() if "mediana_s" in medida or "erro" in medida})
+
+    if opcoes.saida:
+        with open(opcoes.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados gravados em {opcoes.saida}")
+
+    if opcoes.comparar:
+        with open(opcoes.comparar, encoding='utf-8') as f:
+            regressoes = comparar(resultado, json.load(f), opcoes.tolerancia)
+        if regressoes:
+            print(f"❌ Regressões: {', '.join(regressoes)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
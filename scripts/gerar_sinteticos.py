@@ -0,0 +1,63 @@
+"""
+Gera um release sintético da Receita Federal em Data/ para rodar a ETL offline
+
+Os zips seguem o layout bruto (latin1, ';', campos entre aspas, linhas
+malformadas) e podem ser processados direto com:
+    python main_etl.py --mode process --from-zip
+Uso: python scripts/gerar_sinteticos.py [--linhas 1M] [--partes 10] [--release 2025_01] [--saida Data]
+"""
+
+import dataclasses
+import json
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+from src.services.sintetico import PerfilSintetico, gerar_release, interpretar_escala
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Gera zips sintéticos no layout da Receita Federal')
+    parser.add_argument('--linhas', default='1M', help='Estabelecimentos aproximados: 100k, 1M, 10M, 100M ou inteiro')
+    parser.add_argument('--partes', type=int, default=10, help='Zips por entidade, como Empresas0..9')
+    parser.add_argument('--release', default='2025_01', help='Sufixo AAAA_MM dos zips')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', default=str(RAIZ / "Data"))
+    parser.add_argument('--auxiliar', default=str(RAIZ / "Auxiliar"), help='Tabelas de códigos sorteados')
+    padrao = PerfilSintetico()
+    parser.add_argument('--malformadas', type=float, default=padrao.fracao_malformadas,
+                        help='Fração de linhas com campos a mais')
+    parser.add_argument('--filiais', type=float, default=padrao.fracao_com_filiais,
+                        help='Fração de empresas com filiais')
+    parser.add_argument('--expoente-filiais', type=float, default=padrao.expoente_filiais,
+                        help='Zipf do número de filiais (menor = cauda mais longa)')
+    parser.add_argument('--com-socios', type=float, default=padrao.fracao_com_socios,
+                        help='Fração de empresas com quadro societário')
+    parser.add_argument('--media-socios', type=float, default=padrao.media_socios)
+    parser.add_argument('--socios-pj', type=float, default=padrao.fracao_socios_pj)
+    parser.add_argument('--expoente-cnae', type=float, default=padrao.expoente_cnae)
+    args = parser.parse_args()
+
+    perfil = PerfilSintetico(
+        fracao_com_filiais=args.filiais,
+        expoente_filiais=args.expoente_filiais,
+        fracao_com_socios=args.com_socios,
+        media_socios=args.media_socios,
+        fracao_socios_pj=args.socios_pj,
+        expoente_cnae=args.expoente_cnae,
+        fracao_malformadas=args.malformadas
+    )
+    linhas = interpretar_escala(args.linhas)
+    print(f"🧪 Gerando ~{linhas:,} estabelecimentos em {args.saida} ({args.partes} partes, release {args.release})...")
+    contagens = gerar_release(args.saida, linhas, args.release, args.partes, args.semente, args.auxiliar, perfil)
+
+    # Registro do que foi gerado, para comparar com as contagens da ETL
+    with open(Path(args.saida) / f"sintetico_{args.release}.json", 'w', encoding='utf-8') as f:
+        json.dump({"linhas": contagens, "semente": args.semente, "perfil": dataclasses.asdict(perfil)},
+                  f, indent=2, ensure_ascii=False)
+    print(f"✅ Release sintético pronto: python main_etl.py --mode process --from-zip")
+
+if __name__ == "__main__":
+    main()
@@ -1,152 +1,75 @@
 """
 Script para inserção de dados no banco MySQL
-Uso: python scripts/insert_to_database.py
+Uso: python scripts/insert_to_database.py [--entidades empresas ...] [--conexoes N] [--modo infile|insert] [--delta] [--derivadas]
 """
 
 import sys
-import os
 from pathlib import Path
-import duckdb as db
-import pandas as pd
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from src.database.connection import DatabaseConnection
-from config.config_db import DB_CONFIG
+from src.database.loader import ENTIDADES, TABELAS_MYSQL, LOTE, carregar_tudo, criar_indices, criar_tabela, derivadas_geradas
+from src.processors.incremental import CHAVES, aplicar_delta_mysql, deltas_pendentes_mysql, marcar_delta_aplicado
 
-def criar_tabelas(db_conn):
-    """Cria tabelas no banco de dados"""
-    
-    # Tabela de empresas
-    create_empresas = """
-    CREATE TABLE IF NOT EXISTS empresas_qualificacoes (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        cnpj_basico VARCHAR(15) NOT NULL,
-        razao_social VARCHAR(200),
-        natureza_juridica VARCHAR(80),
-        qualificacao_responsavel VARCHAR(100),
-        capital_social DECIMAL(15,2),
-        porte_empresa VARCHAR(50),
-        data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        INDEX idx_cnpj_basico (cnpj_basico),
-        INDEX idx_porte (porte_empresa)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-    """
-    
-    # Tabela de estabelecimentos
-    create_estabelecimentos = """
-    CREATE TABLE IF NOT EXISTS estabelecimentos (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        cnpj_completo VARCHAR(14) NOT NULL,
-        cnpj_basico VARCHAR(8) NOT NULL,
-        nome_fantasia VARCHAR(200),
-        situacao_cadastral VARCHAR(2),
-        data_situacao_cadastral DATE,
-        cnae_fiscal_principal VARCHAR(7),
-        logradouro VARCHAR(200),
-        numero VARCHAR(10),
-        bairro VARCHAR(100),
-        cep VARCHAR(8),
-        uf VARCHAR(2),
-        municipio VARCHAR(10),
-        email VARCHAR(200),
-        data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        INDEX idx_cnpj_completo (cnpj_completo),
-        INDEX idx_cnpj_basico (cnpj_basico),
-        INDEX idx_municipio (municipio),
-        INDEX idx_uf (uf)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-    """
-    
-    queries = [create_empresas, create_estabelecimentos]
-    
-    for i, query in enumerate(queries, 1):
-        table_name = "empresas_qualificacoes" if i == 1 else "estabelecimentos"
-        print(f"📋 Criando tabela {table_name}...")
-        
-        result = db_conn.execute_query(query)
-        if result is True:
-            print(f"✅ Tabela {table_name} criada com sucesso")
-        else:
-            print(f"❌ Erro ao criar tabela {table_name}")
+def criar_tabelas(db_conn, entidades=None):
+    """Cria as tabelas das entidades (todas por padrão), já com os índices secundários"""
+    for entidade in entidades or ENTIDADES:
+        tabela = TABELAS_MYSQL[entidade][0]
+        print(f"📋 Criando tabela {tabela}...")
+        try:
+            criar_tabela(db_conn.connection, entidade)
+            criar_indices(db_conn.connection, entidade)
+        except Exception as e:
+            print(f"❌ Erro ao criar tabela {tabela}: {e}")
             return False
+        print(f"✅ Tabela {tabela} criada com sucesso")
     
     return True
 
-def inserir_dados_empresas(db_conn, chunk_size=50000):
-    """Insere dados de empresas no banco"""
-    print("📊 Inserindo dados de empresas...")
-    
-    # Verifica se arquivo CSV existe (mais confiável que parquet)
-    csv_file = Path("database/empresas_final.csv")
-    if not csv_file.exists():
-        print("❌ Arquivo empresas_final.csv não encontrado")
-        return False
-    
-    # Lê dados com DuckDB diretamente do CSV
-    con = db.connect()
-    query = f"""
-        SELECT 
-            cnpj_basico,
-            razao_social,
-            natureza_juridica,
-            qualificacao_responsavel,
-            CASE 
-                WHEN capital_social = '' OR capital_social IS NULL THEN 0.0
-                ELSE CAST(REPLACE(capital_social, ',', '.') AS DOUBLE)
-            END as capital_social,
-            porte_empresa
-        FROM read_csv('{csv_file}', 
-                     delim=';', 
-                     header=true)
-        LIMIT {chunk_size}
-    """
-    
-    try:
-        df = con.execute(query).fetchdf()
-        con.close()
-        
-        if df.empty:
-            print("❌ Nenhum dado encontrado")
-            return False
+def aplicar_deltas(db_conn, entidades=None):
+    """Aplica às tabelas, em ordem, os deltas do ETL incremental ainda pendentes"""
+    for entidade in entidades or ENTIDADES:
+        tabela, colunas, _, _, _ = TABELAS_MYSQL[entidade]
+        pendentes = deltas_pendentes_mysql(entidade)
+        if not pendentes:
+            print(f"⏭️  Nenhum delta pendente para {entidade}")
+            continue
         
-        print(f"📋 Processando {len(df):,} registros de empresas...")
-        
-        # Prepara dados para inserção
-        insert_query = """
-            INSERT INTO empresas_qualificacoes 
-            (cnpj_basico, razao_social, natureza_juridica, qualificacao_responsavel, capital_social, porte_empresa)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        
-        dados = []
-        for _, row in df.iterrows():
-            dados.append((
-                row['cnpj_basico'],
-                row['razao_social'][:255] if row['razao_social'] else '',  # Limita tamanho
-                row['natureza_juridica'],
-                row['qualificacao_responsavel'],
-                row['capital_social'] if pd.notna(row['capital_social']) else 0.0,
-                row['porte_empresa']
-            ))
-        
-        success = db_conn.execute_insert(insert_query, dados)
-        if success:
-            print(f"✅ {len(dados):,} registros de empresas inseridos")
-        else:
-            print("❌ Erro ao inserir dados de empresas")
-        
-        return success
-        
-    except Exception as e:
-        print(f"❌ Erro ao processar dados de empresas: {e}")
-        if con:
-            con.close()
-        return False
+        for diretorio_delta in pendentes:
+            print(f"🔄 Aplicando delta de {entidade} ({diretorio_delta})...")
+            if not aplicar_delta_mysql(db_conn, tabela, diretorio_delta, CHAVES[entidade], colunas):
+                print(f"❌ Erro ao aplicar delta de {entidade}")
+                return False
+            marcar_delta_aplicado(entidade, diretorio_delta)
+    return True
 
 def main():
     """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Carga dos dados no MySQL')
+    parser.add_argument('--entidades', nargs='+', choices=ENTIDADES, default=ENTIDADES)
+    parser.add_argument('--conexoes', type=int, default=4,
+                       help='Conexões de carga em paralelo')
+    parser.add_argument('--modo', choices=['infile', 'insert'], default=None,
+                       help='LOAD DATA LOCAL INFILE ou INSERTs de múltiplas linhas (padrão: conforme o servidor)')
+    parser.add_argument('--lote', type=int, default=LOTE,
+                       help='Linhas lidas do Parquet por lote')
+    parser.add_argument('--delta', action='store_true',
+                       help='Aplica apenas os deltas do ETL incremental (sem recarga completa)')
+    parser.add_argument('--derivadas', action='store_true',
+                       help='Recarrega também as tabelas derivadas geradas pela ETL (ponte de CNAEs e cubos)')
+    args = parser.parse_args()
+    derivadas = derivadas_geradas() if args.derivadas else []
+    
     print("🚀 Iniciando inserção de dados no banco MySQL...")
     
+    if not args.delta:
+        resultados = carregar_tudo(args.entidades + derivadas, args.conexoes, args.modo, args.lote)
+        falhas = [entidade for entidade, total in resultados.items() if total is None]
+        print("❌ Falha na carga de: " + ", ".join(falhas) if falhas else "✅ Processo concluído!")
+        return
+    
     db_conn = DatabaseConnection()
     
     if not db_conn.connect():
@@ -155,12 +78,12 @@ def main():
     
     try:
         print("📋 Criando tabelas...")
-        if not criar_tabelas(db_conn):
+        if not criar_tabelas(db_conn, args.entidades):
             return
         
-        print("📊 Inserindo dados...")
-        inserir_dados_empresas(db_conn)
-        
+        if aplicar_deltas(db_conn, args.entidades) and derivadas:
+            # Derivadas não têm delta: são regeneradas a cada release e recarregadas inteiras
+            carregar_tudo(derivadas, args.conexoes, args.modo, args.lote)
         print("✅ Processo concluído!")
         
     finally:
@@ -4,36 +4,208 @@ Conexões e operações de banco de dados
 
 import mysql.connector
 from mysql.connector import Error
+import queue
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
-from config.config_db import DB_CONFIG
+from config.config_db import DB_CONFIG, DB_POOL
+
+# Executados uma única vez em cada conexão criada pelo pool
+SESSAO_PADRAO = [
+    "SET SESSION wait_timeout=28800",
+    "SET SESSION interactive_timeout=28800",
+    "SET SESSION innodb_lock_wait_timeout=300",
+    "SET SESSION sql_mode=''"
+]
+
+class PoolConexoes:
+    """Pool de conexões MySQL com inicialização de sessão única e verificação de saúde
+
+    As conexões são criadas sob demanda até `tamanho`; uma conexão ociosa há
+    mais de `verificar_apos_s` segundos recebe um ping antes de ser entregue e
+    é substituída se estiver inválida.
+    """
+
+    def __init__(self, tamanho=None, config=None, sessao=None, verificar_apos_s=None, timeout_s=None):
+        self.tamanho = tamanho or DB_POOL['tamanho']
+        self.config = dict(DB_CONFIG, **(config or {}))
+        self.sessao = SESSAO_PADRAO if sessao is None else sessao
+        self.verificar_apos_s = DB_POOL['verificar_apos_s'] if verificar_apos_s is None else verificar_apos_s
+        self.timeout_s = timeout_s or DB_POOL['timeout_s']
+        self._ociosas = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._criadas = 0
+
+    def _nova_conexao(self):
+        connection = mysql.connector.connect(**self.config)
+        cursor = connection.cursor()
+        for comando in self.sessao:
+            cursor.execute(comando)
+        cursor.close()
+        return connection
+
+    def descartar(self, connection):
+        """Fecha uma conexão retirada do pool e libera sua vaga"""
+        with self._lock:
+            self._criadas -= 1
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _saudavel(self, connection, ociosa_desde):
+        if time.monotonic() - ociosa_desde < self.verificar_apos_s:
+            return True
+        try:
+            # Sem reconnect: uma reconexão perderia os ajustes de sessão
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def obter(self):
+        """Retira uma conexão do pool, criando uma nova se houver vaga"""
+        limite = time.monotonic() + self.timeout_s
+        while True:
+            try:
+                connection, ociosa_desde = self._ociosas.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    pode_criar = self._criadas < self.tamanho
+                    if pode_criar:
+                        self._criadas += 1
+                if pode_criar:
+                    try:
+                        return self._nova_conexao()
+                    except Exception:
+                        with self._lock:
+                            self._criadas -= 1
+                        raise
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise TimeoutError(f"Nenhuma conexão livre no pool após {self.timeout_s}s")
+                try:
+                    connection, ociosa_desde = self._ociosas.get(timeout=restante)
+                except queue.Empty:
+                    continue
+
+            if self._saudavel(connection, ociosa_desde):
+                return connection
+            self.descartar(connection)
+
+    def devolver(self, connection):
+        """Devolve a conexão ao pool, desfazendo transações deixadas abertas"""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            self.descartar(connection)
+            return
+        self._ociosas.put((connection, time.monotonic()))
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão do pool dentro de um bloco with"""
+        connection = self.obter()
+        try:
+            yield connection
+        finally:
+            self.devolver(connection)
+
+    def fechar(self):
+        """Fecha todas as conexões ociosas"""
+        while True:
+            try:
+                connection, _ = self._ociosas.get_nowait()
+            except queue.Empty:
+                break
+            self.descartar(connection)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def obter_pool(nome='padrao', **opcoes):
+    """Pool compartilhado pelo processo; criado com as opções na primeira chamada
+
+    Chamadas seguintes podem apenas aumentar o tamanho do pool.
+    """
+    with _pools_lock:
+        if nome not in _pools:
+            _pools[nome] = PoolConexoes(**opcoes)
+        elif opcoes.get('tamanho', 0) > _pools[nome].tamanho:
+            _pools[nome].tamanho = opcoes['tamanho']
+        return _pools[nome]
+
+def _lote_formatado(linhas, colunas, formato, schema=None):
+    if formato == 'pandas':
+        import pandas as pd
+        return pd.DataFrame.from_records(linhas, columns=colunas)
+    if formato == 'arrow':
+        import pyarrow as pa
+        arrays = [pa.array(valores, type=schema.field(nome).type if schema else None)
+                  for nome, valores in zip(colunas, zip(*linhas))]
+        return pa.RecordBatch.from_arrays(arrays, names=colunas)
+    return linhas
+
+def iterar_query(query, params=None, tamanho_lote=10000, formato='linhas', schema=None, pool=None):
+    """Executa uma consulta com cursor não bufferizado e gera o resultado em lotes
+
+    O servidor envia as linhas conforme são consumidas, então a memória fica
+    limitada a um lote. formato='linhas' gera listas de tuplas, 'pandas'
+    DataFrames e 'arrow' RecordBatches (com schema opcional para fixar os tipos).
+    Se o consumo for interrompido, a conexão é descartada em vez de drenar o
+    restante do resultado.
+    """
+    if formato not in ('linhas', 'pandas', 'arrow'):
+        raise ValueError(f"Formato desconhecido: {formato}")
+
+    pool = pool or obter_pool()
+    connection = pool.obter()
+    concluido = False
+    try:
+        cursor = connection.cursor(buffered=False)
+        cursor.execute(query, params or ())
+        colunas = list(cursor.column_names)
+        while True:
+            linhas = cursor.fetchmany(tamanho_lote)
+            if not linhas:
+                break
+            yield _lote_formatado(linhas, colunas, formato, schema)
+        cursor.close()
+        concluido = True
+    finally:
+        if concluido:
+            pool.devolver(connection)
+        else:
+            pool.descartar(connection)
 
 class DatabaseConnection:
-    def __init__(self):
+    def __init__(self, pool=None):
+        self.pool = pool or obter_pool()
         self.connection = None
     
     def connect(self):
-        """Estabelece conexão com MySQL"""
+        """Obtém uma conexão do pool (sessão já configurada)"""
+        if self.connection is not None:
+            # Conexão caída: descarta e pega outra do pool
+            self.pool.descartar(self.connection)
+            self.connection = None
         try:
-            self.connection = mysql.connector.connect(**DB_CONFIG)
-            if self.connection.is_connected():
-                cursor = self.connection.cursor()
-                cursor.execute("SET SESSION wait_timeout=28800")
-                cursor.execute("SET SESSION interactive_timeout=28800")
-                cursor.execute("SET SESSION innodb_lock_wait_timeout=300")
-                cursor.execute("SET SESSION sql_mode=''")
-                cursor.close()
-                return True
-        except Error as e:
+            self.connection = self.pool.obter()
+            return True
+        except (Error, TimeoutError) as e:
             print(f"❌ Erro ao conectar: {e}")
             return False
     
     def disconnect(self):
-        """Fecha conexão"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """Devolve a conexão ao pool"""
+        if self.connection is not None:
+            self.pool.devolver(self.connection)
+            self.connection = None
     
     def execute_query(self, query, params=None):
         """Executa query de consulta"""
@@ -0,0 +1,225 @@
+"""
+Carga em massa dos Parquets finais no MySQL
+
+Cada entidade é lida do Parquet em lotes (row groups distribuídos entre várias
+conexões paralelas) e enviada com LOAD DATA LOCAL INFILE, ou com INSERTs de
+múltiplas linhas quando o servidor não aceita local_infile. Os índices
+secundários só são criados após a carga.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from mysql.connector import Error
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.database.connection import obter_pool
+from src.processors.cubos import CUBOS, parquet_cubo
+from src.processors.ponte_cnae import PARQUET_PONTE
+from src.schemas.empSchema import EMPRESAS_SCHEMA, EMPRESAS_TIPOS
+from src.schemas.estabSchema import (ESTABELECIMENTO_CNAE_SCHEMA, ESTABELECIMENTO_CNAE_TIPOS,
+                                     ESTABELECIMENTOS_SCHEMA, ESTABELECIMENTOS_TIPOS)
+from src.schemas.sociosSchema import SOCIOS_SCHEMA, SOCIOS_TIPOS
+from src.schemas.tipos import ddl_mysql
+
+# Tabela, colunas, tipos, chave primária e índices secundários de cada entidade
+TABELAS_MYSQL = {
+    "empresas": ("empresas_qualificacoes", EMPRESAS_SCHEMA, EMPRESAS_TIPOS,
+                 "cnpj_basico", ["porte_empresa"]),
+    "estabelecimentos": ("estabelecimentos", ESTABELECIMENTOS_SCHEMA + ["CNPJ"], ESTABELECIMENTOS_TIPOS,
+                         "CNPJ", ["cnpj_basico", "municipio", "uf"]),
+    "socios": ("socios", SOCIOS_SCHEMA, SOCIOS_TIPOS,
+               None, ["cnpj_basico"])
+}
+ENTIDADES = list(TABELAS_MYSQL)
+
+# Tabelas derivadas, recarregadas inteiras a cada release (não têm delta).
+# Ponte estabelecimento × CNAE (src/processors/ponte_cnae.py): a chave (cnae, CNPJ)
+# agrupa fisicamente os estabelecimentos de cada CNAE
+TABELAS_MYSQL["estabelecimento_cnae"] = ("estabelecimento_cnae", ESTABELECIMENTO_CNAE_SCHEMA,
+                                         ESTABELECIMENTO_CNAE_TIPOS, ["cnae", "CNPJ"], ["CNPJ"])
+# Cubos pré-agregados (src/processors/cubos.py); as dimensões aceitam nulo, então
+# não há chave primária, só índices nas três primeiras
+for _nome, _cubo in CUBOS.items():
+    TABELAS_MYSQL[f"cubo_{_nome}"] = (f"cubo_{_nome}", _cubo.colunas, _cubo.tipos,
+                                      None, list(_cubo.dimensoes[:3]))
+TABELAS_DERIVADAS = [tabela for tabela in TABELAS_MYSQL if tabela not in ENTIDADES]
+
+LOTE = 50000
+LINHAS_POR_INSERT = 1000
+
+# Ajustes de sessão para carga: sem verificação de unicidade/FK linha a linha
+SESSAO_CARGA = [
+    "SET SESSION unique_checks = 0",
+    "SET SESSION foreign_key_checks = 0",
+    "SET SESSION sql_mode = ''"
+]
+
+
+def pool_carga(conexoes=4):
+    """Pool das conexões de carga (LOAD DATA LOCAL habilitado, sessão de carga)"""
+    # Uma conexão a mais para o controle (DDL e índices) além das de carga
+    return obter_pool('carga', tamanho=conexoes + 1, sessao=SESSAO_CARGA,
+                      config={'allow_local_infile': True, 'buffered': False})
+
+
+def parquet_entidade(entidade, diretorio=Path("database")):
+    if entidade.startswith("cubo_"):
+        return parquet_cubo(entidade[len("cubo_"):], Path(diretorio) / "cubos")
+    if entidade == "estabelecimento_cnae":
+        return Path(diretorio) / PARQUET_PONTE.name
+    return Path(diretorio) / f"{entidade}_final.parquet"
+
+
+def derivadas_geradas(diretorio=Path("database")):
+    """Tabelas derivadas (ponte de CNAEs e cubos) com Parquet gerado pela ETL"""
+    return [tabela for tabela in TABELAS_DERIVADAS if parquet_entidade(tabela, diretorio).exists()]
+
+
+def criar_tabela(connection, entidade, recriar=False):
+    """Cria a tabela da entidade apenas com a chave primária (índices vêm depois)"""
+    tabela, colunas, tipos, chave_primaria, _ = TABELAS_MYSQL[entidade]
+    cursor = connection.cursor()
+    if recriar:
+        cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+    cursor.execute(ddl_mysql(tabela, colunas, tipos, chave_primaria))
+    connection.commit()
+    cursor.close()
+
+
+def criar_indices(connection, entidade):
+    """Cria, em um único ALTER TABLE, os índices secundários ainda inexistentes"""
+    tabela, _, _, _, indices = TABELAS_MYSQL[entidade]
+    cursor = connection.cursor()
+    cursor.execute("SELECT DISTINCT index_name FROM information_schema.statistics "
+                   "WHERE table_schema = DATABASE() AND table_name = %s", (tabela,))
+    existentes = {linha[0] for linha in cursor.fetchall()}
+
+    novos = [f"ADD INDEX idx_{coluna} ({coluna})" for coluna in indices if f"idx_{coluna}" not in existentes]
+    if novos:
+        cursor.execute(f"ALTER TABLE {tabela} " + ", ".join(novos))
+    cursor.close()
+    return len(novos)
+
+
+def _tabela_texto(batch):
+    """Converte dicionários (categorias) para texto, aceito pelo writer CSV"""
+    colunas = [coluna.cast(pa.string()) if pa.types.is_dictionary(coluna.type) else coluna
+               for coluna in batch.columns]
+    return pa.Table.from_arrays(colunas, names=batch.schema.names)
+
+
+def _carregar_lote_infile(cursor, tabela, colunas, batch, diretorio_temp):
+    """Grava o lote em CSV temporário e o envia com LOAD DATA LOCAL INFILE"""
+    descritor, caminho = tempfile.mkstemp(suffix=".csv", dir=diretorio_temp)
+    os.close(descritor)
+    try:
+        # Valores entre aspas (aspas internas duplicadas) e NULL sem aspas, como o MySQL espera
+        pa_csv.write_csv(_tabela_texto(batch), caminho, pa_csv.WriteOptions(
+            include_header=False, null_string="NULL", quoting_style="all_valid"))
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE {tabela}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY ',' ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '\\n'
+            ({', '.join(colunas)})
+        """, (caminho,))
+    finally:
+        os.remove(caminho)
+
+
+def _carregar_lote_insert(cursor, tabela, colunas, batch, linhas_por_insert=LINHAS_POR_INSERT):
+    """Envia o lote em INSERTs de múltiplas linhas"""
+    marcadores = "(" + ", ".join(["%s"] * len(colunas)) + ")"
+    linhas = list(zip(*(batch.column(coluna).to_pylist() for coluna in colunas)))
+    for inicio in range(0, len(linhas), linhas_por_insert):
+        bloco = linhas[inicio:inicio + linhas_por_insert]
+        cursor.execute(f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES " +
+                       ", ".join([marcadores] * len(bloco)),
+                       [valor for linha in bloco for valor in linha])
+
+
+def _carregar_row_groups(pool, parquet_file, tabela, colunas, row_groups, modo, lote):
+    """Carrega um subconjunto de row groups em uma conexão própria; retorna as linhas"""
+    arquivo = pq.ParquetFile(parquet_file)
+    total = 0
+    with pool.conexao() as connection:
+        with tempfile.TemporaryDirectory(prefix="cnae_carga_") as diretorio_temp:
+            cursor = connection.cursor()
+            for batch in arquivo.iter_batches(batch_size=lote, row_groups=row_groups, columns=colunas):
+                if modo == 'infile':
+                    _carregar_lote_infile(cursor, tabela, colunas, batch, diretorio_temp)
+                else:
+                    _carregar_lote_insert(cursor, tabela, colunas, batch)
+                connection.commit()
+                total += batch.num_rows
+            cursor.close()
+    return total
+
+
+def suporta_local_infile(connection):
+    """True se o servidor aceita LOAD DATA LOCAL INFILE"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT @@GLOBAL.local_infile")
+    # fetchall: no pool de carga (sem buffer) um resultado não lido impede fechar o cursor
+    (valor,), = cursor.fetchall()
+    cursor.close()
+    return bool(int(valor))
+
+
+def carregar_entidade(entidade, conexoes=4, modo=None, lote=LOTE, recriar=True, parquet_file=None):
+    """Carrega o Parquet de uma entidade no MySQL; retorna as linhas carregadas
+
+    modo='infile' usa LOAD DATA LOCAL INFILE e modo='insert' usa INSERTs de
+    múltiplas linhas; None escolhe conforme o servidor.
+    """
+    tabela, colunas, _, _, _ = TABELAS_MYSQL[entidade]
+    parquet_file = Path(parquet_file or parquet_entidade(entidade))
+    if not parquet_file.exists():
+        print(f"❌ Arquivo não encontrado: {parquet_file}")
+        return None
+
+    pool = pool_carga(conexoes)
+    with pool.conexao() as connection:
+        if modo is None:
+            modo = 'infile' if suporta_local_infile(connection) else 'insert'
+        criar_tabela(connection, entidade, recriar)
+
+        num_row_groups = pq.ParquetFile(parquet_file).num_row_groups
+        conexoes = max(1, min(conexoes, num_row_groups))
+        # Row groups intercalados para equilibrar as conexões
+        distribuicao = [list(range(i, num_row_groups, conexoes)) for i in range(conexoes)]
+
+        print(f"📥 Carregando {entidade} em {tabela} ({conexoes} conexões, modo {modo})...")
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=conexoes) as executor:
+            total = sum(executor.map(lambda grupos: _carregar_row_groups(pool, parquet_file, tabela, colunas,
+                                                                         grupos, modo, lote),
+                                     distribuicao))
+        tempo_carga = time.perf_counter() - inicio
+        print(f"✅ {total:,} linhas em {tempo_carga:.1f}s ({total / max(tempo_carga, 1e-9):,.0f} linhas/s)")
+
+        inicio = time.perf_counter()
+        criados = criar_indices(connection, entidade)
+        if criados:
+            print(f"🗂️  {criados} índices secundários criados em {time.perf_counter() - inicio:.1f}s")
+        return total
+
+
+def carregar_tudo(entidades=None, conexoes=4, modo=None, lote=LOTE):
+    """Carrega as entidades informadas (todas e as derivadas geradas, por padrão); retorna {entidade: linhas}"""
+    resultados = {}
+    for entidade in entidades or ENTIDADES + derivadas_geradas():
+        try:
+            resultados[entidade] = carregar_entidade(entidade, conexoes, modo, lote)
+        except (Error, TimeoutError) as e:
+            print(f"❌ Erro na carga de {entidade}: {e}")
+            resultados[entidade] = None
+    return resultados
@@ -0,0 +1,181 @@
+"""
+Agendador da ETL como grafo de dependências (DAG)
+
+Cada tarefa declara as tarefas de que depende, o recurso que ocupa ('io' para
+downloads e extração, 'cpu' para processamento) e uma estimativa de memória.
+O agendador dispara toda tarefa cujas dependências terminaram assim que há
+vaga no orçamento do seu recurso e de memória. Assim o download de Sócios
+corre junto com o processamento de Empresas e entidades independentes são
+processadas em paralelo. Tarefas com saídas já atualizadas são puladas.
+"""
+
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.processors.metricas import etapa
+
+RECURSOS = ("cpu", "io")
+
+
+@dataclass
+class Tarefa:
+    """Nó do grafo: função sem argumentos, dependências e consumo de recursos"""
+    nome: str
+    funcao: Callable
+    dependencias: list = field(default_factory=list)
+    recurso: str = "cpu"
+    memoria_mb: float = 0
+    atualizada: Optional[Callable] = None  # True se as saídas já estão em dia
+    status: str = "pendente"  # pendente, executando, ok, pulada, erro ou cancelada
+    resultado: object = None
+    erro: str = ""
+    segundos: float = 0.0
+
+
+def saidas_atualizadas(entradas, saidas):
+    """True se todas as saídas existem e são mais novas que todas as entradas (como o make)"""
+    entradas, saidas = [Path(e) for e in entradas], [Path(s) for s in saidas]
+    if not entradas or not saidas:
+        return False
+    if not all(e.exists() for e in entradas) or not all(s.exists() for s in saidas):
+        return False
+    return min(s.stat().st_mtime for s in saidas) >= max(e.stat().st_mtime for e in entradas)
+
+
+class Agendador:
+    """Executa um DAG de tarefas respeitando vagas de CPU, de IO e um teto de memória
+
+    Uma tarefa que falha cancela apenas as que dependem dela; as demais seguem.
+    Com forcar=True as verificações de atualização são ignoradas.
+    """
+
+    def __init__(self, cpu=1, io=2, memoria_mb=None, forcar=False):
+        self.vagas = {"cpu": max(1, cpu), "io": max(1, io)}
+        self.memoria_mb = memoria_mb
+        self.forcar = forcar
+        self.tarefas = {}
+
+    def adicionar(self, nome, funcao, dependencias=(), recurso="cpu", memoria_mb=0, atualizada=None):
+        """Registra uma tarefa; a ordem de inclusão define a prioridade entre tarefas prontas"""
+        if recurso not in RECURSOS:
+            raise ValueError(f"Recurso desconhecido: {recurso}")
+        if nome in self.tarefas:
+            raise ValueError(f"Tarefa duplicada: {nome}")
+        self.tarefas[nome] = Tarefa(nome, funcao, list(dependencias), recurso, memoria_mb, atualizada)
+        return nome
+
+    def _validar(self):
+        for tarefa in self.tarefas.values():
+            for dependencia in tarefa.dependencias:
+                if dependencia not in self.tarefas:
+                    raise ValueError(f"{tarefa.nome} depende de tarefa inexistente: {dependencia}")
+
+        # Ordenação topológica só para detectar ciclos
+        restantes = {nome: set(t.dependencias) for nome, t in self.tarefas.items()}
+        while restantes:
+            livres = [nome for nome, deps in restantes.items() if not deps]
+            if not livres:
+                raise ValueError(f"Ciclo de dependências entre: {', '.join(sorted(restantes))}")
+            for nome in livres:
+                del restantes[nome]
+            for deps in restantes.values():
+                deps.difference_update(livres)
+
+    def _executar_tarefa(self, tarefa):
+        inicio = time.perf_counter()
+        try:
+            with etapa(tarefa.nome, recurso=tarefa.recurso) as registro:
+                tarefa.resultado = tarefa.funcao()
+                if isinstance(tarefa.resultado, int) and not isinstance(tarefa.resultado, bool):
+                    registro["linhas"] = tarefa.resultado
+        finally:
+            tarefa.segundos = time.perf_counter() - inicio
+        return tarefa
+
+    @staticmethod
+    def _atualizada(tarefa):
+        if tarefa.atualizada is None:
+            return False
+        try:
+            return bool(tarefa.atualizada())
+        except Exception:
+            # Saída ilegível (ex.: Parquet truncado) conta como desatualizada
+            return False
+
+    def _cabe(self, tarefa, ocupadas, memoria_em_uso, executando):
+        if ocupadas[tarefa.recurso] >= self.vagas[tarefa.recurso]:
+            return False
+        # Uma tarefa maior que o orçamento ainda roda quando nada mais está rodando
+        if self.memoria_mb and executando and memoria_em_uso + tarefa.memoria_mb > self.memoria_mb:
+            return False
+        return True
+
+    def executar(self):
+        """Executa o grafo; retorna True se nenhuma tarefa falhou ou foi cancelada"""
+        self._validar()
+        print(f"🗺️  {len(self.tarefas)} tarefas (vagas: {self.vagas['cpu']} CPU, {self.vagas['io']} IO"
+              + (f", {self.memoria_mb:,.0f}MB" if self.memoria_mb else "") + ")")
+
+        ocupadas = dict.fromkeys(RECURSOS, 0)
+        memoria_em_uso = 0
+        futuros = {}
+
+        with ThreadPoolExecutor(max_workers=sum(self.vagas.values())) as pool:
+            while True:
+                progrediu = True
+                while progrediu:
+                    progrediu = False
+                    for tarefa in self.tarefas.values():
+                        if tarefa.status != "pendente":
+                            continue
+                        estados = [self.tarefas[d].status for d in tarefa.dependencias]
+                        if any(s in ("erro", "cancelada") for s in estados):
+                            tarefa.status = "cancelada"
+                            print(f"🚫 {tarefa.nome} cancelada: uma dependência falhou")
+                            progrediu = True
+                            continue
+                        if not all(s in ("ok", "pulada") for s in estados):
+                            continue
+                        if not self.forcar and self._atualizada(tarefa):
+                            tarefa.status = "pulada"
+                            print(f"⏭️  {tarefa.nome}: saídas já atualizadas")
+                            progrediu = True
+                            continue
+                        if not self._cabe(tarefa, ocupadas, memoria_em_uso, bool(futuros)):
+                            continue
+                        tarefa.status = "executando"
+                        ocupadas[tarefa.recurso] += 1
+                        memoria_em_uso += tarefa.memoria_mb
+                        print(f"▶️  {tarefa.nome} ({tarefa.recurso})")
+                        futuros[pool.submit(self._executar_tarefa, tarefa)] = tarefa
+                        progrediu = True
+
+                if not futuros:
+                    break
+
+                concluidos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    tarefa = futuros.pop(futuro)
+                    ocupadas[tarefa.recurso] -= 1
+                    memoria_em_uso -= tarefa.memoria_mb
+                    try:
+                        futuro.result()
+                        tarefa.status = "ok"
+                        print(f"✅ {tarefa.nome} concluída em {tarefa.segundos:.1f}s")
+                    except Exception as e:
+                        tarefa.status, tarefa.erro = "erro", str(e)
+                        print(f"❌ {tarefa.nome} falhou após {tarefa.segundos:.1f}s: {e}")
+                        traceback.print_exception(e)
+
+        pendentes = [t.nome for t in self.tarefas.values() if t.status == "pendente"]
+        for nome in pendentes:
+            self.tarefas[nome].status = "cancelada"
+        return all(t.status in ("ok", "pulada") for t in self.tarefas.values())
+
+    def resumo(self):
+        """{nome: status} de todas as tarefas"""
+        return {nome: tarefa.status for nome, tarefa in self.tarefas.items()}
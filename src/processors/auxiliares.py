@@ -0,0 +1,96 @@
+"""
+Camada de lookup das tabelas auxiliares (Auxiliar/*.csv)
+Cada tabela é carregada uma única vez em um mapeamento código → descrição
+aplicado de forma vetorizada, gerando colunas categóricas. As tabelas vêm da
+referência compilada (src/processors/referencia.py), lida com mmap; os CSVs só
+são relidos para recompilá-la quando mudam
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.schemas.auxSchema import AUXILIARES, AUXILIAR_COLUNAS, TABELAS_FIXAS
+
+DIRETORIO_AUXILIAR = Path("Auxiliar")
+
+
+class TabelaAuxiliar:
+    """Mapeamento código → descrição pré-computado"""
+
+    def __init__(self, codigos, descricoes):
+        descricoes = pd.Index(descricoes)
+        self.codigos = pd.Index(codigos)
+        self.categorias = pd.Index(descricoes.unique())
+        # Posição de cada código na lista de categorias (descrições podem se repetir)
+        self._posicoes = self.categorias.get_indexer(descricoes)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def _posicoes_categorias(self, codigos):
+        """Posição em categorias da descrição de cada código (-1 se não existe)"""
+        indices = self.codigos.get_indexer(codigos)
+        return np.where(indices >= 0, self._posicoes[indices], -1)
+
+    def aplicar(self, serie):
+        """Converte uma série de códigos em um Categorical de descrições"""
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Resolve apenas as categorias distintas e propaga pelos códigos do chunk
+            por_categoria = self.aplicar(pd.Series(serie.cat.categories))
+            # O -1 ao final atende os nulos (código -1), inclusive em colunas sem categorias
+            codigos_categoria = np.append(por_categoria.codes, -1)[serie.cat.codes]
+            return pd.Categorical.from_codes(codigos_categoria, categories=self.categorias)
+
+        return pd.Categorical.from_codes(self._posicoes_categorias(serie), categories=self.categorias)
+
+    def descricao(self, codigo):
+        """Descrição de um único código, ou None"""
+        posicao = self._posicoes_categorias([codigo])[0]
+        return self.categorias[posicao] if posicao >= 0 else None
+
+
+class TabelaCompilada(TabelaAuxiliar):
+    """TabelaAuxiliar sobre uma tabela da referência compilada: o código é índice de array, sem hash"""
+
+    def __init__(self, tabela):
+        self.tabela = tabela
+        # Ids (no conjunto de textos) das descrições da tabela; a posição em categorias é a deste array
+        self._ids = tabela.ids_usados()
+        self.categorias = pd.Index(tabela.referencia.textos(self._ids))
+
+    def __len__(self):
+        return len(self.tabela)
+
+    def _posicoes_categorias(self, codigos):
+        ids = self.tabela.ids(self.tabela.numeros(codigos))
+        return np.where(ids >= 0, np.searchsorted(self._ids, ids), -1)
+
+
+def ler_auxiliar(nome, diretorio=DIRETORIO_AUXILIAR):
+    """Lê uma tabela auxiliar como DataFrame (codigo, descricao)"""
+    if nome in TABELAS_FIXAS:
+        return pd.DataFrame(list(TABELAS_FIXAS[nome].items()), columns=AUXILIAR_COLUNAS)
+
+    arquivo, encoding = AUXILIARES[nome]
+    return pd.read_csv(Path(diretorio) / arquivo, sep=';', header=None, names=AUXILIAR_COLUNAS,
+                       encoding=encoding, dtype=str)
+
+
+def carregar_tabela(nome, diretorio=DIRETORIO_AUXILIAR, compilar=True):
+    """Carrega uma tabela auxiliar da referência compilada (compilando-a se preciso e se compilar)"""
+    from src.processors.referencia import abrir_referencia
+    return TabelaCompilada(abrir_referencia(diretorio, compilar=compilar).tabela(nome))
+
+
+def carregar_auxiliares(enriquecimento, diretorio=DIRETORIO_AUXILIAR, compilar=True):
+    """Carrega as tabelas auxiliares referenciadas por uma especificação de enriquecimento"""
+    return {tabela: carregar_tabela(tabela, diretorio, compilar) for _, tabela, _ in enriquecimento}
+
+
+def aplicar_enriquecimento(chunk, tabelas, enriquecimento):
+    """Acrescenta ao chunk a descrição categórica de cada coluna de código"""
+    for coluna, tabela, destino in enriquecimento:
+        chunk[destino] = tabelas[tabela].aplicar(chunk[coluna])
+    return chunk
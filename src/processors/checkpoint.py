@@ -0,0 +1,257 @@
+"""
+Checkpoints do enriquecimento para retomar uma execução interrompida
+
+A saída de cada fonte (faixa de CSV ou membro zip) é gravada em fragmentos
+de até LINHAS_POR_FRAGMENTO linhas em database/.{saida}_checkpoint/. Cada
+fragmento é confirmado atomicamente (arquivo .tmp renomeado) e só então o
+estado da fonte (parte-NNNNN.json) registra as linhas de entrada consumidas
+e o fragmento gravado. Com retomar=True uma nova execução pula as fontes
+concluídas e, na fonte em andamento, descarta as linhas já confirmadas.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+from src.processors.metricas import contar
+from src.processors.streaming import processar_em_streaming
+from src.schemas.tipos import dtypes_leitura
+
+LINHAS_POR_FRAGMENTO = 1000000
+
+
+def _ler_json(arquivo):
+    try:
+        with open(arquivo, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_json(arquivo, dados):
+    """Grava o JSON em um .tmp sincronizado com o disco e o renomeia sobre o destino"""
+    temporario = arquivo.with_name(arquivo.name + ".tmp")
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, arquivo)
+
+
+def _sincronizar(caminho):
+    with open(caminho, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+class Checkpoint:
+    """Manifesto e fragmentos confirmados de uma saída (ver streaming.Saida)
+
+    O manifesto guarda a assinatura das fontes e dos formatos; se as entradas
+    mudaram desde a execução interrompida, o checkpoint é descartado.
+    """
+
+    def __init__(self, saida, fontes, retomar=False, linhas_por_fragmento=LINHAS_POR_FRAGMENTO):
+        self.saida = saida
+        self.diretorio = saida.caminho.parent / f".{saida.caminho.name}_checkpoint"
+        self.total_fontes = len(fontes)
+        self.linhas_por_fragmento = linhas_por_fragmento
+
+        manifesto = self.diretorio / "manifesto.json"
+        assinatura = {"fontes": [fonte.assinatura for fonte in fontes], "formatos": sorted(saida.arquivos())}
+        if retomar and _ler_json(manifesto) == assinatura:
+            concluidas = self.total_fontes - len(self.pendentes())
+            linhas = sum(self.estado(i)["linhas"] for i in range(self.total_fontes))
+            print(f"♻️  Retomando {saida.caminho.name}: {concluidas}/{self.total_fontes} partes concluídas, "
+                  f"{linhas:,} linhas já confirmadas")
+            return
+
+        if retomar and self.diretorio.exists():
+            print(f"⚠️  Checkpoint de {saida.caminho.name} não corresponde às entradas atuais; recomeçando")
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+        self.diretorio.mkdir(parents=True)
+        _gravar_json(manifesto, assinatura)
+
+    def _arquivo_estado(self, indice):
+        return self.diretorio / f"parte-{indice:05d}.json"
+
+    def fragmento(self, nome):
+        """Saída de um fragmento, com os mesmos formatos e tipos da saída final"""
+        return self.saida.para(self.diretorio / nome)
+
+    def estado(self, indice):
+        """Linhas consumidas, registros e fragmentos confirmados da fonte"""
+        estado = _ler_json(self._arquivo_estado(indice))
+        if estado and all(caminho.exists() for nome in estado["fragmentos"]
+                          for caminho in self.fragmento(nome).arquivos().values()):
+            return estado
+        # Sem estado ou com fragmento perdido: a fonte recomeça do início
+        return {"linhas": 0, "registros": 0, "fragmentos": [], "concluida": False}
+
+    def gravar_estado(self, indice, estado):
+        _gravar_json(self._arquivo_estado(indice), estado)
+
+    def pendentes(self):
+        """Índices das fontes ainda não concluídas"""
+        return [i for i in range(self.total_fontes) if not self.estado(i)["concluida"]]
+
+    def fragmentos(self, formato):
+        """Arquivos confirmados de um formato, na ordem das fontes"""
+        return [self.fragmento(nome).arquivos()[formato]
+                for i in range(self.total_fontes) for nome in self.estado(i)["fragmentos"]]
+
+    def registros(self):
+        return sum(self.estado(i)["registros"] for i in range(self.total_fontes))
+
+    def processar_fonte(self, indice, fonte, enriquecer, tabelas, chunk_size=100000,
+                        limite_memoria_mb=None, mostrar_progresso=True):
+        """Enriquece a fonte a partir do último fragmento confirmado; retorna os registros dela"""
+        with SinkFragmentado(self, indice) as sink:
+            if sink.estado["linhas"]:
+                print(f"↪️  {fonte.nome}: retomando após {sink.estado['linhas']:,} linhas")
+            opcoes = fonte.opcoes_leitura()
+            if self.saida.tipos:
+                opcoes['dtype'] = dtypes_leitura(fonte.colunas, self.saida.tipos)
+            with fonte.abrir() as stream:
+                processar_em_streaming(stream, sink, enriquecer, tabelas, chunk_size, limite_memoria_mb,
+                                       desc=fonte.nome, mostrar_progresso=mostrar_progresso,
+                                       tipos=self.saida.tipos, pular=sink.estado["linhas"], **opcoes)
+        contar("bytes_lidos", fonte.tamanho)
+        return sink.registros
+
+    def limpar(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+
+class SinkFragmentado:
+    """Destino que grava uma fonte em fragmentos e confirma cada um no estado do checkpoint
+
+    O enriquecimento preserva as linhas, então as linhas gravadas em um
+    fragmento são as linhas de entrada que ele cobre.
+    """
+
+    def __init__(self, checkpoint, indice):
+        self.checkpoint = checkpoint
+        self.indice = indice
+        self.estado = checkpoint.estado(indice)
+        self.registros = self.estado["registros"]
+        self._sink = None
+        self._nome = None
+        self._linhas = 0
+
+    def __enter__(self):
+        return self
+
+    def escrever(self, chunk):
+        if self._sink is None:
+            self._nome = f"parte-{self.indice:05d}-{len(self.estado['fragmentos']):05d}"
+            self._sink = self.checkpoint.fragmento(self._nome).abrir().__enter__()
+        self._sink.escrever(chunk)
+        self._linhas += len(chunk)
+        self.registros += len(chunk)
+        if self._linhas >= self.checkpoint.linhas_por_fragmento:
+            self._confirmar()
+
+    def _confirmar(self):
+        self._sink.__exit__(None, None, None)
+        for caminho in self.checkpoint.fragmento(self._nome).arquivos().values():
+            _sincronizar(caminho)
+        self.estado["linhas"] += self._linhas
+        self.estado["registros"] = self.registros
+        self.estado["fragmentos"].append(self._nome)
+        self.checkpoint.gravar_estado(self.indice, self.estado)
+        self._sink, self._linhas = None, 0
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # O fragmento em andamento é descartado; a retomada refaz só essas linhas
+            if self._sink is not None:
+                self._sink.__exit__(exc_type, exc, tb)
+            return False
+        if self._sink is not None:
+            self._confirmar()
+        self.estado["concluida"] = True
+        self.checkpoint.gravar_estado(self.indice, self.estado)
+        return False
+
+
+def manifesto_consolidacao(caminho_saida):
+    caminho = Path(caminho_saida)
+    return caminho.with_name(f".{caminho.name}.checkpoint.json")
+
+
+def consolidacao_retomavel(caminho_saida):
+    """True se há uma consolidação interrompida cujas entradas ainda estão em disco
+
+    Nesse caso download e extração podem ser pulados na retomada: os zips já
+    foram apagados pela extração e os CSVs necessários continuam ao lado do final.
+    """
+    caminho = Path(caminho_saida)
+    estado = _ler_json(manifesto_consolidacao(caminho))
+    if not estado or not estado.get("entradas"):
+        return False
+    for nome, tamanho, *_ in estado["entradas"]:
+        entrada = caminho.parent / nome
+        if not entrada.exists() or entrada.stat().st_size != tamanho:
+            return False
+    return True
+
+
+class ConsolidacaoCsv:
+    """Checkpoint por arquivo da consolidação dos CSVs extraídos em Data/{entidade}_final.csv
+
+    Os chunks são acrescentados a {final}.parcial; ao concluir cada arquivo de
+    entrada o tamanho do parcial é registrado no manifesto. A retomada trunca
+    o parcial nesse ponto e pula os arquivos já concluídos. O CSV final só é
+    substituído (os.replace) no fim, então o da execução anterior continua
+    intacto até lá.
+
+    As entradas são identificadas por nome e tamanho, sem a data de
+    modificação: uma nova extração dos mesmos zips ainda casa com o manifesto.
+    """
+
+    def __init__(self, caminho_saida, arquivos, retomar=False):
+        self.caminho = Path(caminho_saida)
+        self.parcial = self.caminho.with_name(self.caminho.name + ".parcial")
+        self.manifesto = manifesto_consolidacao(self.caminho)
+
+        entradas = [[a.name, a.stat().st_size] for a in arquivos]
+        estado = _ler_json(self.manifesto) if retomar else None
+        if (estado and estado["entradas"] == entradas and self.parcial.exists()
+                and self.parcial.stat().st_size >= estado["bytes"]):
+            self.estado = estado
+            self.descartar()
+            print(f"♻️  Retomando {self.caminho.name}: {len(estado['concluidos'])}/{len(arquivos)} "
+                  f"arquivos já consolidados")
+            return
+
+        self.estado = {"entradas": entradas, "concluidos": [], "bytes": 0, "registros": 0}
+        self.parcial.unlink(missing_ok=True)
+        _gravar_json(self.manifesto, self.estado)
+
+    @property
+    def registros(self):
+        return self.estado["registros"]
+
+    def concluido(self, arquivo):
+        return Path(arquivo).name in self.estado["concluidos"]
+
+    def confirmar(self, arquivo, registros):
+        """Registra o arquivo de entrada como consolidado até o fim atual do parcial"""
+        if self.parcial.exists():
+            _sincronizar(self.parcial)
+            self.estado["bytes"] = self.parcial.stat().st_size
+        self.estado["concluidos"].append(Path(arquivo).name)
+        self.estado["registros"] += registros
+        _gravar_json(self.manifesto, self.estado)
+
+    def descartar(self):
+        """Remove do parcial o que foi gravado depois do último arquivo confirmado"""
+        if self.parcial.exists():
+            with open(self.parcial, 'r+b') as f:
+                f.truncate(self.estado["bytes"])
+
+    def finalizar(self):
+        if self.parcial.exists():
+            os.replace(self.parcial, self.caminho)
+        self.manifesto.unlink(missing_ok=True)
@@ -0,0 +1,147 @@
+"""
+Cubos analíticos pré-agregados, gerados uma vez por release
+
+Cada cubo agrupa uma entidade base pelas suas dimensões e guarda apenas
+medidas aditivas (contagens e somas), então qualquer GROUP BY sobre um
+subconjunto das dimensões é respondido somando as linhas do cubo, sem
+varrer os Parquets finais:
+
+    estabelecimentos      uf × município × CNAE principal × porte × situação × matriz/filial
+    estabelecimentos_uf   o mesmo sem município (agregado do anterior, bem menor)
+    empresas              porte × natureza jurídica × qualificação do responsável
+
+O capital social vem da empresa; nos cubos de estabelecimentos ele se repete
+em cada filial, então somas e médias de capital por empresa filtram
+identificador_matriz = 1. A média é reconstruída como soma / contagem.
+Os cubos ficam em database/cubos/<nome>.parquet (ver src/queries/cubos.py).
+"""
+
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.agendador import saidas_atualizadas
+from src.processors.dataset import parquet_final
+from src.processors.duckdb_engine import literal, conectar
+from src.schemas.empSchema import EMPRESAS_TIPOS
+from src.schemas.estabSchema import ESTABELECIMENTOS_TIPOS
+
+DIRETORIO_CUBOS = Path("database") / "cubos"
+
+# Relação consultada por cada entidade base; porte e capital vêm da empresa
+BASES = {
+    "estabelecimentos": "estabelecimentos LEFT JOIN empresas USING (cnpj_basico)",
+    "empresas": "empresas"
+}
+ENTIDADES_BASE = {
+    "estabelecimentos": ("estabelecimentos", "empresas"),
+    "empresas": ("empresas",)
+}
+
+# Medida: (expressão sobre a base, tipo); todas aditivas, agregadas com SUM no cubo
+MEDIDAS = {
+    "quantidade": ("COUNT(*)", "contagem"),
+    "capital_social_soma": ("SUM(capital_social)", "soma"),
+    "capital_social_contagem": ("COUNT(capital_social)", "contagem")
+}
+TIPOS_DUCKDB = {"contagem": "BIGINT", "soma": "DECIMAL(38,2)"}
+
+
+@dataclass(frozen=True)
+class Cubo:
+    """Agregação de uma entidade base por um conjunto de dimensões"""
+    base: str
+    dimensoes: tuple
+    origem: str = None  # cubo mais detalhado do qual este é agregado
+
+    @property
+    def tipos(self):
+        tipos = {**EMPRESAS_TIPOS, **ESTABELECIMENTOS_TIPOS}
+        return {**{d: tipos[d] for d in self.dimensoes}, **{m: tipo for m, (_, tipo) in MEDIDAS.items()}}
+
+    @property
+    def colunas(self):
+        return list(self.dimensoes) + list(MEDIDAS)
+
+
+CUBOS = {
+    "estabelecimentos": Cubo("estabelecimentos", ("uf", "municipio", "cnae_fiscal_principal", "porte_empresa",
+                                                  "situacao_cadastral", "identificador_matriz")),
+    "estabelecimentos_uf": Cubo("estabelecimentos", ("uf", "cnae_fiscal_principal", "porte_empresa",
+                                                     "situacao_cadastral", "identificador_matriz"),
+                                origem="estabelecimentos"),
+    "empresas": Cubo("empresas", ("porte_empresa", "natureza_juridica", "qualificacao_responsavel"))
+}
+
+
+def parquet_cubo(nome, diretorio=DIRETORIO_CUBOS):
+    return Path(diretorio) / f"{nome}.parquet"
+
+
+def consulta_cubo(nome, diretorio=DIRETORIO_CUBOS):
+    """SELECT que materializa o cubo a partir da base ou do cubo de origem"""
+    cubo = CUBOS[nome]
+    dimensoes = ", ".join(cubo.dimensoes)
+    if cubo.origem:
+        expressoes = {m: f"SUM({m})" for m in MEDIDAS}
+        relacao = f"read_parquet({literal(parquet_cubo(cubo.origem, diretorio))})"
+    else:
+        expressoes = {m: expressao for m, (expressao, _) in MEDIDAS.items()}
+        relacao = BASES[cubo.base]
+    medidas = ", ".join(f"CAST({expressoes[m]} AS {TIPOS_DUCKDB[tipo]}) AS {m}" for m, (_, tipo) in MEDIDAS.items())
+    return f"SELECT {dimensoes}, {medidas} FROM {relacao} GROUP BY ALL ORDER BY {dimensoes}"
+
+
+def gerar_cubos(nomes=None, diretorio=DIRETORIO_CUBOS, origem=Path("database"),
+                threads=None, limite_memoria_mb=None):
+    """Materializa os cubos a partir dos Parquets finais; retorna {nome: linhas}
+
+    Cubos agregados de outro são gerados depois da origem. Cada arquivo é
+    gravado em .tmp e renomeado, como os demais layouts da ETL.
+    """
+    nomes = [nome for nome in CUBOS if nome in (nomes or CUBOS)]
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    con = conectar(threads, limite_memoria_mb)
+    linhas = {}
+    try:
+        # Cubos ordenados pelas dimensões: filtros por UF/CNAE pulam row groups
+        con.execute("SET preserve_insertion_order = true")
+        for entidade in ("empresas", "estabelecimentos"):
+            arquivo = parquet_final(entidade, origem)
+            if arquivo.exists():
+                con.execute(f"CREATE VIEW {entidade} AS SELECT * FROM read_parquet({literal(arquivo)})")
+
+        for nome in nomes:
+            cubo = CUBOS[nome]
+            faltando = [e for e in ENTIDADES_BASE[cubo.base] if not parquet_final(e, origem).exists()]
+            if faltando:
+                print(f"⚠️  Cubo {nome} ignorado: faltam os Parquets de {', '.join(faltando)}")
+                continue
+            if cubo.origem and not parquet_cubo(cubo.origem, diretorio).exists():
+                print(f"⚠️  Cubo {nome} ignorado: cubo de origem {cubo.origem} não gerado")
+                continue
+
+            inicio = time.perf_counter()
+            destino = parquet_cubo(nome, diretorio)
+            temporario = destino.with_name(destino.name + ".tmp")
+            con.execute(f"""
+                COPY ({consulta_cubo(nome, diretorio)}) TO {literal(temporario)}
+                (FORMAT PARQUET, COMPRESSION ZSTD)
+            """)
+            os.replace(temporario, destino)
+            linhas[nome] = con.execute(f"SELECT COUNT(*) FROM read_parquet({literal(destino)})").fetchone()[0]
+            print(f"🧊 Cubo {nome}: {linhas[nome]:,} linhas ({time.perf_counter() - inicio:.1f}s)")
+    finally:
+        con.close()
+    return linhas
+
+
+def cubos_atualizados(nomes=None, diretorio=DIRETORIO_CUBOS, origem=Path("database")):
+    """True se todos os cubos existem e são mais novos que os Parquets finais"""
+    return saidas_atualizadas([parquet_final(e, origem) for e in ("empresas", "estabelecimentos")],
+                              [parquet_cubo(nome, diretorio) for nome in (nomes or CUBOS)])
@@ -0,0 +1,296 @@
+"""
+Layout físico dos Parquets finais para leitura seletiva
+
+Clusterização: os Parquets finais das três entidades são regravados ordenados
+por cnpj_basico, a chave de junção entre elas. Os min/max de cada row group
+ficam estreitos, então buscas e junções por cnpj_basico pulam a maior parte
+dos row groups. Opcionalmente os três são carregados em um banco DuckDB
+persistente (database/cnae.duckdb) com índices ART em cnpj_basico.
+
+Dataset particionado: o Parquet de estabelecimentos é regravado em
+database/dataset/estabelecimentos/uf=XX[/situacao_cadastral=YY]/parte-0.parquet,
+ordenado por cnpj_basico dentro de cada partição. Com isso:
+
+    - filtros por UF (e situação) descartam diretórios inteiros;
+    - os min/max de cnpj_basico por row group ficam estreitos, permitindo
+      pular row groups em buscas por CNPJ;
+    - as colunas de filtro (cnae, município, CEP) recebem bloom filter.
+
+A origem é lida e ordenada uma única vez (partições + ordenação) e o fluxo
+ordenado é cortado em um arquivo por partição. O COPY ... PARTITION_BY do
+DuckDB não foi usado porque, com várias threads, não preserva a ordem das
+linhas dentro de cada partição.
+
+Leitura:
+    duckdb: read_parquet('database/dataset/estabelecimentos/**/*.parquet', hive_partitioning=true)
+            (ou fonte_parquet("estabelecimentos"), que cai no Parquet final sem dataset atualizado)
+    pyarrow: pyarrow.dataset.dataset('database/dataset/estabelecimentos', partitioning='hive')
+"""
+
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.agendador import saidas_atualizadas
+from src.processors.duckdb_engine import literal, conectar
+
+DIRETORIO_DATASET = Path("database") / "dataset"
+BANCO_DUCKDB = Path("database") / "cnae.duckdb"
+
+# Partições e ordenação de cada entidade; a situação é uma partição opcional
+PARTICOES = {
+    "estabelecimentos": ["uf"]
+}
+PARTICOES_OPCIONAIS = {
+    "estabelecimentos": ["situacao_cadastral"]
+}
+# Colunas com bloom filter no dataset (filtros de igualdade fora das partições)
+COLUNAS_BLOOM = {
+    "estabelecimentos": ["cnae_fiscal_principal", "municipio", "cep"]
+}
+# Todas as entidades são clusterizadas pela chave de junção cnpj_basico
+ORDENACAO = {
+    "empresas": ["cnpj_basico"],
+    "estabelecimentos": ["cnpj_basico", "CNPJ"],
+    "socios": ["cnpj_basico"]
+}
+
+# Múltiplo de 2048 (tamanho de vetor do DuckDB); ~120 mil linhas por row group
+LINHAS_POR_ROW_GROUP = 122880
+FALSO_POSITIVO_BLOOM = 0.01
+
+# Nome usado pelo Hive (e reconhecido por DuckDB/pyarrow) para partição nula
+PARTICAO_NULA = "__HIVE_DEFAULT_PARTITION__"
+
+
+def parquet_final(entidade, diretorio=Path("database")):
+    return Path(diretorio) / f"{entidade}_final.parquet"
+
+
+def _opcoes_copy(linhas_por_row_group, falso_positivo_bloom):
+    return (f"FORMAT PARQUET, COMPRESSION ZSTD, ROW_GROUP_SIZE {int(linhas_por_row_group)}, "
+            f"BLOOM_FILTER_FALSE_POSITIVE_RATIO {float(falso_positivo_bloom)}")
+
+
+def clusterizar_parquet(entidade, arquivo=None, linhas_por_row_group=LINHAS_POR_ROW_GROUP,
+                        falso_positivo_bloom=FALSO_POSITIVO_BLOOM, threads=None, limite_memoria_mb=None):
+    """Regrava o Parquet final da entidade ordenado por cnpj_basico; retorna as linhas"""
+    arquivo = Path(arquivo or parquet_final(entidade))
+    if not arquivo.exists():
+        print(f"❌ Arquivo não encontrado: {arquivo}")
+        return None
+
+    ordenacao = ORDENACAO[entidade]
+    temporario = arquivo.with_suffix(".parquet.tmp")
+    print(f"🔃 Ordenando {arquivo.name} por {', '.join(ordenacao)}...")
+    inicio = time.perf_counter()
+    con = conectar(threads, limite_memoria_mb)
+    try:
+        con.execute("SET preserve_insertion_order = true")
+        con.execute(f"""
+            COPY (SELECT * FROM read_parquet({literal(arquivo)}) ORDER BY {', '.join(ordenacao)})
+            TO {literal(temporario)} ({_opcoes_copy(linhas_por_row_group, falso_positivo_bloom)})
+        """)
+    finally:
+        con.close()
+    os.replace(temporario, arquivo)
+
+    metadados = pq.ParquetFile(arquivo).metadata
+    print(f"✅ {metadados.num_rows:,} linhas em {metadados.num_row_groups} row groups "
+          f"({time.perf_counter() - inicio:.1f}s)")
+    return metadados.num_rows
+
+
+def esta_clusterizado(arquivo, coluna="cnpj_basico"):
+    """True se os row groups do Parquet estão em ordem crescente de coluna (pelos min/max)"""
+    metadados = pq.ParquetFile(arquivo).metadata
+    indice = metadados.schema.names.index(coluna)
+    anterior = None
+    for i in range(metadados.num_row_groups):
+        estatisticas = metadados.row_group(i).column(indice).statistics
+        if estatisticas is None or not estatisticas.has_min_max:
+            return False
+        if anterior is not None and estatisticas.min < anterior:
+            return False
+        anterior = estatisticas.max
+    return True
+
+
+def criar_banco_duckdb(entidades=None, banco=BANCO_DUCKDB, diretorio=Path("database"),
+                       threads=None, limite_memoria_mb=None):
+    """Carrega os Parquets finais em um banco DuckDB persistente com índice em cnpj_basico
+
+    As tabelas são inseridas na ordem de cnpj_basico, o que mantém os zonemaps
+    do DuckDB estreitos; o índice ART atende as buscas pontuais por CNPJ.
+    """
+    banco = Path(banco)
+    temporario = banco.with_name(banco.name + ".tmp")
+    if temporario.exists():
+        temporario.unlink()
+
+    con = duckdb.connect(str(temporario))
+    try:
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+        if limite_memoria_mb:
+            con.execute(f"SET memory_limit = '{int(limite_memoria_mb)}MB'")
+        for entidade in entidades or ORDENACAO:
+            arquivo = parquet_final(entidade, diretorio)
+            if not arquivo.exists():
+                print(f"⚠️  {arquivo} não encontrado, {entidade} fica fora do banco")
+                continue
+            inicio = time.perf_counter()
+            con.execute(f"CREATE TABLE {entidade} AS SELECT * FROM read_parquet({literal(arquivo)}) "
+                        f"ORDER BY {', '.join(ORDENACAO[entidade])}")
+            con.execute(f"CREATE INDEX idx_{entidade}_cnpj_basico ON {entidade} (cnpj_basico)")
+            linhas = con.execute(f"SELECT COUNT(*) FROM {entidade}").fetchone()[0]
+            print(f"🦆 {entidade}: {linhas:,} linhas e índice em cnpj_basico ({time.perf_counter() - inicio:.1f}s)")
+        con.execute("CHECKPOINT")
+    finally:
+        con.close()
+
+    os.replace(temporario, banco)
+    print(f"✅ Banco DuckDB criado em: {banco}")
+    return banco
+
+
+def diretorio_dataset(entidade, diretorio=DIRETORIO_DATASET):
+    return Path(diretorio) / entidade
+
+
+def glob_dataset(entidade, diretorio=DIRETORIO_DATASET):
+    """Padrão de arquivos do dataset, para read_parquet(..., hive_partitioning=true)"""
+    return str(diretorio_dataset(entidade, diretorio) / "**" / "*.parquet")
+
+
+def fonte_parquet(entidade, diretorio=Path("database")):
+    """Expressão read_parquet(...) da entidade para consultas SQL
+
+    Usa o dataset particionado (diretorio/dataset/) se ele existe e é mais
+    novo que o Parquet final; senão, o próprio Parquet final.
+    """
+    final = parquet_final(entidade, diretorio)
+    dataset = Path(diretorio) / "dataset"
+    if saidas_atualizadas([final], [diretorio_dataset(entidade, dataset)]):
+        # Colunas de partição como texto, iguais às do Parquet final ('02', e não 2)
+        return (f"read_parquet({literal(glob_dataset(entidade, dataset))}, "
+                f"hive_partitioning = true, hive_types_autocast = false)")
+    return f"read_parquet({literal(final)})"
+
+
+def _nome_particao(coluna, valor):
+    return f"{coluna}={PARTICAO_NULA if valor is None else valor}"
+
+
+def _trechos(lote, particoes):
+    """[(valores, início, fim)] das sequências de linhas da mesma partição em um lote ordenado"""
+    mudancas = np.zeros(lote.num_rows, dtype=bool)
+    mudancas[0] = True
+    for coluna in particoes:
+        valores = pc.fill_null(pc.cast(lote.column(coluna), pa.string()), PARTICAO_NULA)
+        valores = valores.to_numpy(zero_copy_only=False)
+        mudancas[1:] |= valores[1:] != valores[:-1]
+    inicios = np.flatnonzero(mudancas).tolist()
+    return [(tuple(lote.column(coluna)[inicio].as_py() for coluna in particoes), inicio, fim)
+            for inicio, fim in zip(inicios, inicios[1:] + [lote.num_rows])]
+
+
+class _ArquivoParticao:
+    """Parquet de uma partição, gravado em row groups de exatamente linhas_por_row_group linhas"""
+
+    def __init__(self, caminho, esquema, linhas_por_row_group, bloom):
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = pq.ParquetWriter(caminho, esquema, compression="zstd", bloom_filter_options=bloom)
+        self._esquema = esquema
+        self._linhas = linhas_por_row_group
+        self._pendentes = []
+        self._contagem = 0
+
+    def escrever(self, lote):
+        self._pendentes.append(lote)
+        self._contagem += lote.num_rows
+        if self._contagem >= self._linhas:
+            tabela = pa.Table.from_batches(self._pendentes, self._esquema)
+            completas = tabela.num_rows - tabela.num_rows % self._linhas
+            self._writer.write_table(tabela.slice(0, completas), row_group_size=self._linhas)
+            self._pendentes = tabela.slice(completas).to_batches()
+            self._contagem = tabela.num_rows - completas
+
+    def fechar(self):
+        if self._contagem:
+            self._writer.write_table(pa.Table.from_batches(self._pendentes, self._esquema),
+                                     row_group_size=self._linhas)
+        self._writer.close()
+
+
+def escrever_dataset(entidade="estabelecimentos", origem=None, diretorio=DIRETORIO_DATASET,
+                     por_situacao=False, linhas_por_row_group=LINHAS_POR_ROW_GROUP,
+                     falso_positivo_bloom=FALSO_POSITIVO_BLOOM, threads=None, limite_memoria_mb=None):
+    """Grava o dataset particionado da entidade; retorna o número de partições
+
+    A origem é lida e ordenada uma vez; o dataset é montado em um diretório
+    temporário e só substitui o anterior quando completo.
+    """
+    origem = Path(origem or parquet_final(entidade))
+    if not origem.exists():
+        print(f"❌ Arquivo não encontrado: {origem}")
+        return None
+
+    particoes = PARTICOES[entidade] + (PARTICOES_OPCIONAIS.get(entidade, []) if por_situacao else [])
+    destino = diretorio_dataset(entidade, diretorio)
+    temporario = destino.with_name(destino.name + ".tmp")
+    if temporario.exists():
+        shutil.rmtree(temporario)
+
+    print(f"🗂️  Particionando {entidade} por {', '.join(particoes)} "
+          f"(ordenado por {', '.join(ORDENACAO[entidade])})...")
+    inicio = time.perf_counter()
+    con = conectar(threads, limite_memoria_mb)
+    try:
+        leitor = con.execute(f"""
+            SELECT * FROM read_parquet({literal(origem)})
+            ORDER BY {', '.join(particoes + ORDENACAO[entidade])}
+        """).fetch_record_batch(linhas_por_row_group)
+        # As colunas de partição ficam só no caminho, como no layout Hive
+        colunas = [nome for nome in leitor.schema.names if nome not in particoes]
+        esquema = pa.schema([leitor.schema.field(nome) for nome in colunas])
+        bloom = {coluna: {"ndv": int(linhas_por_row_group), "fpp": float(falso_positivo_bloom)}
+                 for coluna in COLUNAS_BLOOM.get(entidade, []) if coluna in colunas} or None
+        arquivo, atual, combinacoes = None, None, 0
+        for lote in leitor:
+            for valores, comeco, fim in _trechos(lote, particoes):
+                if valores != atual:
+                    if arquivo is not None:
+                        arquivo.fechar()
+                    pasta = temporario.joinpath(*(_nome_particao(c, v) for c, v in zip(particoes, valores)))
+                    arquivo = _ArquivoParticao(pasta / "parte-0.parquet", esquema, linhas_por_row_group, bloom)
+                    atual, combinacoes = valores, combinacoes + 1
+                arquivo.escrever(lote.slice(comeco, fim - comeco).select(colunas))
+        if arquivo is not None:
+            arquivo.fechar()
+    finally:
+        con.close()
+
+    if destino.exists():
+        antigo = destino.with_name(destino.name + ".antigo")
+        os.replace(destino, antigo)
+        os.replace(temporario, destino)
+        shutil.rmtree(antigo)
+    else:
+        os.replace(temporario, destino)
+
+    arquivos = list(destino.rglob("*.parquet"))
+    row_groups = sum(pq.ParquetFile(arquivo).num_row_groups for arquivo in arquivos)
+    tamanho = sum(arquivo.stat().st_size for arquivo in arquivos) / (1024**2)
+    print(f"✅ {combinacoes} partições, {row_groups} row groups, {tamanho:.1f}MB "
+          f"em {time.perf_counter() - inicio:.1f}s → {destino}")
+    return combinacoes
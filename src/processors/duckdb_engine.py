@@ -0,0 +1,168 @@
+"""
+Engine de enriquecimento em DuckDB: cada entidade é enriquecida por uma única
+consulta SQL com LEFT JOINs contra as tabelas auxiliares, executada fora da
+memória (out-of-core), em múltiplas threads e com diretório de spill
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import duckdb
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from src.processors.auxiliares import DIRETORIO_AUXILIAR
+from src.processors.fontes import FaixaCsv, MembroZip
+from src.processors.metricas import contar
+from src.processors.referencia import abrir_referencia
+from src.schemas.tipos import PADRAO_INTEIRO, tipo_base
+
+TAMANHO_BLOCO_ARROW = 16 * 1024 ** 2
+
+
+def literal(valor):
+    """Valor (texto, caminho...) como literal de string SQL, com aspas simples escapadas"""
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def conectar(threads=None, limite_memoria_mb=None, diretorio_temp=None):
+    """Abre uma conexão DuckDB configurada para processamento fora da memória"""
+    con = duckdb.connect()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    if limite_memoria_mb:
+        con.execute(f"SET memory_limit = '{int(limite_memoria_mb)}MB'")
+    diretorio_temp = diretorio_temp or Path(tempfile.gettempdir()) / "cnae_duckdb_spill"
+    con.execute(f"SET temp_directory = {literal(diretorio_temp)}")
+    # A ordem das linhas não é garantida após os joins; liberar a ordem reduz memória
+    con.execute("SET preserve_insertion_order = false")
+    # Consultas longas não desenham a barra de progresso no meio das mensagens do ETL
+    con.execute("SET enable_progress_bar = false")
+    return con
+
+
+def registrar_auxiliares(con, enriquecimento, diretorio=DIRETORIO_AUXILIAR):
+    """Cria uma tabela DuckDB (codigo, descricao) para cada auxiliar usada, a partir da referência compilada"""
+    referencia = abrir_referencia(diretorio)
+    for tabela in {tabela for _, tabela, _ in enriquecimento}:
+        codigos, descricoes = zip(*referencia.tabela(tabela).itens())
+        itens = pa.table({"codigo": pa.array(codigos, pa.string()), "descricao": pa.array(descricoes, pa.string())})
+        con.register("_auxiliar", itens)
+        con.execute(f"CREATE OR REPLACE TABLE {tabela} AS SELECT * FROM _auxiliar")
+        con.unregister("_auxiliar")
+
+
+def _leitor_arrow_zip(fontes):
+    """RecordBatchReader que percorre em sequência os membros zip, decodificando latin1"""
+    colunas = fontes[0].colunas
+    schema = pa.schema([(coluna, pa.string()) for coluna in colunas])
+
+    def lotes():
+        for fonte in fontes:
+            with fonte.abrir() as stream:
+                leitor = pa_csv.open_csv(
+                    stream,
+                    read_options=pa_csv.ReadOptions(column_names=colunas, encoding='latin1',
+                                                    block_size=TAMANHO_BLOCO_ARROW),
+                    parse_options=pa_csv.ParseOptions(delimiter=';',
+                                                      invalid_row_handler=lambda linha: 'skip'),
+                    convert_options=pa_csv.ConvertOptions(column_types=schema,
+                                                          strings_can_be_null=True),
+                )
+                for lote in leitor:
+                    yield lote
+
+    return pa.RecordBatchReader.from_batches(schema, lotes())
+
+
+def registrar_fontes(con, fontes):
+    """Expõe as fontes como a relação 'fonte' dentro da conexão"""
+    if all(isinstance(fonte, FaixaCsv) for fonte in fontes):
+        arquivos = sorted({str(fonte.caminho) for fonte in fontes})
+        lista = "[" + ", ".join(literal(a) for a in arquivos) + "]"
+        con.execute(f"""
+            CREATE OR REPLACE VIEW fonte AS
+            SELECT * FROM read_csv({lista}, delim=';', header=true, all_varchar=true)
+        """)
+    elif all(isinstance(fonte, MembroZip) for fonte in fontes):
+        con.register("fonte", _leitor_arrow_zip(fontes))
+    else:
+        raise ValueError("Fontes mistas (CSV e zip) não são suportadas pela engine DuckDB")
+
+
+def _expressao_tipada(coluna, tipo):
+    nome, largura = tipo_base(tipo)
+    if nome == "data":
+        return f"CAST(try_strptime(t.{coluna}, '%Y%m%d') AS DATE) AS {coluna}"
+    if nome == "decimal":
+        return f"TRY_CAST(REPLACE(t.{coluna}, ',', '.') AS DECIMAL(18,2)) AS {coluna}"
+    if nome == "inteiro":
+        return (f"CASE WHEN regexp_full_match(t.{coluna}, {literal(PADRAO_INTEIRO.strip('^$'))}) "
+                f"THEN CAST(t.{coluna} AS SMALLINT) END AS {coluna}")
+    if nome == "codigo" and largura:
+        return f"lpad(t.{coluna}, CAST(greatest(length(t.{coluna}), {largura}) AS INTEGER), '0') AS {coluna}"
+    return f"t.{coluna}"
+
+
+def montar_consulta(colunas, tipos, enriquecimento, calculadas=None):
+    """Monta o SELECT de enriquecimento de uma entidade sobre a relação 'fonte'"""
+    tipos = tipos or {}
+    selecao = [_expressao_tipada(coluna, tipos.get(coluna, "texto")) for coluna in colunas]
+    selecao += [f"{expressao} AS {nome}" for nome, expressao in (calculadas or {}).items()]
+
+    joins = []
+    for i, (coluna, tabela, destino) in enumerate(enriquecimento):
+        selecao.append(f"a{i}.descricao AS {destino}")
+        joins.append(f"LEFT JOIN {tabela} a{i} ON t.{coluna} = a{i}.codigo")
+
+    return ("SELECT " + ",\n       ".join(selecao) +
+            "\nFROM fonte t\n" + "\n".join(joins))
+
+
+def enriquecer_com_duckdb(fontes, saida, colunas, tipos, enriquecimento, calculadas=None,
+                          threads=None, limite_memoria_mb=None):
+    """Executa o enriquecimento de uma entidade em DuckDB; retorna o total de registros
+
+    A consulta é uma unidade só: as saídas são gravadas em .tmp e renomeadas
+    juntas ao final, sem checkpoints intermediários.
+    """
+    con = conectar(threads, limite_memoria_mb)
+    finais = saida.arquivos()
+    arquivos = {formato: caminho.with_name(caminho.name + ".tmp") for formato, caminho in finais.items()}
+    try:
+        registrar_auxiliares(con, enriquecimento)
+        registrar_fontes(con, fontes)
+
+        consulta = montar_consulta(colunas, tipos, enriquecimento, calculadas)
+        for caminho in arquivos.values():
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+
+        if 'parquet' in arquivos:
+            con.execute(f"""
+                COPY ({consulta}) TO {literal(arquivos['parquet'])}
+                (FORMAT PARQUET, COMPRESSION ZSTD, ROW_GROUP_SIZE {saida.row_group_size})
+            """)
+            origem_csv = f"SELECT * FROM read_parquet({literal(arquivos['parquet'])})"
+            total = con.execute(f"SELECT COUNT(*) FROM read_parquet({literal(arquivos['parquet'])})").fetchone()[0]
+        else:
+            origem_csv = consulta
+            total = None
+
+        if 'csv' in arquivos:
+            con.execute(f"COPY ({origem_csv}) TO {literal(arquivos['csv'])} (HEADER, DELIMITER ';')")
+            if total is None:
+                total = con.execute(
+                    f"SELECT COUNT(*) FROM read_csv({literal(arquivos['csv'])}, delim=';', header=true)"
+                ).fetchone()[0]
+
+        contar("bytes_lidos", sum(fonte.tamanho for fonte in fontes))
+        contar("bytes_gravados", sum(caminho.stat().st_size for caminho in arquivos.values()))
+        con.close()
+        for formato, caminho in arquivos.items():
+            os.replace(caminho, finais[formato])
+        return total
+    finally:
+        con.close()
+        for caminho in arquivos.values():
+            caminho.unlink(missing_ok=True)
@@ -1,50 +1,67 @@
-import pandas as pd
-import os
-from tqdm import tqdm
 from pathlib import Path
 import sys
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
-from src.schemas.empSchema import EMPRESAS_SCHEMA
+from src.schemas.empSchema import EMPRESAS_SCHEMA, EMPRESAS_TIPOS, EMPRESAS_ENRIQUECIMENTO
+from src.processors.auxiliares import carregar_auxiliares, aplicar_enriquecimento
+from src.processors.fontes import dividir_em_faixas, membros_zip
+from src.processors.paralelo import executar_enriquecimento
+from src.processors.duckdb_engine import enriquecer_com_duckdb
+from src.processors.streaming import Saida
 
-def empresasConstructor(chunk_size=100000):
-    """Processa e enriquece dados de empresas"""
+def carregar_tabelas_empresas(compilar=True):
+    """Carrega as tabelas auxiliares usadas no enriquecimento de empresas"""
+    return carregar_auxiliares(EMPRESAS_ENRIQUECIMENTO, compilar=compilar)
+
+def enriquecer_empresas(chunk, tabelas):
+    """Enriquece um chunk de empresas com porte e natureza jurídica"""
+    return aplicar_enriquecimento(chunk, tabelas, EMPRESAS_ENRIQUECIMENTO)
+
+def empresasConstructor(chunk_size=100000, limite_memoria_mb=None, workers=1, origem='csv',
+                        csv=False, engine='pandas', retomar=False):
+    """Processa e enriquece dados de empresas
+
+    origem='csv' lê Data/empresas_final.csv; origem='zip' lê os membros .EMPRECSV
+    diretamente dos zips baixados, sem extraí-los. A saída é gravada em
+    Parquet tipado (database/empresas_final.parquet); csv=True gera também o CSV.
+    engine='duckdb' executa o enriquecimento como uma única consulta SQL.
+    retomar=True continua do último checkpoint de uma execução interrompida.
+    """
     input_directory = Path("Data")
     csv_file = input_directory / "empresas_final.csv"
-    natureza_path = Path("Auxiliar") / "naturezas.csv"
-    output_path = Path("database") / "empresas_final.csv"
+    saida = Saida(Path("database") / "empresas_final", EMPRESAS_TIPOS, csv=csv)
     
-    if not csv_file.exists():
+    if origem == 'zip':
+        fontes = membros_zip(input_directory, "Empresas", ".EMPRECSV", EMPRESAS_SCHEMA)
+        if not fontes:
+            print(f"❌ Nenhum arquivo .EMPRECSV encontrado nos zips de {input_directory}")
+            return
+    elif not csv_file.exists():
         print(f"❌ Arquivo não encontrado: {csv_file}")
         return
+    else:
+        fontes = dividir_em_faixas(csv_file, workers * 4)
     
     try:
-        porte = pd.DataFrame({
-            "id_porte": ["00", "01", "03", "05"],
-            "descricao_porte": ["NÃO INFORMADO", "MICRO EMPRESA", "EMPRESA DE PEQUENO PORTE", "DEMAIS"]
-        })
-        
-        natureza = pd.read_csv(natureza_path, sep=';', encoding='utf-8', dtype=str)
-        
-        output_path.parent.mkdir(exist_ok=True)
-        
         print("📊 Processando empresas...")
         
-        chunk_list = []
-        for chunk in tqdm(pd.read_csv(csv_file, sep=';', chunksize=chunk_size, dtype=str), 
-                         desc="Processando chunks"):
-            
-            chunk = chunk.merge(porte, left_on='porte_empresa', right_on='id_porte', how='left')
-            chunk = chunk.merge(natureza, left_on='natureza_juridica', right_on='codigo', how='left')
-            chunk_list.append(chunk)
-        
-        df_final = pd.concat(chunk_list, ignore_index=True)
-        df_final.to_csv(output_path, index=False, sep=';', encoding='utf-8')
+        if engine == 'duckdb':
+            total = enriquecer_com_duckdb(fontes, saida, EMPRESAS_SCHEMA, EMPRESAS_TIPOS, EMPRESAS_ENRIQUECIMENTO,
+                                          threads=workers if workers > 1 else None,
+                                          limite_memoria_mb=limite_memoria_mb)
+        else:
+            total = executar_enriquecimento(fontes, saida, carregar_tabelas_empresas,
+                                            enriquecer_empresas, workers, chunk_size, limite_memoria_mb,
+                                            retomar=retomar)
         
-        print(f"✅ Arquivo processado salvo: {output_path}")
-        print(f"📊 Total de registros: {len(df_final):,}")
+        for caminho in saida.arquivos().values():
+            print(f"✅ Arquivo processado salvo: {caminho}")
+        print(f"📊 Total de registros: {total:,}")
+        return total
         
     except Exception as e:
         print(f"❌ Erro durante processamento: {e}")
+        if engine != 'duckdb':
+            print("💾 Fragmentos já confirmados foram mantidos; rode novamente com --resume para continuar")
         import traceback
         traceback.print_exc()
@@ -1,56 +1,70 @@
-import pandas as pd
-import os
-from tqdm import tqdm
 from pathlib import Path
 import sys
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
-from src.schemas.estabSchema import ESTABELECIMENTOS_SCHEMA
+from src.schemas.estabSchema import ESTABELECIMENTOS_SCHEMA, ESTABELECIMENTOS_TIPOS, ESTABELECIMENTOS_ENRIQUECIMENTO
+from src.processors.auxiliares import carregar_auxiliares, aplicar_enriquecimento
+from src.processors.fontes import dividir_em_faixas, membros_zip
+from src.processors.paralelo import executar_enriquecimento
+from src.processors.duckdb_engine import enriquecer_com_duckdb
+from src.processors.streaming import Saida
 
-def estabelecimentoConstructor(chunk_size=100000):
-    """Processa e enriquece dados de estabelecimentos"""
+def carregar_tabelas_estabelecimentos(compilar=True):
+    """Carrega as tabelas auxiliares usadas no enriquecimento de estabelecimentos"""
+    return carregar_auxiliares(ESTABELECIMENTOS_ENRIQUECIMENTO, compilar=compilar)
+
+def enriquecer_estabelecimentos(chunk, tabelas):
+    """Monta o CNPJ completo e enriquece um chunk de estabelecimentos"""
+    chunk['CNPJ'] = chunk['cnpj_basico'] + chunk['cnpj_ordem'] + chunk['cnpj_dv']
+    return aplicar_enriquecimento(chunk, tabelas, ESTABELECIMENTOS_ENRIQUECIMENTO)
+
+def estabelecimentoConstructor(chunk_size=100000, limite_memoria_mb=None, workers=1, origem='csv',
+                               csv=False, engine='pandas', retomar=False):
+    """Processa e enriquece dados de estabelecimentos
+
+    origem='csv' lê Data/estabelecimentos_final.csv; origem='zip' lê os membros .ESTABELE
+    diretamente dos zips baixados, sem extraí-los. A saída é gravada em
+    Parquet tipado (database/estabelecimentos_final.parquet); csv=True gera também o CSV.
+    engine='duckdb' executa o enriquecimento como uma única consulta SQL.
+    retomar=True continua do último checkpoint de uma execução interrompida.
+    """
     input_directory = Path("Data")
     csv_file = input_directory / "estabelecimentos_final.csv"
-    municipios_path = Path("Auxiliar") / "municipios.csv"
-    cnaes_path = Path("Auxiliar") / "cnaes.csv"
-    paises_path = Path("Auxiliar") / "paises.csv"
-    motivos_path = Path("Auxiliar") / "motivos.csv"
-    output_path = Path("database") / "estabelecimentos_final.csv"
+    saida = Saida(Path("database") / "estabelecimentos_final", ESTABELECIMENTOS_TIPOS, csv=csv)
     
-    if not csv_file.exists():
+    if origem == 'zip':
+        fontes = membros_zip(input_directory, "Estabelecimentos", ".ESTABELE", ESTABELECIMENTOS_SCHEMA)
+        if not fontes:
+            print(f"❌ Nenhum arquivo .ESTABELE encontrado nos zips de {input_directory}")
+            return
+    elif not csv_file.exists():
         print(f"❌ Arquivo não encontrado: {csv_file}")
         return
+    else:
+        fontes = dividir_em_faixas(csv_file, workers * 4)
     
     try:
-        municipios = pd.read_csv(municipios_path, sep=';', encoding='utf-8', dtype=str)
-        cnaes = pd.read_csv(cnaes_path, sep=';', encoding='utf-8', dtype=str)
-        paises = pd.read_csv(paises_path, sep=';', encoding='utf-8', dtype=str)
-        motivos = pd.read_csv(motivos_path, sep=';', encoding='utf-8', dtype=str)
-        
-        output_path.parent.mkdir(exist_ok=True)
-        
         print("🏢 Processando estabelecimentos...")
         
-        chunk_list = []
-        for chunk in tqdm(pd.read_csv(csv_file, sep=';', chunksize=chunk_size, dtype=str), 
-                         desc="Processando chunks"):
-            
-            chunk['CNPJ'] = chunk['cnpj_basico'] + chunk['cnpj_ordem'] + chunk['cnpj_dv']
-            
-            chunk = chunk.merge(municipios, left_on='municipio', right_on='codigo', how='left')
-            chunk = chunk.merge(cnaes, left_on='cnae_fiscal_principal', right_on='codigo', how='left')
-            chunk = chunk.merge(paises, left_on='pais', right_on='codigo', how='left')
-            chunk = chunk.merge(motivos, left_on='motivo_situacao_cadastral', right_on='codigo', how='left')
-            
-            chunk_list.append(chunk)
-        
-        df_final = pd.concat(chunk_list, ignore_index=True)
-        df_final.to_csv(output_path, index=False, sep=';', encoding='utf-8')
+        if engine == 'duckdb':
+            total = enriquecer_com_duckdb(fontes, saida, ESTABELECIMENTOS_SCHEMA, ESTABELECIMENTOS_TIPOS,
+                                          ESTABELECIMENTOS_ENRIQUECIMENTO,
+                                          calculadas={'CNPJ': "t.cnpj_basico || t.cnpj_ordem || t.cnpj_dv"},
+                                          threads=workers if workers > 1 else None,
+                                          limite_memoria_mb=limite_memoria_mb)
+        else:
+            total = executar_enriquecimento(fontes, saida, carregar_tabelas_estabelecimentos,
+                                            enriquecer_estabelecimentos, workers, chunk_size, limite_memoria_mb,
+                                            retomar=retomar)
         
-        print(f"✅ Arquivo processado salvo: {output_path}")
-        print(f"📊 Total de registros: {len(df_final):,}")
+        for caminho in saida.arquivos().values():
+            print(f"✅ Arquivo processado salvo: {caminho}")
+        print(f"📊 Total de registros: {total:,}")
+        return total
         
     except Exception as e:
         print(f"❌ Erro durante processamento: {e}")
+        if engine != 'duckdb':
+            print("💾 Fragmentos já confirmados foram mantidos; rode novamente com --resume para continuar")
         import traceback
         traceback.print_exc()
@@ -0,0 +1,187 @@
+"""
+Fontes de entrada do enriquecimento: faixas de um CSV consolidado ou
+membros dos zips da Receita Federal lidos diretamente, sem extração
+"""
+
+import csv
+import io
+import re
+import zipfile
+from pathlib import Path
+
+# Sufixo _AAAA_MM gravado pelo downloader no nome de cada zip
+PADRAO_RELEASE = re.compile(r"_(\d{4})_(\d{2})\.zip$", re.IGNORECASE)
+
+# Entradas de cada entidade em Data/: CSV consolidado, prefixo dos zips e sufixo dos membros
+ENTRADAS = {
+    "empresas": ("empresas_final.csv", "Empresas", ".EMPRECSV"),
+    "estabelecimentos": ("estabelecimentos_final.csv", "Estabelecimentos", ".ESTABELE"),
+    "socios": ("socios_final.csv", "Socios", ".SOCIOCSV")
+}
+
+
+class LeitorFaixa(io.RawIOBase):
+    """Arquivo binário somente leitura que expõe apenas os bytes [inicio, fim)"""
+
+    def __init__(self, caminho, inicio, fim):
+        super().__init__()
+        self._arquivo = open(caminho, 'rb')
+        self._arquivo.seek(inicio)
+        self._restante = fim - inicio
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        tamanho = min(len(buffer), self._restante)
+        if tamanho <= 0:
+            return 0
+        lidos = self._arquivo.readinto(memoryview(buffer)[:tamanho])
+        self._restante -= lidos
+        return lidos
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+
+class FaixaCsv:
+    """Faixa de bytes de um CSV consolidado (UTF-8, já com schema aplicado)"""
+
+    def __init__(self, caminho, inicio, fim, colunas):
+        self.caminho = Path(caminho)
+        self.inicio = inicio
+        self.fim = fim
+        self.colunas = colunas
+
+    @property
+    def nome(self):
+        return f"{self.caminho.name}[{self.inicio}:{self.fim}]"
+
+    @property
+    def tamanho(self):
+        return self.fim - self.inicio
+
+    @property
+    def assinatura(self):
+        """Identifica a fonte e a versão do arquivo de origem (usada pelos checkpoints)"""
+        return [self.nome, self.tamanho, self.caminho.stat().st_mtime_ns]
+
+    def abrir(self):
+        return io.BufferedReader(LeitorFaixa(self.caminho, self.inicio, self.fim))
+
+    def opcoes_leitura(self):
+        return {'header': None, 'names': self.colunas, 'encoding': 'utf-8'}
+
+
+class MembroZip:
+    """Arquivo de dados dentro de um zip da Receita, descomprimido sob demanda"""
+
+    def __init__(self, zip_path, membro, colunas):
+        self.zip_path = Path(zip_path)
+        self.membro = membro
+        self.colunas = colunas
+
+    @property
+    def nome(self):
+        return f"{self.zip_path.name}:{self.membro}"
+
+    @property
+    def tamanho(self):
+        """Bytes descomprimidos do membro"""
+        with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
+            return zip_ref.getinfo(self.membro).file_size
+
+    @property
+    def assinatura(self):
+        """Identifica a fonte e a versão do zip de origem (usada pelos checkpoints)"""
+        with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
+            info = zip_ref.getinfo(self.membro)
+        return [self.nome, info.file_size, info.CRC]
+
+    def abrir(self):
+        # O zip continua aberto enquanto o membro retornado não for fechado
+        with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
+            return zip_ref.open(self.membro)
+
+    def opcoes_leitura(self):
+        return {'header': None, 'names': self.colunas, 'encoding': 'latin1',
+                'on_bad_lines': 'skip'}
+
+
+def ler_cabecalho(csv_file, sep=';', encoding='utf-8'):
+    """Retorna as colunas e o tamanho em bytes da linha de cabeçalho"""
+    with open(csv_file, 'rb') as f:
+        linha = f.readline()
+    colunas = next(csv.reader([linha.decode(encoding)], delimiter=sep))
+    return colunas, len(linha)
+
+
+def dividir_em_faixas(csv_file, partes):
+    """Divide um CSV com cabeçalho em FaixaCsv alinhadas a quebras de linha
+
+    Assume que os campos não contêm quebras de linha, como nos arquivos
+    da Receita Federal e nos CSVs consolidados gerados pelo ETL.
+    """
+    colunas, inicio = ler_cabecalho(csv_file)
+    tamanho = Path(csv_file).stat().st_size
+    passo = max(1, (tamanho - inicio) // max(1, partes))
+
+    limites = [inicio]
+    with open(csv_file, 'rb') as f:
+        for i in range(1, partes):
+            posicao = inicio + i * passo
+            if posicao <= limites[-1] or posicao >= tamanho:
+                continue
+            f.seek(posicao)
+            f.readline()
+            posicao = f.tell()
+            if limites[-1] < posicao < tamanho:
+                limites.append(posicao)
+    limites.append(tamanho)
+
+    return [FaixaCsv(csv_file, a, b, colunas) for a, b in zip(limites, limites[1:]) if b > a]
+
+
+def zips_do_release(diretorio: Path, prefixo):
+    """Retorna os zips {prefixo}*.zip do release mais recente presente no diretório"""
+    zips = {}
+    for zip_path in Path(diretorio).glob(f"{prefixo}*.zip"):
+        encontrado = PADRAO_RELEASE.search(zip_path.name)
+        release = encontrado.groups() if encontrado else ("", "")
+        zips.setdefault(release, []).append(zip_path)
+
+    if not zips:
+        return []
+
+    def numero_parte(zip_path):
+        digitos = re.match(rf"{prefixo}(\d+)", zip_path.name, re.IGNORECASE)
+        return int(digitos.group(1)) if digitos else 0
+
+    return sorted(zips[max(zips)], key=numero_parte)
+
+
+def membros_zip(diretorio: Path, prefixo, sufixo, colunas):
+    """Lista os membros {sufixo} dos zips do release mais recente, em ordem"""
+    fontes = []
+    for zip_path in zips_do_release(diretorio, prefixo):
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                for file_info in zip_ref.infolist():
+                    if file_info.filename.upper().endswith(sufixo):
+                        fontes.append(MembroZip(zip_path, file_info.filename, colunas))
+        except zipfile.BadZipFile:
+            print(f"Arquivo corrompido ou inválido: {zip_path.name}")
+    return fontes
+
+
+def fontes_entidade(entidade, colunas, origem='csv', partes=1, diretorio=Path("Data")):
+    """Fontes de uma entidade em Data/; lista vazia se a entrada não existir"""
+    csv_final, prefixo, sufixo = ENTRADAS[entidade]
+    if origem == 'zip':
+        return membros_zip(diretorio, prefixo, sufixo, colunas)
+
+    csv_file = Path(diretorio) / csv_final
+    if not csv_file.exists():
+        return []
+    return dividir_em_faixas(csv_file, partes)
@@ -0,0 +1,151 @@
+"""
+Grafo societário entre empresas: sócios pessoa jurídica → empresas de que participam
+
+Cada sócio PJ (identificador_socio = 1) liga a empresa sócia (os 8 primeiros
+dígitos de cnpj_cpf_socio) à empresa investida (cnpj_basico). A Receita não
+informa o percentual de participação, então "controladora" aqui é qualquer
+sócia PJ. O grafo é gravado em database/grafo_societario/ como arrays numpy
+lidos com mmap, no formato CSR (listas de adjacência contíguas):
+
+    nos.npy                     cnpj_basico de cada nó, em ordem (int32); o id do nó é a posição
+    controladas_inicios.npy     início das investidas de cada nó em controladas.npy (int64, n + 1)
+    controladas.npy             ids das investidas, agrupados por sócia
+    controladoras_inicios.npy   o mesmo no sentido inverso (sócias de cada nó)
+    controladoras.npy
+    componentes.npy             grupo econômico (componente conexo) de cada nó (int32)
+    grupos_inicios.npy          início dos membros de cada grupo em grupos.npy (int64)
+    grupos.npy                  ids dos nós agrupados por grupo; grupos em ordem decrescente de tamanho
+    grafo.json                  totais e tempo de construção
+
+As consultas (percursos de vários níveis, grupo econômico, controladoras
+finais) estão em src/queries/grafo.py.
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.agendador import saidas_atualizadas
+from src.processors.dataset import parquet_final
+from src.processors.duckdb_engine import literal, conectar
+
+DIRETORIO_GRAFO = Path("database") / "grafo_societario"
+ARQUIVOS_GRAFO = ("nos.npy", "controladas_inicios.npy", "controladas.npy", "controladoras_inicios.npy",
+                  "controladoras.npy", "componentes.npy", "grupos_inicios.npy", "grupos.npy", "grafo.json")
+
+
+def consulta_arestas(origem):
+    """SELECT (controladora, controlada) distintas dos sócios PJ com CNPJ válido"""
+    return f"""
+        SELECT DISTINCT CAST(substr(cnpj_cpf_socio, 1, 8) AS INTEGER) AS controladora,
+               CAST(cnpj_basico AS INTEGER) AS controlada
+        FROM read_parquet({literal(origem)})
+        WHERE identificador_socio = 1
+          AND regexp_full_match(cnpj_cpf_socio, '[0-9]{{14}}')
+          AND substr(cnpj_cpf_socio, 1, 8) <> '00000000'
+          AND substr(cnpj_cpf_socio, 1, 8) <> cnpj_basico
+    """
+
+
+def csr(origens, destinos, total_nos):
+    """(inícios, vizinhos) da lista de adjacência de origens → destinos"""
+    ordem = np.lexsort((destinos, origens))
+    inicios = np.zeros(total_nos + 1, dtype=np.int64)
+    inicios[1:] = np.cumsum(np.bincount(origens, minlength=total_nos))
+    return inicios, destinos[ordem].astype(np.int32)
+
+
+def rotular_componentes(origens, destinos, total_nos):
+    """Componente conexo de cada nó (ignorando o sentido), por união de raízes e salto de ponteiros
+
+    Cada rodada liga a raiz de maior id à de menor id em toda aresta e depois
+    achata as árvores; o rótulo final é o menor id do componente.
+    """
+    rotulos = np.arange(total_nos, dtype=np.int64)
+    while True:
+        raiz_origem, raiz_destino = rotulos[origens], rotulos[destinos]
+        menor = np.minimum(raiz_origem, raiz_destino)
+        novos = rotulos.copy()
+        np.minimum.at(novos, raiz_origem, menor)
+        np.minimum.at(novos, raiz_destino, menor)
+        while True:
+            saltados = novos[novos]
+            if np.array_equal(saltados, novos):
+                break
+            novos = saltados
+        if np.array_equal(novos, rotulos):
+            return rotulos
+        rotulos = novos
+
+
+def construir_grafo(origem=None, destino=DIRETORIO_GRAFO, threads=None, limite_memoria_mb=None):
+    """Constrói o grafo societário a partir do Parquet de sócios; retorna o número de arestas"""
+    origem = Path(origem or parquet_final("socios"))
+    if not origem.exists():
+        print(f"❌ Arquivo não encontrado: {origem}")
+        return None
+
+    print("🕸️  Construindo grafo societário dos sócios pessoa jurídica...")
+    inicio = time.perf_counter()
+    con = conectar(threads, limite_memoria_mb)
+    try:
+        arestas = con.execute(consulta_arestas(origem)).fetchnumpy()
+    finally:
+        con.close()
+    controladoras = np.asarray(arestas["controladora"], dtype=np.int32)
+    controladas = np.asarray(arestas["controlada"], dtype=np.int32)
+
+    nos = np.unique(np.concatenate([controladoras, controladas]))
+    origens = np.searchsorted(nos, controladoras)
+    destinos = np.searchsorted(nos, controladas)
+    total_nos = len(nos)
+
+    # Grupos renumerados do maior para o menor; empates pelo menor nó
+    rotulos = rotular_componentes(origens, destinos, total_nos)
+    raizes, componentes, tamanhos = np.unique(rotulos, return_inverse=True, return_counts=True)
+    ordem_grupos = np.lexsort((raizes, -tamanhos))
+    renumeracao = np.empty(len(raizes), dtype=np.int32)
+    renumeracao[ordem_grupos] = np.arange(len(raizes), dtype=np.int32)
+    componentes = renumeracao[componentes]
+    grupos_inicios = np.zeros(len(raizes) + 1, dtype=np.int64)
+    grupos_inicios[1:] = np.cumsum(tamanhos[ordem_grupos])
+
+    destino = Path(destino)
+    temporario = destino.with_name(destino.name + ".tmp")
+    if temporario.exists():
+        shutil.rmtree(temporario)
+    temporario.mkdir(parents=True)
+    np.save(temporario / "nos.npy", nos)
+    for nome, (de, para) in {"controladas": (origens, destinos), "controladoras": (destinos, origens)}.items():
+        inicios, vizinhos = csr(de, para, total_nos)
+        np.save(temporario / f"{nome}_inicios.npy", inicios)
+        np.save(temporario / f"{nome}.npy", vizinhos)
+    np.save(temporario / "componentes.npy", componentes)
+    np.save(temporario / "grupos_inicios.npy", grupos_inicios)
+    np.save(temporario / "grupos.npy", np.argsort(componentes, kind="stable").astype(np.int32))
+
+    segundos = time.perf_counter() - inicio
+    resumo = {"nos": int(total_nos), "arestas": int(len(origens)), "grupos": int(len(raizes)),
+              "maior_grupo": int(tamanhos.max()) if len(tamanhos) else 0,
+              "segundos_construcao": round(segundos, 2)}
+    with open(temporario / "grafo.json", "w", encoding="utf-8") as f:
+        json.dump(resumo, f, indent=2)
+
+    if destino.exists():
+        shutil.rmtree(destino)
+    os.replace(temporario, destino)
+    print(f"✅ {resumo['nos']:,} empresas, {resumo['arestas']:,} participações, {resumo['grupos']:,} grupos "
+          f"(maior com {resumo['maior_grupo']:,}) em {segundos:.1f}s → {destino}")
+    return resumo["arestas"]
+
+
+def grafo_atualizado(origem=None, destino=DIRETORIO_GRAFO):
+    """True se o grafo existe completo e é mais novo que o Parquet de sócios"""
+    return saidas_atualizadas([origem or parquet_final("socios")],
+                              [Path(destino) / nome for nome in ARQUIVOS_GRAFO])
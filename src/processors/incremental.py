@@ -0,0 +1,308 @@
+"""
+Atualização incremental entre releases mensais da Receita
+
+Para cada entidade é mantido, em database/incremental/<entidade>/, o hash das
+linhas do snapshot agrupado por chave (hashes_<release>.parquet, do release
+atual e do anterior). A cada novo release o snapshot recém-gerado é comparado
+aos hashes do release anterior e são gravados os deltas:
+
+    inseridos.parquet    linhas de chaves que não existiam
+    atualizados.parquet  todas as linhas das chaves cujo conteúdo mudou
+    removidos.parquet    chaves que deixaram de existir
+
+Os deltas podem ser aplicados a uma cópia Parquet ou a uma tabela MySQL sem
+recarga completa: remove-se as chaves dos três deltas e insere-se as linhas de
+inseridos + atualizados. Remover também as chaves de inseridos torna a
+aplicação idempotente: repeti-la depois de uma falha parcial não duplica linhas.
+Reprocessar um release (--force, retomada) regenera o delta dele contra o
+release anterior, em vez de compará-lo aos próprios hashes.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.duckdb_engine import literal, conectar
+from src.processors.fontes import ENTRADAS, PADRAO_RELEASE, zips_do_release
+from src.schemas.empSchema import EMPRESAS_CHAVE
+from src.schemas.estabSchema import ESTABELECIMENTOS_CHAVE
+from src.schemas.sociosSchema import SOCIOS_CHAVE
+
+DIRETORIO_INCREMENTAL = Path("database") / "incremental"
+
+CHAVES = {
+    "empresas": EMPRESAS_CHAVE,
+    "estabelecimentos": ESTABELECIMENTOS_CHAVE,
+    "socios": SOCIOS_CHAVE
+}
+
+DELTAS = ("inseridos", "atualizados", "removidos")
+
+
+def snapshot_entidade(entidade, diretorio=Path("database")):
+    """Caminho do Parquet final de uma entidade"""
+    return Path(diretorio) / f"{entidade}_final.parquet"
+
+
+def release_disponivel(entidade, diretorio=Path("Data")):
+    """Release (AAAA_MM) dos zips mais recentes da entidade em Data/, ou None"""
+    _, prefixo, _ = ENTRADAS[entidade]
+    zips = zips_do_release(diretorio, prefixo)
+    encontrado = PADRAO_RELEASE.search(zips[0].name) if zips else None
+    return "_".join(encontrado.groups()) if encontrado else None
+
+
+def ler_estado(entidade, diretorio=DIRETORIO_INCREMENTAL):
+    """Estado incremental gravado para a entidade ({} se nunca gerado)"""
+    arquivo = Path(diretorio) / entidade / "estado.json"
+    if not arquivo.exists():
+        return {}
+    with open(arquivo, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _gravar_estado(entidade, estado, diretorio):
+    arquivo = Path(diretorio) / entidade / "estado.json"
+    temporario = arquivo.with_suffix(".json.tmp")
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, arquivo)
+
+
+def deltas_pendentes_mysql(entidade, diretorio=DIRETORIO_INCREMENTAL):
+    """Deltas ainda não aplicados ao MySQL, na ordem em que devem ser aplicados"""
+    estado = ler_estado(entidade, diretorio)
+    deltas = estado.get("deltas", [])
+    aplicado = estado.get("aplicado_mysql")
+    return deltas[deltas.index(aplicado) + 1:] if aplicado in deltas else deltas
+
+
+def marcar_delta_aplicado(entidade, diretorio_delta, diretorio=DIRETORIO_INCREMENTAL):
+    """Registra no estado que o delta já foi aplicado ao MySQL"""
+    estado = ler_estado(entidade, diretorio)
+    estado["aplicado_mysql"] = str(diretorio_delta)
+    _gravar_estado(entidade, estado, diretorio)
+
+
+def esta_atualizado(entidade, release, snapshot=None, diretorio=DIRETORIO_INCREMENTAL):
+    """True se o snapshot da entidade já corresponde ao release informado"""
+    snapshot = Path(snapshot or snapshot_entidade(entidade))
+    return bool(release) and snapshot.exists() and ler_estado(entidade, diretorio).get("release") == release
+
+
+def _condicao_chave(chave, esquerda, direita):
+    # IS NOT DISTINCT FROM: chaves de sócios podem ter componentes nulos
+    return " AND ".join(f"{esquerda}.{c} IS NOT DISTINCT FROM {direita}.{c}" for c in chave)
+
+
+def _arquivo_hashes(destino, release):
+    return Path(destino) / f"hashes_{release}.parquet"
+
+
+def _consulta_hashes(snapshot, chave):
+    """Hash do conteúdo agrupado por chave; chaves repetidas formam um único grupo"""
+    colunas = pq.read_schema(snapshot).names
+    lista_chave = ", ".join(chave)
+    # Soma em HUGEINT: comutativa e, ao contrário de XOR, não anula linhas idênticas
+    return (f"SELECT {lista_chave}, SUM(hash({', '.join(colunas)})::HUGEINT) AS _hash, "
+            f"COUNT(*) AS _linhas FROM read_parquet({literal(snapshot)}) GROUP BY {lista_chave}")
+
+
+def gerar_delta(entidade, release=None, snapshot=None, diretorio=DIRETORIO_INCREMENTAL,
+                threads=None, limite_memoria_mb=None):
+    """Compara o snapshot atual ao anterior e grava os deltas; retorna as contagens
+
+    Na primeira execução apenas os hashes de referência são gravados. Se o
+    release já foi registrado, o delta dele é regenerado contra o release
+    anterior; sem os hashes desse anterior o delta existente é mantido.
+    """
+    chave = CHAVES[entidade]
+    snapshot = Path(snapshot or snapshot_entidade(entidade))
+    destino = Path(diretorio) / entidade
+    destino.mkdir(parents=True, exist_ok=True)
+
+    estado = ler_estado(entidade, diretorio)
+    release = release or datetime.now().strftime("%Y_%m")
+    legado = destino / "hashes.parquet"
+    if legado.exists() and estado.get("release"):
+        # Versões anteriores guardavam só os hashes do último release
+        os.replace(legado, _arquivo_hashes(destino, estado["release"]))
+
+    reprocessamento = estado.get("release") == release
+    anterior = estado.get("contagens", {}).get("anterior") if reprocessamento else estado.get("release")
+    hashes = _arquivo_hashes(destino, anterior) if anterior else None
+    if reprocessamento and anterior and not hashes.exists():
+        print(f"⚠️  {entidade}: hashes do release {anterior} indisponíveis; delta de {release} mantido")
+        return estado.get("contagens", {})
+    hashes_novos = destino / f"hashes_{release}.parquet.tmp"
+
+    con = conectar(threads, limite_memoria_mb)
+    try:
+        con.execute(f"CREATE TEMP TABLE novos AS {_consulta_hashes(snapshot, chave)}")
+        con.execute(f"COPY novos TO {literal(hashes_novos)} (FORMAT PARQUET, COMPRESSION ZSTD)")
+
+        contagens = {"release": release, "anterior": anterior}
+        if hashes is None or not hashes.exists():
+            contagens.update({delta: 0 for delta in DELTAS})
+            print(f"📌 {entidade}: snapshot inicial registrado (release {release})")
+            diretorio_delta = None
+        else:
+            diretorio_delta = destino / f"delta_{release}"
+            diretorio_delta.mkdir(parents=True, exist_ok=True)
+            con.execute(f"CREATE TEMP TABLE anteriores AS SELECT * FROM read_parquet({literal(hashes)})")
+            con.execute(f"""
+                CREATE TEMP TABLE alterados AS
+                SELECT n.*, a._hash IS NULL AS _novo
+                FROM novos n LEFT JOIN anteriores a ON {_condicao_chave(chave, 'n', 'a')}
+                WHERE a._hash IS DISTINCT FROM n._hash
+            """)
+
+            for delta, filtro in (("inseridos", "_novo"), ("atualizados", "NOT _novo")):
+                con.execute(f"""
+                    COPY (SELECT s.* FROM read_parquet({literal(snapshot)}) s
+                          SEMI JOIN (SELECT * FROM alterados WHERE {filtro}) d
+                          ON {_condicao_chave(chave, 's', 'd')})
+                    TO {literal(diretorio_delta / f'{delta}.parquet')} (FORMAT PARQUET, COMPRESSION ZSTD)
+                """)
+                contagens[delta] = pq.ParquetFile(diretorio_delta / f"{delta}.parquet").metadata.num_rows
+
+            con.execute(f"""
+                COPY (SELECT {', '.join('a.' + c for c in chave)} FROM anteriores a
+                      ANTI JOIN novos n ON {_condicao_chave(chave, 'a', 'n')})
+                TO {literal(diretorio_delta / 'removidos.parquet')} (FORMAT PARQUET, COMPRESSION ZSTD)
+            """)
+            contagens["removidos"] = pq.ParquetFile(diretorio_delta / "removidos.parquet").metadata.num_rows
+
+            print(f"🔄 {entidade}: {contagens['inseridos']:,} inseridos, {contagens['atualizados']:,} "
+                  f"atualizados, {contagens['removidos']:,} chaves removidas "
+                  f"(release {contagens['anterior']} → {release})")
+    finally:
+        con.close()
+
+    # Os hashes do release anterior ficam até o estado apontar para os novos
+    os.replace(hashes_novos, _arquivo_hashes(destino, release))
+    deltas = estado.get("deltas", [])
+    aplicado = estado.get("aplicado_mysql")
+    if diretorio_delta and str(diretorio_delta) not in deltas:
+        deltas.append(str(diretorio_delta))
+    elif diretorio_delta and aplicado == str(diretorio_delta):
+        # Delta regenerado depois de aplicado: volta a ficar pendente (a aplicação é idempotente)
+        posicao = deltas.index(aplicado)
+        aplicado = deltas[posicao - 1] if posicao else None
+    _gravar_estado(entidade, {
+        "release": release,
+        "snapshot": str(snapshot),
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "deltas": deltas,
+        "aplicado_mysql": aplicado,
+        "contagens": contagens
+    }, diretorio)
+
+    # Só os hashes do release atual e do anterior ainda podem ser usados
+    manter = {_arquivo_hashes(destino, r).name for r in (release, anterior) if r}
+    for arquivo in destino.glob("hashes_*.parquet"):
+        if arquivo.name not in manter:
+            arquivo.unlink()
+    return contagens
+
+
+def aplicar_delta_parquet(base, diretorio_delta, chave, destino):
+    """Aplica um delta a uma cópia Parquet anterior da entidade, gravando em destino"""
+    diretorio_delta = Path(diretorio_delta)
+    arquivos = {delta: literal(diretorio_delta / f"{delta}.parquet") for delta in DELTAS}
+    temporario = Path(destino).with_suffix(".parquet.tmp")
+
+    con = conectar()
+    try:
+        con.execute(f"""
+            COPY (
+                SELECT b.* FROM read_parquet({literal(base)}) b
+                ANTI JOIN (SELECT {', '.join(chave)} FROM read_parquet({arquivos['removidos']})
+                           UNION ALL
+                           SELECT DISTINCT {', '.join(chave)} FROM read_parquet({arquivos['atualizados']})
+                           UNION ALL
+                           SELECT DISTINCT {', '.join(chave)} FROM read_parquet({arquivos['inseridos']})) d
+                ON {_condicao_chave(chave, 'b', 'd')}
+                UNION ALL BY NAME SELECT * FROM read_parquet({arquivos['inseridos']})
+                UNION ALL BY NAME SELECT * FROM read_parquet({arquivos['atualizados']})
+            ) TO {literal(temporario)} (FORMAT PARQUET, COMPRESSION ZSTD)
+        """)
+    finally:
+        con.close()
+    os.replace(temporario, destino)
+
+
+def _chaves_para_remover(diretorio_delta, chave, lote):
+    """Chaves dos três deltas; as de inseridos só existem na tabela se uma aplicação anterior falhou no meio"""
+    for delta in DELTAS:
+        arquivo = pq.ParquetFile(Path(diretorio_delta) / f"{delta}.parquet")
+        vistos = set()
+        for batch in arquivo.iter_batches(batch_size=lote, columns=chave):
+            linhas = list(dict.fromkeys(linha for linha in zip(*(batch.column(c).to_pylist() for c in chave))
+                                        if linha not in vistos))
+            if delta != "removidos":
+                vistos.update(linhas)
+            if linhas:
+                yield linhas
+
+
+def _remover_chaves_mysql(db_conn, tabela, diretorio_delta, chave, lote):
+    """Carrega as chaves a remover em uma tabela temporária e apaga com um único DELETE ... JOIN
+
+    Retorna o número de chaves carregadas, ou None em caso de erro.
+    """
+    temporaria = f"_delta_{tabela}"
+    colunas = ", ".join(chave)
+    # A temporária herda os tipos das colunas da chave; só existe nesta sessão
+    preparo = [f"DROP TEMPORARY TABLE IF EXISTS {temporaria}",
+               f"CREATE TEMPORARY TABLE {temporaria} AS SELECT {colunas} FROM {tabela} LIMIT 0"]
+    if any(db_conn.execute_query(query) is not True for query in preparo):
+        return None
+
+    insert_query = f"INSERT INTO {temporaria} ({colunas}) VALUES ({', '.join(['%s'] * len(chave))})"
+    removidas = 0
+    for linhas in _chaves_para_remover(diretorio_delta, chave, lote):
+        if not db_conn.execute_insert(insert_query, linhas):
+            return None
+        removidas += len(linhas)
+
+    # <=> compara nulos como iguais, como IS NOT DISTINCT FROM
+    condicao = " AND ".join(f"t.{c} <=> d.{c}" for c in chave)
+    finais = [f"ALTER TABLE {temporaria} ADD INDEX ({colunas})",
+              f"DELETE t FROM {tabela} t JOIN {temporaria} d ON {condicao}"] if removidas else []
+    finais.append(f"DROP TEMPORARY TABLE {temporaria}")
+    if any(db_conn.execute_query(query) is not True for query in finais):
+        return None
+    return removidas
+
+
+def aplicar_delta_mysql(db_conn, tabela, diretorio_delta, chave, colunas, lote=5000):
+    """Aplica um delta a uma tabela MySQL: DELETE por chave e INSERT das linhas novas
+
+    Pode ser repetido depois de uma falha parcial: as chaves de todas as linhas
+    inseridas são apagadas antes, então nada é inserido duas vezes.
+    """
+    diretorio_delta = Path(diretorio_delta)
+
+    removidas = _remover_chaves_mysql(db_conn, tabela, diretorio_delta, chave, lote)
+    if removidas is None:
+        return False
+
+    insert_query = (f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+                    f"VALUES ({', '.join(['%s'] * len(colunas))})")
+    inseridas = 0
+    for delta in ("inseridos", "atualizados"):
+        arquivo = pq.ParquetFile(diretorio_delta / f"{delta}.parquet")
+        for batch in arquivo.iter_batches(batch_size=lote, columns=colunas):
+            dados = list(zip(*(batch.column(c).to_pylist() for c in colunas)))
+            if dados and not db_conn.execute_insert(insert_query, dados):
+                return False
+            inseridas += len(dados)
+
+    print(f"✅ {tabela}: {removidas:,} chaves removidas, {inseridas:,} linhas inseridas")
+    return True
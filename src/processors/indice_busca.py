@@ -0,0 +1,181 @@
+"""
+Índice de busca por nome: razão social e nome fantasia → cnpj_basico
+
+Os nomes são normalizados (sem acentos, maiúsculas) e quebrados em termos
+alfanuméricos; termos de uma letra, palavras vazias (DE, LTDA, ME...) e
+números de documento (8 dígitos ou mais, como o CPF no nome do MEI) ficam de
+fora. O índice é gravado em database/indice_busca/, em arrays lidos com mmap:
+
+    termos.bin            vocabulário ordenado, termos concatenados (ASCII)
+    termos_inicios.npy    posição de cada termo em termos.bin (int64, n + 1)
+    postings_inicios.npy  posição da lista de cada termo em postings.npy (int64, n + 1)
+    postings.npy          cnpj_basico das empresas com o termo, ordenados (int32)
+    campos.npy            onde o termo aparece: 1 razão social, 2 nome fantasia, 3 ambos (int8)
+    indice.json           totais e tempo de construção
+
+Com o vocabulário ordenado, os termos com um prefixo formam uma faixa
+contínua, encontrada por busca binária; a consulta está em src/queries/busca.py.
+A tokenização e a ordenação rodam no DuckDB, que usa disco quando passam do
+limite de memória; os arrays são preenchidos lote a lote.
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.agendador import saidas_atualizadas
+from src.processors.dataset import parquet_final
+from src.processors.duckdb_engine import literal, conectar
+
+DIRETORIO_BUSCA = Path("database") / "indice_busca"
+ARQUIVOS_BUSCA = ("termos.bin", "termos_inicios.npy", "postings_inicios.npy", "postings.npy", "campos.npy",
+                  "indice.json")
+
+# Coluna indexada de cada entidade e o bit que marca o campo nas postings
+CAMPOS = {
+    "empresas": ("razao_social", 1),
+    "estabelecimentos": ("nome_fantasia", 2)
+}
+PALAVRAS_VAZIAS = ("DE", "DA", "DO", "DAS", "DOS", "EM", "LTDA", "ME", "EPP", "SA", "EIRELI", "CIA")
+PADRAO_SEPARADOR = re.compile(r"[^A-Z0-9]+")
+PADRAO_DOCUMENTO = re.compile(r"^[0-9]{8,}$")
+
+
+def _indexavel(termo):
+    return len(termo) >= 2 and termo not in PALAVRAS_VAZIAS and not PADRAO_DOCUMENTO.match(termo)
+
+
+def normalizar_termos(texto, prefixo=False):
+    """Termos de busca de um texto, com a mesma normalização usada na construção do índice
+
+    Com prefixo=True o último termo é mantido mesmo se curto ou palavra vazia:
+    ele ainda está sendo digitado ("SA" pode virar "SANTOS", "ME" "MELO").
+    """
+    decomposto = unicodedata.normalize("NFD", str(texto or ""))
+    sem_acentos = "".join(c for c in decomposto if unicodedata.category(c) != "Mn").upper()
+    termos = [termo for termo in PADRAO_SEPARADOR.split(sem_acentos) if termo]
+    ultimo = termos.pop() if prefixo and termos else None
+    termos = [termo for termo in termos if _indexavel(termo)]
+    # Um número de documento nunca é prefixo de um termo indexado
+    if ultimo and not PADRAO_DOCUMENTO.match(ultimo):
+        termos.append(ultimo)
+    return termos
+
+
+def consulta_postings(origem=Path("database")):
+    """SELECT (termo, cnpj, campos) ordenado por termo e cnpj, a partir dos Parquets finais"""
+    partes = []
+    for entidade, (coluna, bit) in CAMPOS.items():
+        partes.append(f"""
+            SELECT unnest(regexp_split_to_array(upper(strip_accents({coluna})), '[^A-Z0-9]+')) AS termo,
+                   CAST(cnpj_basico AS INTEGER) AS cnpj, {bit} AS campo
+            FROM read_parquet({literal(parquet_final(entidade, origem))})
+            WHERE {coluna} IS NOT NULL
+        """)
+    vazias = ", ".join(literal(palavra) for palavra in PALAVRAS_VAZIAS)
+    return f"""
+        SELECT termo, cnpj, CAST(bit_or(campo) AS TINYINT) AS campos
+        FROM ({' UNION ALL '.join(partes)})
+        WHERE length(termo) >= 2 AND termo NOT IN ({vazias})
+          AND NOT regexp_full_match(termo, '[0-9]{{8,}}') AND cnpj IS NOT NULL
+        GROUP BY termo, cnpj
+        ORDER BY termo, cnpj
+    """
+
+
+def _preencher(temporario, postings, vocabulario, lote):
+    """Grava os arrays do índice a partir das postings e do vocabulário ordenados"""
+    arquivo = pq.ParquetFile(postings)
+    total = arquivo.metadata.num_rows
+    cnpjs = np.lib.format.open_memmap(temporario / "postings.npy", mode="w+", dtype=np.int32, shape=(total,))
+    campos = np.lib.format.open_memmap(temporario / "campos.npy", mode="w+", dtype=np.int8, shape=(total,))
+    posicao = 0
+    for batch in arquivo.iter_batches(batch_size=lote, columns=["cnpj", "campos"]):
+        cnpjs[posicao:posicao + batch.num_rows] = batch.column("cnpj").to_numpy()
+        campos[posicao:posicao + batch.num_rows] = batch.column("campos").to_numpy()
+        posicao += batch.num_rows
+    cnpjs.flush()
+    campos.flush()
+    del cnpjs, campos
+
+    arquivo = pq.ParquetFile(vocabulario)
+    termos = arquivo.metadata.num_rows
+    termos_inicios = np.zeros(termos + 1, dtype=np.int64)
+    postings_inicios = np.zeros(termos + 1, dtype=np.int64)
+    posicao, bytes_gravados, postings_vistas = 0, 0, 0
+    with open(temporario / "termos.bin", "wb") as saida:
+        for batch in arquivo.iter_batches(batch_size=lote):
+            fim = posicao + batch.num_rows
+            # Termos só têm A-Z e 0-9, então caracteres e bytes coincidem
+            tamanhos = pc.utf8_length(batch.column("termo")).to_numpy()
+            termos_inicios[posicao + 1:fim + 1] = bytes_gravados + np.cumsum(tamanhos)
+            postings_inicios[posicao + 1:fim + 1] = postings_vistas + np.cumsum(batch.column("frequencia").to_numpy())
+            saida.write("".join(batch.column("termo").to_pylist()).encode("ascii"))
+            bytes_gravados, postings_vistas = termos_inicios[fim], postings_inicios[fim]
+            posicao = fim
+    np.save(temporario / "termos_inicios.npy", termos_inicios)
+    np.save(temporario / "postings_inicios.npy", postings_inicios)
+    return termos, total
+
+
+def construir_indice_busca(origem=Path("database"), destino=DIRETORIO_BUSCA, threads=None,
+                           limite_memoria_mb=None, lote=1000000):
+    """Constrói o índice de busca por nome a partir dos Parquets finais; retorna as postings"""
+    faltando = [entidade for entidade in CAMPOS if not parquet_final(entidade, origem).exists()]
+    if faltando:
+        print(f"❌ Índice de busca precisa dos Parquets de {', '.join(faltando)}")
+        return None
+
+    destino = Path(destino)
+    temporario = destino.with_name(destino.name + ".tmp")
+    if temporario.exists():
+        shutil.rmtree(temporario)
+    temporario.mkdir(parents=True)
+
+    print("🔤 Construindo índice de busca por razão social e nome fantasia...")
+    inicio = time.perf_counter()
+    postings, vocabulario = temporario / "postings.parquet", temporario / "vocabulario.parquet"
+    con = conectar(threads, limite_memoria_mb)
+    try:
+        con.execute("SET preserve_insertion_order = true")
+        con.execute(f"COPY ({consulta_postings(origem)}) TO {literal(postings)} (FORMAT PARQUET)")
+        con.execute(f"""
+            COPY (SELECT termo, COUNT(*) AS frequencia FROM read_parquet({literal(postings)})
+                  GROUP BY termo ORDER BY termo)
+            TO {literal(vocabulario)} (FORMAT PARQUET)
+        """)
+        documentos = con.execute(f"SELECT COUNT(DISTINCT cnpj) FROM read_parquet({literal(postings)})").fetchone()[0]
+    finally:
+        con.close()
+
+    termos, total = _preencher(temporario, postings, vocabulario, lote)
+    postings.unlink()
+    vocabulario.unlink()
+    segundos = time.perf_counter() - inicio
+    with open(temporario / "indice.json", "w", encoding="utf-8") as f:
+        json.dump({"documentos": documentos, "termos": termos, "postings": total,
+                   "segundos_construcao": round(segundos, 2)}, f, indent=2)
+
+    if destino.exists():
+        shutil.rmtree(destino)
+    os.replace(temporario, destino)
+    tamanho = sum(arquivo.stat().st_size for arquivo in destino.iterdir()) / (1024**2)
+    print(f"✅ {termos:,} termos e {total:,} postings de {documentos:,} empresas, {tamanho:.1f}MB "
+          f"({segundos:.1f}s) → {destino}")
+    return total
+
+
+def indice_busca_atualizado(origem=Path("database"), destino=DIRETORIO_BUSCA):
+    """True se o índice existe completo e é mais novo que os Parquets de empresas e estabelecimentos"""
+    return saidas_atualizadas([parquet_final(entidade, origem) for entidade in CAMPOS],
+                              [Path(destino) / nome for nome in ARQUIVOS_BUSCA])
@@ -0,0 +1,344 @@
+"""
+Métricas de execução da ETL: tempo, linhas, bytes e pico de memória por etapa
+
+Cada fase é aberta com `with etapa("nome")`; os laços internos (download,
+leitura de chunks, enriquecimento, escrita) acumulam contadores com contar()
+e cronometrar(). Além do total do processo, cada contagem vai para as etapas
+abertas no contexto de quem contou (contextvars), então etapas que rodam ao
+mesmo tempo em threads do agendador não somam o trabalho umas das outras;
+threads auxiliares de uma etapa entram nela por em_contexto(). O resumo pode ser gravado em JSON ou no
+formato textfile do Prometheus (node_exporter). Uma etapa escolhida pode ser
+perfilada com cProfile ou por amostragem de pilhas (saída .folded, para
+flamegraph.pl ou speedscope).
+"""
+
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import partial
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DIRETORIO_PERFIS = Path("database") / "perfis"
+PREFIXO_PROMETHEUS = "cnae_etl"
+
+_trava = threading.Lock()
+_contadores = defaultdict(float)
+# Contadores das etapas abertas no contexto atual (a mais interna por último)
+_contadores_etapas = contextvars.ContextVar("contadores_etapas", default=())
+_etapas = []
+_perfil = {"etapa": None, "modo": "cprofile", "intervalo_s": 0.005, "diretorio": DIRETORIO_PERFIS}
+
+
+def memoria_rss_mb():
+    """Retorna a memória residente (RSS) atual do processo em MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 ** 2)
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    if resource is not None:
+        # Sem /proc usa o pico (ru_maxrss, em KB no Linux) como aproximação
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return 0.0
+
+
+class MonitorMemoria:
+    """Amostra o RSS do processo em uma thread e guarda o pico do intervalo
+
+    Workers em processos separados entram pelo ru_maxrss dos filhos.
+    """
+
+    def __init__(self, intervalo_s=0.05):
+        self.intervalo_s = intervalo_s
+        self.pico_mb = 0.0
+        self.pico_filhos_mb = 0.0
+        self._parar = threading.Event()
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo_s):
+            self.pico_mb = max(self.pico_mb, memoria_rss_mb())
+
+    def __enter__(self):
+        self.pico_mb = memoria_rss_mb()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        self.pico_mb = max(self.pico_mb, memoria_rss_mb())
+        if resource is not None:
+            self.pico_filhos_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        return False
+
+
+def contar(nome, valor=1):
+    """Soma valor ao contador nome (linhas, bytes, chunks...) do processo e das etapas abertas"""
+    with _trava:
+        _contadores[nome] += valor
+        for contadores_etapa in _contadores_etapas.get():
+            contadores_etapa[nome] += valor
+
+
+def somar_contadores(contadores):
+    """Incorpora contadores vindos de outro processo (workers do pool)"""
+    with _trava:
+        for nome, valor in contadores.items():
+            _contadores[nome] += valor
+            for contadores_etapa in _contadores_etapas.get():
+                contadores_etapa[nome] += valor
+
+
+def em_contexto(funcao):
+    """Envolve funcao para rodar em outra thread contando para as etapas abertas nesta
+
+    Use um em_contexto() por tarefa submetida: um mesmo contexto não pode
+    estar ativo em duas threads ao mesmo tempo.
+    """
+    return partial(contextvars.copy_context().run, funcao)
+
+
+def contadores():
+    with _trava:
+        return dict(_contadores)
+
+
+@contextmanager
+def cronometrar(nome):
+    """Acumula a duração do bloco no contador {nome}_s"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        contar(f"{nome}_s", time.perf_counter() - inicio)
+
+
+def configurar_perfil(etapa, modo="cprofile", diretorio=DIRETORIO_PERFIS, intervalo_s=0.005):
+    """Ativa o perfilamento da etapa indicada: modo 'cprofile' ou 'amostragem'"""
+    if modo not in ("cprofile", "amostragem"):
+        raise ValueError(f"Modo de perfil desconhecido: {modo}")
+    _perfil.update(etapa=etapa, modo=modo, diretorio=Path(diretorio), intervalo_s=intervalo_s)
+
+
+class AmostradorPilhas:
+    """Perfil por amostragem: lê a pilha de uma thread a cada intervalo, sem instrumentá-la
+
+    O custo não depende do número de chamadas, então serve para laços quentes
+    em que o cProfile distorce os tempos. As pilhas são contadas no formato
+    'colapsado' (func1;func2;func3 N) dos flame graphs.
+    """
+
+    def __init__(self, thread_id, intervalo_s=0.005):
+        self.thread_id = thread_id
+        self.intervalo_s = intervalo_s
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo_s):
+            quadro = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f"{codigo.co_name} ({Path(codigo.co_filename).name}:{codigo.co_firstlineno})")
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        return False
+
+    def gravar(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            for pilha, amostras in self.pilhas.most_common():
+                f.write(f"{pilha} {amostras}\n")
+
+    def mais_frequentes(self, quantidade=15):
+        """Funções com mais amostras no topo da pilha (tempo próprio)"""
+        topo = Counter()
+        for pilha, amostras in self.pilhas.items():
+            topo[pilha.rsplit(";", 1)[-1]] += amostras
+        return topo.most_common(quantidade)
+
+
+@contextmanager
+def _perfilar(nome):
+    if _perfil["etapa"] != nome:
+        yield
+        return
+
+    diretorio = _perfil["diretorio"]
+    diretorio.mkdir(parents=True, exist_ok=True)
+    if _perfil["modo"] == "cprofile":
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+            caminho = diretorio / f"{nome}.prof"
+            perfil.dump_stats(caminho)
+            texto = io.StringIO()
+            pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(20)
+            print(f"🔬 Perfil de {nome} em {caminho}:\n{texto.getvalue()}")
+    else:
+        amostrador = AmostradorPilhas(threading.get_ident(), _perfil["intervalo_s"])
+        try:
+            with amostrador:
+                yield
+        finally:
+            caminho = diretorio / f"{nome}.folded"
+            amostrador.gravar(caminho)
+            total = sum(amostrador.pilhas.values()) or 1
+            print(f"🔬 Perfil por amostragem de {nome} em {caminho} ({total} amostras):")
+            for funcao, amostras in amostrador.mais_frequentes():
+                print(f"   {amostras / total:6.1%}  {funcao}")
+
+
+@contextmanager
+def etapa(nome, **rotulos):
+    """Mede uma fase da ETL; o bloco pode preencher registro['linhas'] com o total processado
+
+    Registra duração, pico de RSS (do processo e dos workers) e os contadores
+    acumulados no contexto do bloco, mesmo que ele termine com erro. O pico de
+    RSS é do processo inteiro, incluindo etapas concorrentes.
+    """
+    registro = {"etapa": nome, **rotulos, "linhas": None}
+    contadores_etapa = defaultdict(float)
+    token = _contadores_etapas.set(_contadores_etapas.get() + (contadores_etapa,))
+    inicio = time.perf_counter()
+    monitor = MonitorMemoria()
+    try:
+        with monitor, _perfilar(nome):
+            yield registro
+        registro["status"] = "ok"
+    except BaseException:
+        registro["status"] = "erro"
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        _contadores_etapas.reset(token)
+        with _trava:
+            variacao = {chave: round(valor, 6) for chave, valor in contadores_etapa.items() if valor}
+        registro["segundos"] = round(segundos, 3)
+        registro["contadores"] = variacao
+        if registro["linhas"] is None and "linhas_lidas" in variacao:
+            registro["linhas"] = int(variacao["linhas_lidas"])
+        if registro["linhas"] and segundos > 0:
+            registro["linhas_s"] = round(registro["linhas"] / segundos, 1)
+        registro["pico_rss_mb"] = round(monitor.pico_mb, 1)
+        registro["pico_filhos_mb"] = round(monitor.pico_filhos_mb, 1)
+        with _trava:
+            _etapas.append(registro)
+
+
+def resumo():
+    """Etapas medidas e totais dos contadores, em estrutura serializável"""
+    with _trava:
+        return {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "etapas": [dict(registro) for registro in _etapas],
+            "contadores": {nome: round(valor, 6) for nome, valor in _contadores.items()}
+        }
+
+
+def reiniciar():
+    with _trava:
+        _contadores.clear()
+        _etapas.clear()
+
+
+def _gravar_atomico(caminho, texto):
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(caminho.name + ".tmp")
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(texto)
+    os.replace(temporario, caminho)
+
+
+def gravar_json(caminho):
+    _gravar_atomico(caminho, json.dumps(resumo(), indent=2, ensure_ascii=False))
+
+
+def _rotulos(**valores):
+    escapados = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in valores.values())
+    return "{" + ",".join(f'{chave}="{valor}"' for chave, valor in zip(valores, escapados)) + "}"
+
+
+def gravar_prometheus(caminho):
+    """Grava o resumo no formato textfile do Prometheus (troca atômica, como pede o node_exporter)"""
+    dados = resumo()
+    metricas = {
+        "etapa_segundos": ("gauge", "Duração da etapa em segundos", "segundos"),
+        "etapa_linhas": ("gauge", "Linhas processadas na etapa", "linhas"),
+        "etapa_linhas_por_segundo": ("gauge", "Vazão da etapa em linhas/s", "linhas_s"),
+        "etapa_pico_rss_mb": ("gauge", "Pico de memória residente do processo na etapa", "pico_rss_mb"),
+        "etapa_pico_filhos_mb": ("gauge", "Pico de memória dos workers até o fim da etapa", "pico_filhos_mb"),
+    }
+    linhas = []
+    for nome, (tipo, ajuda, chave) in metricas.items():
+        linhas += [f"# HELP {PREFIXO_PROMETHEUS}_{nome} {ajuda}", f"# TYPE {PREFIXO_PROMETHEUS}_{nome} {tipo}"]
+        for registro in dados["etapas"]:
+            if registro.get(chave) is not None:
+                linhas.append(f"{PREFIXO_PROMETHEUS}_{nome}{_rotulos(etapa=registro['etapa'])} {registro[chave]}")
+
+    nome = f"{PREFIXO_PROMETHEUS}_etapa_contador"
+    linhas += [f"# HELP {nome} Variação de cada contador durante a etapa", f"# TYPE {nome} gauge"]
+    for registro in dados["etapas"]:
+        for contador, valor in registro["contadores"].items():
+            linhas.append(f"{nome}{_rotulos(etapa=registro['etapa'], contador=contador)} {valor}")
+
+    nome = f"{PREFIXO_PROMETHEUS}_ultima_execucao_timestamp_segundos"
+    linhas += [f"# HELP {nome} Momento em que as métricas foram gravadas", f"# TYPE {nome} gauge",
+               f"{nome} {time.time():.0f}"]
+    _gravar_atomico(caminho, "\n".join(linhas) + "\n")
+
+
+def _mb(valor):
+    return f"{valor / 1024 ** 2:,.1f}MB"
+
+
+def exibir_resumo():
+    """Tabela das etapas medidas, na ordem em que terminaram"""
+    dados = resumo()
+    if not dados["etapas"]:
+        return
+    print("\n⏱️  Métricas por etapa")
+    print("=" * 50)
+    for registro in dados["etapas"]:
+        partes = [f"{registro['segundos']:.1f}s"]
+        if registro.get("linhas"):
+            partes.append(f"{registro['linhas']:,} linhas ({registro.get('linhas_s', 0):,.0f}/s)")
+        for contador, rotulo in (("bytes_baixados", "baixados"), ("bytes_lidos", "lidos"),
+                                 ("bytes_gravados", "gravados")):
+            if registro["contadores"].get(contador):
+                partes.append(f"{_mb(registro['contadores'][contador])} {rotulo}")
+        partes.append(f"pico {registro.get('pico_rss_mb', 0):,.0f}MB")
+        aviso = " ❌" if registro.get("status") == "erro" else ""
+        print(f"   {registro['etapa']}: " + ", ".join(partes) + aviso)
@@ -0,0 +1,169 @@
+"""
+Execução paralela do enriquecimento: cada fonte (faixa de bytes de um CSV ou
+membro de zip) é enriquecida em um processo separado e os fragmentos gravados
+no checkpoint são concatenados na ordem original
+"""
+
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from src.processors.checkpoint import Checkpoint
+from src.processors.metricas import contadores, contar, somar_contadores
+from src.processors.referencia import preparar_referencia
+from src.processors.streaming import processar_fontes
+
+# Estado de cada processo do pool, preenchido uma única vez por worker
+_tabelas_worker = None
+_enriquecer_worker = None
+
+
+def _inicializar_worker(carregar_tabelas, enriquecer):
+    """Carrega as tabelas auxiliares uma única vez em cada processo
+
+    A referência já foi compilada pelo processo principal: os workers só a
+    abrem, para não recompilarem (e trocarem) o diretório uns dos outros.
+    """
+    global _tabelas_worker, _enriquecer_worker
+    _tabelas_worker = carregar_tabelas(compilar=False)
+    _enriquecer_worker = enriquecer
+
+
+def _processar_fonte(checkpoint, indice, fonte, chunk_size, limite_memoria_mb):
+    """Enriquece uma fonte nos fragmentos do checkpoint
+
+    Retorna (registros, contadores da fonte) para que as métricas do worker
+    sejam somadas às do processo principal.
+    """
+    antes = contadores()
+    registros = checkpoint.processar_fonte(indice, fonte, _enriquecer_worker, _tabelas_worker,
+                                           chunk_size, limite_memoria_mb, mostrar_progresso=False)
+    depois = contadores()
+    return registros, {nome: valor - antes.get(nome, 0) for nome, valor in depois.items()}
+
+
+def concatenar_parciais(parciais, output_path):
+    """Concatena os CSVs parciais em ordem, mantendo apenas o primeiro cabeçalho"""
+    cabecalho_escrito = False
+    with open(output_path, 'wb') as destino:
+        for parcial in parciais:
+            with open(parcial, 'rb') as origem:
+                cabecalho = origem.readline()
+                if not cabecalho:
+                    continue
+                if not cabecalho_escrito:
+                    destino.write(cabecalho)
+                    cabecalho_escrito = True
+                shutil.copyfileobj(origem, destino, 16 * 1024 ** 2)
+
+
+def concatenar_parquet(parciais, output_path):
+    """Copia os row groups dos Parquets parciais, em ordem, para um único arquivo"""
+    writer = None
+    try:
+        for parcial in parciais:
+            if not Path(parcial).exists():
+                continue
+            arquivo = pq.ParquetFile(parcial)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, arquivo.schema_arrow, compression='zstd')
+            for i in range(arquivo.num_row_groups):
+                writer.write_table(arquivo.read_row_group(i))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def processar_em_paralelo(checkpoint, fontes, carregar_tabelas, enriquecer, workers,
+                          chunk_size=100000, limite_memoria_mb=None):
+    """Enriquece as fontes pendentes do checkpoint com um pool de processos
+
+    O limite de memória, se informado, é repartido igualmente entre os workers.
+    """
+    limite_worker = limite_memoria_mb / workers if limite_memoria_mb else None
+    pendentes = checkpoint.pendentes()
+
+    print(f"🧵 {len(pendentes)} partes distribuídas entre {workers} processos")
+
+    # Com outras threads de trabalho ativas (agendador, downloads) um fork herdaria travas
+    # possivelmente presas por elas; nesse caso os workers partem de um interpretador novo.
+    # Threads daemon (monitor de memória, tqdm) não contam.
+    outras = [t for t in threading.enumerate() if t is not threading.current_thread() and not t.daemon]
+    contexto = multiprocessing.get_context("spawn") if outras else None
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                             initargs=(carregar_tabelas, enriquecer), mp_context=contexto) as pool:
+        futuros = [
+            pool.submit(_processar_fonte, checkpoint, indice, fontes[indice], chunk_size, limite_worker)
+            for indice in pendentes
+        ]
+        for futuro in tqdm(futuros, desc="Processando partes"):
+            _, contadores_worker = futuro.result()
+            somar_contadores(contadores_worker)
+
+
+def consolidar_checkpoint(checkpoint):
+    """Junta os fragmentos confirmados nas saídas finais e remove o checkpoint
+
+    Cada saída é montada em um .tmp e renomeada; os fragmentos só são apagados
+    depois, então uma falha aqui também pode ser retomada. Um fragmento único
+    é renomeado direto para a saída, sem cópia.
+    """
+    for formato, caminho in checkpoint.saida.arquivos().items():
+        fragmentos = checkpoint.fragmentos(formato)
+        if not fragmentos:
+            continue
+        temporario = caminho.with_name(caminho.name + ".tmp")
+        if len(fragmentos) == 1:
+            # Os bytes do fragmento já foram contados ao gravá-lo
+            os.replace(fragmentos[0], caminho)
+            continue
+        if formato == 'parquet':
+            concatenar_parquet(fragmentos, temporario)
+        else:
+            concatenar_parciais(fragmentos, temporario)
+        os.replace(temporario, caminho)
+        contar("bytes_gravados", caminho.stat().st_size)
+
+    total = checkpoint.registros()
+    checkpoint.limpar()
+    return total
+
+
+def executar_enriquecimento(fontes, saida, carregar_tabelas, enriquecer, workers=1,
+                            chunk_size=100000, limite_memoria_mb=None, retomar=False):
+    """Enriquece as fontes em um único processo ou em um pool, conforme workers
+
+    Com retomar=True o progresso fica em checkpoint (ver src.processors.checkpoint)
+    e uma execução interrompida com --resume continua do último fragmento
+    confirmado. Sem retomada e sem pool os chunks vão direto para a saída final:
+    gravar fragmentos e depois juntá-los dobraria a escrita em disco.
+    carregar_tabelas recebe compilar=False nos workers; a referência das
+    tabelas auxiliares é compilada aqui, uma vez, antes de criá-los.
+    """
+    preparar_referencia()
+    if not retomar and (workers <= 1 or len(fontes) <= 1):
+        tabelas = carregar_tabelas()
+        with saida.abrir() as sink:
+            return processar_fontes(fontes, sink, enriquecer, tabelas, chunk_size, limite_memoria_mb,
+                                    tipos=saida.tipos)
+
+    checkpoint = Checkpoint(saida, fontes, retomar)
+    pendentes = checkpoint.pendentes()
+
+    if workers > 1 and len(pendentes) > 1:
+        processar_em_paralelo(checkpoint, fontes, carregar_tabelas, enriquecer,
+                              workers, chunk_size, limite_memoria_mb)
+    elif pendentes:
+        tabelas = carregar_tabelas()
+        for indice in pendentes:
+            checkpoint.processar_fonte(indice, fontes[indice], enriquecer, tabelas,
+                                       chunk_size, limite_memoria_mb)
+
+    return consolidar_checkpoint(checkpoint)
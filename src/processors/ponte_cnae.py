@@ -0,0 +1,146 @@
+"""
+Ponte estabelecimento × CNAE e índice invertido CNAE → CNPJ
+
+cnae_fiscal_secundario chega como uma lista de códigos separados por vírgula,
+então "estabelecimentos com o CNAE X, principal ou secundário" exigiria um
+LIKE sobre todos os estabelecimentos. A ponte normaliza essa lista:
+
+    database/estabelecimento_cnae.parquet   uma linha por (cnae, CNPJ), principal = 1/0,
+                                            ordenada por cnae e CNPJ
+    database/indice_cnae/                   índice invertido em arrays numpy (lidos com mmap):
+        cnaes.npy      códigos CNAE distintos, em ordem (int32)
+        inicios.npy    posição do primeiro CNPJ de cada CNAE em cnpjs.npy (int64, n + 1)
+        cnpjs.npy      CNPJs agrupados por CNAE e ordenados (int64)
+        principal.npy  1 se o CNAE é o principal do CNPJ (int8)
+
+Com a ordenação, filtros por cnae no Parquet pulam quase todos os row groups;
+o índice responde com uma busca binária e uma fatia (src/queries/consulta_cnae.py).
+No MySQL a ponte é a tabela estabelecimento_cnae, com chave (cnae, CNPJ).
+"""
+
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.agendador import saidas_atualizadas
+from src.processors.dataset import (FALSO_POSITIVO_BLOOM, LINHAS_POR_ROW_GROUP, _opcoes_copy,
+                                    parquet_final)
+from src.processors.duckdb_engine import literal, conectar
+from src.schemas.estabSchema import ESTABELECIMENTO_CNAE_SCHEMA
+
+PARQUET_PONTE = Path("database") / "estabelecimento_cnae.parquet"
+DIRETORIO_INDICE = Path("database") / "indice_cnae"
+ARQUIVOS_INDICE = ("cnaes", "inicios", "cnpjs", "principal")
+
+
+def consulta_ponte(origem):
+    """SELECT que explode o CNAE principal e os secundários em linhas (cnae, CNPJ)
+
+    Códigos que não têm 7 dígitos são descartados; um secundário repetido ou
+    igual ao principal gera uma única linha, marcada como principal.
+    """
+    return f"""
+        SELECT cnae, CNPJ, cnpj_basico, CAST(MAX(principal) AS SMALLINT) AS principal
+        FROM (
+            SELECT CAST(cnae_fiscal_principal AS VARCHAR) AS cnae, CNPJ, cnpj_basico, 1 AS principal
+            FROM read_parquet({literal(origem)})
+            UNION ALL
+            SELECT trim(unnest(string_split(cnae_fiscal_secundario, ','))) AS cnae, CNPJ, cnpj_basico, 0
+            FROM read_parquet({literal(origem)})
+        )
+        WHERE regexp_full_match(cnae, '[0-9]{{7}}') AND CNPJ IS NOT NULL
+        GROUP BY cnae, CNPJ, cnpj_basico
+        ORDER BY cnae, CNPJ
+    """
+
+
+def escrever_indice(ponte=PARQUET_PONTE, diretorio=DIRETORIO_INDICE, lote=1000000):
+    """Grava o índice invertido a partir da ponte já ordenada; retorna o número de CNAEs
+
+    Os arrays são preenchidos lote a lote em arquivos mapeados em memória, então
+    o consumo não depende do tamanho da ponte.
+    """
+    ponte, diretorio = Path(ponte), Path(diretorio)
+    temporario = diretorio.with_name(diretorio.name + ".tmp")
+    if temporario.exists():
+        shutil.rmtree(temporario)
+    temporario.mkdir(parents=True)
+
+    arquivo = pq.ParquetFile(ponte)
+    total = arquivo.metadata.num_rows
+    cnpjs = np.lib.format.open_memmap(temporario / "cnpjs.npy", mode="w+", dtype=np.int64, shape=(total,))
+    principal = np.lib.format.open_memmap(temporario / "principal.npy", mode="w+", dtype=np.int8, shape=(total,))
+
+    contagens = {}
+    posicao = 0
+    for batch in arquivo.iter_batches(batch_size=lote, columns=["cnae", "CNPJ", "principal"]):
+        fim = posicao + batch.num_rows
+        cnpjs[posicao:fim] = pc.cast(batch.column("CNPJ"), "int64").to_numpy()
+        principal[posicao:fim] = batch.column("principal").to_numpy(zero_copy_only=False)
+        codigos, quantidades = np.unique(pc.cast(batch.column("cnae"), "int32").to_numpy(), return_counts=True)
+        for codigo, quantidade in zip(codigos.tolist(), quantidades.tolist()):
+            contagens[codigo] = contagens.get(codigo, 0) + quantidade
+        posicao = fim
+    cnpjs.flush()
+    principal.flush()
+    del cnpjs, principal
+
+    # A ponte está ordenada por cnae, então cada CNAE ocupa uma faixa contínua
+    cnaes = np.array(sorted(contagens), dtype=np.int32)
+    inicios = np.zeros(len(cnaes) + 1, dtype=np.int64)
+    inicios[1:] = np.cumsum([contagens[codigo] for codigo in cnaes.tolist()])
+    np.save(temporario / "cnaes.npy", cnaes)
+    np.save(temporario / "inicios.npy", inicios)
+
+    if diretorio.exists():
+        shutil.rmtree(diretorio)
+    os.replace(temporario, diretorio)
+    return len(cnaes)
+
+
+def gerar_ponte_cnae(origem=None, destino=PARQUET_PONTE, diretorio_indice=DIRETORIO_INDICE,
+                     linhas_por_row_group=LINHAS_POR_ROW_GROUP, falso_positivo_bloom=FALSO_POSITIVO_BLOOM,
+                     threads=None, limite_memoria_mb=None):
+    """Gera a ponte estabelecimento × CNAE e o índice invertido; retorna as linhas da ponte"""
+    origem = Path(origem or parquet_final("estabelecimentos"))
+    if not origem.exists():
+        print(f"❌ Arquivo não encontrado: {origem}")
+        return None
+
+    destino = Path(destino)
+    temporario = destino.with_name(destino.name + ".tmp")
+    print(f"🔗 Explodindo CNAEs secundários de {origem.name}...")
+    inicio = time.perf_counter()
+    con = conectar(threads, limite_memoria_mb)
+    try:
+        # A ordem por cnae e CNPJ precisa chegar intacta ao arquivo
+        con.execute("SET preserve_insertion_order = true")
+        con.execute(f"""
+            COPY ({consulta_ponte(origem)}) TO {literal(temporario)}
+            ({_opcoes_copy(linhas_por_row_group, falso_positivo_bloom)})
+        """)
+    finally:
+        con.close()
+    os.replace(temporario, destino)
+
+    linhas = pq.read_metadata(destino).num_rows
+    cnaes = escrever_indice(destino, diretorio_indice)
+    print(f"✅ {linhas:,} pares estabelecimento × CNAE e índice de {cnaes:,} CNAEs "
+          f"({time.perf_counter() - inicio:.1f}s) → {destino}, {diretorio_indice}")
+    return linhas
+
+
+def ponte_atualizada(origem=None, destino=PARQUET_PONTE, diretorio_indice=DIRETORIO_INDICE):
+    """True se a ponte e o índice existem e são mais novos que o Parquet de estabelecimentos"""
+    origem = Path(origem or parquet_final("estabelecimentos"))
+    if not Path(destino).exists() or pq.read_schema(destino).names != ESTABELECIMENTO_CNAE_SCHEMA:
+        return False
+    return saidas_atualizadas([origem], [destino] + [Path(diretorio_indice) / f"{nome}.npy"
+                                                     for nome in ARQUIVOS_INDICE])
@@ -0,0 +1,241 @@
+"""
+Referência compilada das tabelas auxiliares: Auxiliar/*.csv → arrays lidos com mmap
+
+As tabelas (CNAE, município, país, motivo, natureza, qualificação, além das
+fixas de porte e situação) são compiladas uma vez em database/referencia/:
+
+    textos.bin            descrições distintas de todas as tabelas, concatenadas (UTF-8)
+    textos_inicios.npy    posição de cada descrição em textos.bin (int64, n + 1)
+    {tabela}.npy          id da descrição de cada código (int32; -1 = código inexistente)
+    {tabela}_codigos.npy  códigos ordenados, só nas tabelas esparsas (CNAE)
+    referencia.json       largura dos códigos e formato de cada tabela
+
+Nas tabelas densas o próprio código é a posição no array; o CNAE (7 dígitos)
+usaria 10 milhões de posições para 1.359 códigos, então é resolvido por busca
+binária em {tabela}_codigos.npy. Abrir a referência custa microssegundos,
+contra a releitura dos CSVs (em latin-1) a cada execução.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.agendador import saidas_atualizadas
+from src.processors.auxiliares import DIRETORIO_AUXILIAR, ler_auxiliar
+from src.schemas.auxSchema import AUXILIARES, TABELAS_FIXAS
+
+DIRETORIO_REFERENCIA = Path("database") / "referencia"
+TABELAS = (*AUXILIARES, *TABELAS_FIXAS)
+# Tabelas com código maior que isto ficam esparsas (códigos ordenados + busca binária)
+LIMITE_DENSO = 1 << 16
+# Serializa a compilação entre threads do mesmo processo (constructors do agendador)
+_compilacao = threading.Lock()
+
+
+def arquivos_referencia(destino=DIRETORIO_REFERENCIA):
+    """Arquivos gerados na compilação; os _codigos.npy das tabelas esparsas são conferidos na abertura"""
+    destino = Path(destino)
+    return ([destino / "textos.bin", destino / "textos_inicios.npy", destino / "referencia.json"] +
+            [destino / f"{nome}.npy" for nome in TABELAS])
+
+
+def compilar_referencia(origem=DIRETORIO_AUXILIAR, destino=DIRETORIO_REFERENCIA):
+    """Compila as tabelas auxiliares em database/referencia/; retorna o total de códigos"""
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    # Diretório temporário exclusivo: constructors em paralelo podem compilar ao mesmo tempo
+    temporario = Path(tempfile.mkdtemp(prefix=destino.name + ".tmp", dir=destino.parent))
+    textos, tabelas, total = {}, {}, 0
+    for nome in TABELAS:
+        df = ler_auxiliar(nome, origem).dropna(subset=["codigo"])
+        codigos = df["codigo"].str.strip()
+        larguras = codigos.str.len().unique()
+        if len(larguras) != 1 or not codigos.str.fullmatch(r"[0-9]+").all():
+            raise ValueError(f"Tabela auxiliar {nome}: códigos devem ser numéricos e de largura fixa")
+        numeros = codigos.astype(np.int64).to_numpy()
+        ids = np.array([textos.setdefault(descricao, len(textos)) for descricao in df["descricao"].fillna("")],
+                       dtype=np.int32)
+        denso = int(numeros.max()) < LIMITE_DENSO
+        if denso:
+            posicoes = np.full(int(numeros.max()) + 1, -1, dtype=np.int32)
+            posicoes[numeros] = ids
+        else:
+            ordem = np.argsort(numeros, kind="stable")
+            np.save(temporario / f"{nome}_codigos.npy", numeros[ordem].astype(np.int32))
+            posicoes = ids[ordem]
+        np.save(temporario / f"{nome}.npy", posicoes)
+        tabelas[nome] = {"largura": int(larguras[0]), "codigos": len(numeros), "denso": denso}
+        total += len(numeros)
+
+    codificados = [texto.encode("utf-8") for texto in textos]
+    inicios = np.zeros(len(codificados) + 1, dtype=np.int64)
+    inicios[1:] = np.cumsum([len(texto) for texto in codificados])
+    with open(temporario / "textos.bin", "wb") as f:
+        f.write(b"".join(codificados))
+    np.save(temporario / "textos_inicios.npy", inicios)
+    with open(temporario / "referencia.json", "w", encoding="utf-8") as f:
+        json.dump({"tabelas": tabelas, "textos": len(codificados)}, f, indent=2)
+
+    _publicar(temporario, destino, origem)
+    return total
+
+
+def _publicar(temporario, destino, origem):
+    """Troca destino pelo diretório recém-compilado
+
+    Uma referência já atualizada (publicada por outro processo durante a
+    compilação) é mantida. A antiga é renomeada para o lado antes da troca e
+    só então apagada, nunca removida no lugar.
+    """
+    if referencia_atualizada(origem, destino):
+        shutil.rmtree(temporario, ignore_errors=True)
+        return
+    antiga = Path(tempfile.mkdtemp(prefix=destino.name + ".antiga", dir=destino.parent))
+    try:
+        os.replace(destino, antiga / destino.name)
+    except FileNotFoundError:
+        pass
+    try:
+        os.replace(temporario, destino)
+    except OSError:
+        # Outro processo publicou a referência primeiro; a dele vale
+        shutil.rmtree(temporario, ignore_errors=True)
+    shutil.rmtree(antiga, ignore_errors=True)
+
+
+def referencia_atualizada(origem=DIRETORIO_AUXILIAR, destino=DIRETORIO_REFERENCIA):
+    """True se a referência existe completa e é mais nova que os CSVs de Auxiliar/"""
+    return saidas_atualizadas([Path(origem) / arquivo for arquivo, _ in AUXILIARES.values()],
+                              arquivos_referencia(destino))
+
+
+class TabelaReferencia:
+    """Uma tabela da referência: código inteiro → id da descrição no conjunto de textos"""
+
+    def __init__(self, referencia, nome, posicoes, codigos, largura):
+        self.referencia = referencia
+        self.nome = nome
+        self.largura = largura
+        self._posicoes = posicoes
+        self._codigos = codigos
+
+    def __len__(self):
+        return int((np.asarray(self._posicoes) >= 0).sum())
+
+    def ids(self, numeros):
+        """Id da descrição de cada código inteiro (-1 se o código não existe)"""
+        numeros = np.asarray(numeros, dtype=np.int64)
+        if self._codigos is None:
+            validos = (numeros >= 0) & (numeros < len(self._posicoes))
+            return np.where(validos, self._posicoes[np.where(validos, numeros, 0)], -1)
+        posicoes = np.minimum(np.searchsorted(self._codigos, numeros), len(self._codigos) - 1)
+        return np.where(self._codigos[posicoes] == numeros, self._posicoes[posicoes], -1)
+
+    def ids_usados(self):
+        """Ids distintos das descrições da tabela, ordenados"""
+        posicoes = np.asarray(self._posicoes)
+        return np.unique(posicoes[posicoes >= 0])
+
+    def numeros(self, codigos):
+        """Códigos em texto como inteiros; fora do formato da tabela (dígitos e largura) viram -1"""
+        codigos = pd.Series(codigos, dtype="string")
+        validos = codigos.str.fullmatch(f"[0-9]{{{self.largura}}}").fillna(False).to_numpy(dtype=bool)
+        numeros = np.full(len(codigos), -1, dtype=np.int64)
+        numeros[validos] = codigos[validos].astype(np.int64).to_numpy()
+        return numeros
+
+    def itens(self):
+        """[(código em texto, descrição)] de todos os códigos da tabela, em ordem"""
+        if self._codigos is None:
+            numeros = np.flatnonzero(np.asarray(self._posicoes) >= 0)
+        else:
+            numeros = np.asarray(self._codigos)
+        textos = self.referencia.textos(self.ids(numeros))
+        return [(f"{numero:0{self.largura}d}", texto) for numero, texto in zip(numeros.tolist(), textos)]
+
+    def descricao(self, codigo):
+        """Descrição de um único código (texto ou inteiro), ou None"""
+        if isinstance(codigo, (int, np.integer)):
+            numero = int(codigo)
+        else:
+            codigo = str(codigo)
+            numero = int(codigo) if len(codigo) == self.largura and codigo.isascii() and codigo.isdigit() else -1
+        if self._codigos is None:
+            return self.referencia.texto(int(self._posicoes[numero]) if 0 <= numero < len(self._posicoes) else -1)
+        return self.referencia.texto(int(self.ids([numero])[0]))
+
+
+class Referencia:
+    """Referência compilada, mapeada em memória; abrir não lê nenhuma tabela inteira"""
+
+    def __init__(self, diretorio=DIRETORIO_REFERENCIA):
+        diretorio = Path(diretorio)
+        faltando = [arquivo.name for arquivo in arquivos_referencia(diretorio) if not arquivo.exists()]
+        if faltando:
+            raise FileNotFoundError(f"Referência incompleta em {diretorio}: {', '.join(faltando)}")
+        self.diretorio = diretorio
+        with open(diretorio / "referencia.json", encoding="utf-8") as f:
+            self.resumo = json.load(f)
+        self._arquivo = open(diretorio / "textos.bin", "rb")
+        self._dados = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._inicios = np.load(diretorio / "textos_inicios.npy", mmap_mode="r")
+        self._tabelas = {}
+
+    def texto(self, id_texto):
+        """Descrição pelo id, ou None para -1"""
+        if id_texto < 0:
+            return None
+        return self._dados[int(self._inicios[id_texto]):int(self._inicios[id_texto + 1])].decode("utf-8")
+
+    def textos(self, ids):
+        return [self.texto(id_texto) for id_texto in np.asarray(ids).tolist()]
+
+    def tabela(self, nome):
+        if nome not in self._tabelas:
+            formato = self.resumo["tabelas"][nome]
+            posicoes = np.load(self.diretorio / f"{nome}.npy", mmap_mode="r")
+            codigos = None if formato["denso"] else np.load(self.diretorio / f"{nome}_codigos.npy", mmap_mode="r")
+            self._tabelas[nome] = TabelaReferencia(self, nome, posicoes, codigos, formato["largura"])
+        return self._tabelas[nome]
+
+    def descricao(self, nome, codigo):
+        return self.tabela(nome).descricao(codigo)
+
+
+def preparar_referencia(origem=DIRETORIO_AUXILIAR, destino=DIRETORIO_REFERENCIA):
+    """(Re)compila a referência se faltar ou se Auxiliar/ mudou; True se compilou
+
+    Deve rodar no processo principal antes de criar workers, que só a abrem.
+    """
+    with _compilacao:
+        if referencia_atualizada(origem, destino):
+            return False
+        compilar_referencia(origem, destino)
+        return True
+
+
+def abrir_referencia(origem=DIRETORIO_AUXILIAR, destino=DIRETORIO_REFERENCIA, compilar=True):
+    """Abre a referência compilada; com compilar=False (workers) não tenta recompilá-la
+
+    Outro processo pode estar trocando o diretório (entre os dois renames ele
+    some por instantes), então a abertura é tentada mais algumas vezes.
+    """
+    if compilar:
+        preparar_referencia(origem, destino)
+    for tentativa in range(3):
+        try:
+            return Referencia(destino)
+        except FileNotFoundError:
+            if tentativa == 2:
+                raise
+            time.sleep(0.1)
@@ -1,48 +1,67 @@
-import pandas as pd
-import os
-from tqdm import tqdm
 from pathlib import Path
 import sys
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
-from src.schemas.sociosSchema import SOCIOS_SCHEMA
+from src.schemas.sociosSchema import SOCIOS_SCHEMA, SOCIOS_TIPOS, SOCIOS_ENRIQUECIMENTO
+from src.processors.auxiliares import carregar_auxiliares, aplicar_enriquecimento
+from src.processors.fontes import dividir_em_faixas, membros_zip
+from src.processors.paralelo import executar_enriquecimento
+from src.processors.duckdb_engine import enriquecer_com_duckdb
+from src.processors.streaming import Saida
 
-def sociosConstructor(chunk_size=100000):
-    """Processa e enriquece dados de sócios"""
+def carregar_tabelas_socios(compilar=True):
+    """Carrega as tabelas auxiliares usadas no enriquecimento de sócios"""
+    return carregar_auxiliares(SOCIOS_ENRIQUECIMENTO, compilar=compilar)
+
+def enriquecer_socios(chunk, tabelas):
+    """Enriquece um chunk de sócios com qualificação e país"""
+    return aplicar_enriquecimento(chunk, tabelas, SOCIOS_ENRIQUECIMENTO)
+
+def sociosConstructor(chunk_size=100000, limite_memoria_mb=None, workers=1, origem='csv',
+                      csv=False, engine='pandas', retomar=False):
+    """Processa e enriquece dados de sócios
+
+    origem='csv' lê Data/socios_final.csv; origem='zip' lê os membros .SOCIOCSV
+    diretamente dos zips baixados, sem extraí-los. A saída é gravada em
+    Parquet tipado (database/socios_final.parquet); csv=True gera também o CSV.
+    engine='duckdb' executa o enriquecimento como uma única consulta SQL.
+    retomar=True continua do último checkpoint de uma execução interrompida.
+    """
     input_directory = Path("Data")
     csv_file = input_directory / "socios_final.csv"
-    qualificacoes_path = Path("Auxiliar") / "qualificacoes.csv"
-    paises_path = Path("Auxiliar") / "paises.csv"
-    output_path = Path("database") / "socios_final.csv"
+    saida = Saida(Path("database") / "socios_final", SOCIOS_TIPOS, csv=csv)
     
-    if not csv_file.exists():
+    if origem == 'zip':
+        fontes = membros_zip(input_directory, "Socios", ".SOCIOCSV", SOCIOS_SCHEMA)
+        if not fontes:
+            print(f"❌ Nenhum arquivo .SOCIOCSV encontrado nos zips de {input_directory}")
+            return
+    elif not csv_file.exists():
         print(f"❌ Arquivo não encontrado: {csv_file}")
         return
+    else:
+        fontes = dividir_em_faixas(csv_file, workers * 4)
     
     try:
-        qualificacoes = pd.read_csv(qualificacoes_path, sep=';', encoding='latin1', dtype=str)
-        paises = pd.read_csv(paises_path, sep=';', encoding='utf-8', dtype=str)
-        
-        output_path.parent.mkdir(exist_ok=True)
-        
         print("👥 Processando sócios...")
         
-        chunk_list = []
-        for chunk in tqdm(pd.read_csv(csv_file, sep=';', chunksize=chunk_size, dtype=str), 
-                         desc="Processando chunks"):
-            
-            chunk = chunk.merge(qualificacoes, left_on='qualificacao_socio', right_on='id', how='left')
-            chunk = chunk.merge(paises, left_on='pais', right_on='codigo', how='left')
-            
-            chunk_list.append(chunk)
-        
-        df_final = pd.concat(chunk_list, ignore_index=True)
-        df_final.to_csv(output_path, index=False, sep=';', encoding='utf-8')
+        if engine == 'duckdb':
+            total = enriquecer_com_duckdb(fontes, saida, SOCIOS_SCHEMA, SOCIOS_TIPOS, SOCIOS_ENRIQUECIMENTO,
+                                          threads=workers if workers > 1 else None,
+                                          limite_memoria_mb=limite_memoria_mb)
+        else:
+            total = executar_enriquecimento(fontes, saida, carregar_tabelas_socios,
+                                            enriquecer_socios, workers, chunk_size, limite_memoria_mb,
+                                            retomar=retomar)
         
-        print(f"✅ Arquivo processado salvo: {output_path}")
-        print(f"📊 Total de registros: {len(df_final):,}")
+        for caminho in saida.arquivos().values():
+            print(f"✅ Arquivo processado salvo: {caminho}")
+        print(f"📊 Total de registros: {total:,}")
+        return total
         
     except Exception as e:
         print(f"❌ Erro durante processamento: {e}")
+        if engine != 'duckdb':
+            print("💾 Fragmentos já confirmados foram mantidos; rode novamente com --resume para continuar")
         import traceback
         traceback.print_exc()
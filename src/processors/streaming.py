@@ -0,0 +1,312 @@
+"""
+Processamento em streaming: cada chunk enriquecido é gravado imediatamente
+no destino, mantendo a memória limitada independente do tamanho da entrada
+
+Os destinos gravam em um arquivo .tmp e só o renomeiam para o caminho final
+ao fechar sem erro; uma execução interrompida nunca deixa um arquivo final
+truncado nem apaga o resultado da execução anterior.
+"""
+
+import gc
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from src.processors.metricas import contar, cronometrar, memoria_rss_mb
+from src.schemas.tipos import converter_chunk, dtypes_leitura, tabela_arrow
+
+CHUNK_SIZE_MINIMO = 1000
+# Teto de linhas por row group; cada chunk gravado gera ao menos um row group
+ROW_GROUP_SIZE = 100000
+
+# Fração do limite de memória reservada para um chunk lido. O restante cobre
+# as cópias feitas durante o enriquecimento e a serialização do chunk.
+FRACAO_CHUNK = 0.25
+
+# Teto de RSS do processo inteiro quando várias tarefas dividem o mesmo processo
+# (agendador com mais de uma vaga de CPU). Cada tarefa recebe só uma fração do
+# teto para dimensionar seus chunks, mas o RSS medido é o de todas juntas.
+_limites = {"processo_mb": None}
+
+
+def definir_limite_processo(limite_mb):
+    """Define o teto de RSS do processo usado por ControleMemoria.verificar (None desativa)"""
+    _limites["processo_mb"] = limite_mb
+
+
+class ControleMemoria:
+    """Ajusta o tamanho dos chunks para respeitar um teto de memória"""
+
+    def __init__(self, chunk_size, limite_memoria_mb=None):
+        self.chunk_size_maximo = chunk_size
+        self.tamanho = chunk_size
+        self.limite_memoria_mb = limite_memoria_mb
+
+    def ajustar(self, chunk):
+        """Recalcula o tamanho do próximo chunk a partir do chunk processado"""
+        if not self.limite_memoria_mb or len(chunk) == 0:
+            return
+
+        bytes_por_linha = chunk.memory_usage(deep=True).sum() / len(chunk)
+        orcamento = self.limite_memoria_mb * FRACAO_CHUNK * 1024 ** 2
+        self.tamanho = int(max(CHUNK_SIZE_MINIMO,
+                               min(self.chunk_size_maximo, orcamento / bytes_por_linha)))
+
+    def verificar(self):
+        """Reduz o chunk se o processo ultrapassou o teto; falha se já estiver no mínimo
+
+        O teto é o do processo, se definido (tarefas concorrentes em threads),
+        senão o limite deste controle.
+        """
+        if not self.limite_memoria_mb:
+            return
+
+        teto = _limites["processo_mb"] or self.limite_memoria_mb
+        if memoria_rss_mb() <= teto:
+            return
+
+        gc.collect()
+        rss = memoria_rss_mb()
+        if rss <= teto:
+            return
+
+        if self.tamanho <= CHUNK_SIZE_MINIMO:
+            raise MemoryError(
+                f"Uso de memória ({rss:.0f}MB) acima do limite de {teto}MB"
+            )
+
+        self.chunk_size_maximo = max(CHUNK_SIZE_MINIMO, self.tamanho // 2)
+        self.tamanho = self.chunk_size_maximo
+
+
+def _temporario(caminho):
+    return caminho.with_name(caminho.name + ".tmp")
+
+
+class CsvSink:
+    """Destino CSV que recebe chunks em modo append, com cabeçalho único"""
+
+    def __init__(self, caminho, sep=';', encoding='utf-8'):
+        self.caminho = Path(caminho)
+        self.sep = sep
+        self.encoding = encoding
+        self.registros = 0
+        self._arquivo = None
+
+    def __enter__(self):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._arquivo = open(_temporario(self.caminho), 'w', encoding=self.encoding, newline='')
+        return self
+
+    def escrever(self, chunk):
+        chunk.to_csv(self._arquivo, header=(self.registros == 0), index=False, sep=self.sep)
+        self.registros += len(chunk)
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+            os.replace(_temporario(self.caminho), self.caminho)
+            contar("bytes_gravados", self.caminho.stat().st_size)
+
+    def descartar(self):
+        """Fecha e remove o arquivo temporário sem tocar no caminho final"""
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+        _temporario(self.caminho).unlink(missing_ok=True)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.fechar()
+        else:
+            self.descartar()
+        return False
+
+
+class ParquetSink:
+    """Destino Parquet gravado em row groups com o schema declarado da entidade"""
+
+    def __init__(self, caminho, tipos=None, row_group_size=ROW_GROUP_SIZE, compression='zstd'):
+        self.caminho = Path(caminho)
+        self.tipos = tipos
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.registros = 0
+        self._writer = None
+
+    def __enter__(self):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def escrever(self, chunk):
+        tabela = tabela_arrow(chunk, self.tipos)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(_temporario(self.caminho), tabela.schema,
+                                            compression=self.compression)
+        self._writer.write_table(tabela, row_group_size=self.row_group_size)
+        self.registros += len(chunk)
+
+    def fechar(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(_temporario(self.caminho), self.caminho)
+            contar("bytes_gravados", self.caminho.stat().st_size)
+
+    def descartar(self):
+        """Fecha e remove o arquivo temporário sem tocar no caminho final"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        _temporario(self.caminho).unlink(missing_ok=True)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.fechar()
+        else:
+            self.descartar()
+        return False
+
+
+class MultiSink:
+    """Replica cada chunk em vários destinos"""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    @property
+    def registros(self):
+        return self.sinks[0].registros
+
+    def __enter__(self):
+        for sink in self.sinks:
+            sink.__enter__()
+        return self
+
+    def escrever(self, chunk):
+        for sink in self.sinks:
+            sink.escrever(chunk)
+
+    def __exit__(self, exc_type, exc, tb):
+        for sink in self.sinks:
+            sink.__exit__(exc_type, exc, tb)
+        return False
+
+
+class Saida:
+    """Descreve os arquivos de saída de uma entidade: Parquet e/ou CSV
+
+    caminho é o nome base, sem extensão (ex.: database/empresas_final).
+    """
+
+    def __init__(self, caminho, tipos=None, parquet=True, csv=False, row_group_size=ROW_GROUP_SIZE):
+        if not parquet and not csv:
+            raise ValueError("Ao menos um formato de saída deve ser gerado")
+        self.caminho = Path(caminho)
+        self.tipos = tipos
+        self.parquet = parquet
+        self.csv = csv
+        self.row_group_size = row_group_size
+
+    def arquivos(self):
+        """Retorna {formato: caminho} dos arquivos gerados"""
+        arquivos = {}
+        if self.parquet:
+            arquivos['parquet'] = self.caminho.with_name(self.caminho.name + '.parquet')
+        if self.csv:
+            arquivos['csv'] = self.caminho.with_name(self.caminho.name + '.csv')
+        return arquivos
+
+    def para(self, caminho):
+        """Mesma configuração de saída em outro caminho base"""
+        return Saida(caminho, self.tipos, self.parquet, self.csv, self.row_group_size)
+
+    def abrir(self):
+        sinks = []
+        for formato, caminho in self.arquivos().items():
+            if formato == 'parquet':
+                sinks.append(ParquetSink(caminho, self.tipos, self.row_group_size))
+            else:
+                sinks.append(CsvSink(caminho))
+        return MultiSink(sinks)
+
+
+def ler_chunks(csv_file, chunk_size=100000, limite_memoria_mb=None, tipos=None, pular=0, **read_csv_kwargs):
+    """Lê um CSV em chunks cujo tamanho respeita o limite de memória
+
+    Gera tuplas (chunk, controle); o consumidor deve chamar controle.ajustar()
+    com o chunk já processado para calibrar a leitura seguinte. Com tipos, cada
+    chunk já sai convertido para os tipos declarados no schema. As primeiras
+    `pular` linhas válidas são lidas e descartadas (retomada de checkpoint).
+    """
+    # O tamanho do chunk já é controlado aqui; com low_memory o parser ainda o divide em
+    # blocos internos, e uma coluna categórica toda nula em um deles (ex.: pais) quebra a união
+    opcoes = {'sep': ';', 'dtype': str, 'low_memory': False}
+    opcoes.update(read_csv_kwargs)
+
+    controle = ControleMemoria(chunk_size, limite_memoria_mb)
+
+    with pd.read_csv(csv_file, iterator=True, **opcoes) as reader:
+        while True:
+            try:
+                with cronometrar("leitura"):
+                    chunk = reader.get_chunk(controle.tamanho)
+            except StopIteration:
+                break
+
+            if pular:
+                descartadas = min(pular, len(chunk))
+                pular -= descartadas
+                chunk = chunk.iloc[descartadas:].reset_index(drop=True)
+                if chunk.empty:
+                    continue
+
+            contar("chunks")
+            contar("linhas_lidas", len(chunk))
+            if tipos:
+                with cronometrar("conversao"):
+                    chunk = converter_chunk(chunk, tipos)
+            yield chunk, controle
+            controle.verificar()
+
+
+def processar_em_streaming(csv_file, sink, enriquecer, tabelas, chunk_size=100000,
+                           limite_memoria_mb=None, desc="Processando chunks",
+                           mostrar_progresso=True, tipos=None, pular=0, **read_csv_kwargs):
+    """Lê, enriquece e grava chunk a chunk; retorna o total de registros gravados"""
+    with tqdm(desc=desc, unit=" linhas", unit_scale=True, disable=not mostrar_progresso) as barra:
+        for chunk, controle in ler_chunks(csv_file, chunk_size, limite_memoria_mb, tipos, pular,
+                                          **read_csv_kwargs):
+            with cronometrar("enriquecimento"):
+                chunk = enriquecer(chunk, tabelas)
+            with cronometrar("escrita"):
+                sink.escrever(chunk)
+            controle.ajustar(chunk)
+            barra.update(len(chunk))
+            del chunk
+
+    return sink.registros
+
+
+def processar_fontes(fontes, sink, enriquecer, tabelas, chunk_size=100000,
+                     limite_memoria_mb=None, mostrar_progresso=True, tipos=None):
+    """Processa em sequência uma lista de fontes (ver src.processors.fontes) no mesmo destino
+
+    Com tipos, as colunas são lidas já compactas (texto Arrow e categorias)
+    e convertidas para os tipos do schema antes do enriquecimento.
+    """
+    for fonte in fontes:
+        opcoes = fonte.opcoes_leitura()
+        if tipos:
+            opcoes['dtype'] = dtypes_leitura(fonte.colunas, tipos)
+        with fonte.abrir() as stream:
+            processar_em_streaming(stream, sink, enriquecer, tabelas, chunk_size,
+                                   limite_memoria_mb, desc=fonte.nome,
+                                   mostrar_progresso=mostrar_progresso, tipos=tipos,
+                                   **opcoes)
+        contar("bytes_lidos", fonte.tamanho)
+    return sink.registros
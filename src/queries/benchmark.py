@@ -0,0 +1,146 @@
+"""
+Conjunto representativo de consultas analíticas e sua medição repetida
+
+Usado por optimize_data.benchmark_queries e pela suíte scripts/benchmark_pipeline.py.
+As consultas rodam em DuckDB sobre views dos Parquets finais (estabelecimentos
+sobre o dataset particionado, quando atualizado); as variantes
+*_cubo leem os cubos pré-agregados (main_etl.py --cubes) e *_ponte a ponte
+estabelecimento_cnae, quando existem.
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.dataset import fonte_parquet, parquet_final
+
+CONSULTAS = {
+    "contagem_por_porte": """
+        SELECT porte_empresa, COUNT(*) FROM empresas GROUP BY ALL
+    """,
+    "filtro_uf": """
+        SELECT COUNT(*) FROM estabelecimentos WHERE uf = 'SP'
+    """,
+    "top_cnaes_ativas": """
+        SELECT cnae_fiscal_principal, COUNT(*) AS quantidade
+        FROM estabelecimentos
+        WHERE situacao_cadastral = '02'
+        GROUP BY ALL ORDER BY quantidade DESC LIMIT 50
+    """,
+    "uf_porte_capital": """
+        SELECT est.uf, emp.porte_empresa, COUNT(*), AVG(emp.capital_social)
+        FROM estabelecimentos est
+        JOIN empresas emp ON est.cnpj_basico = emp.cnpj_basico
+        WHERE est.identificador_matriz = 1
+        GROUP BY ALL
+    """,
+    "grupos_pj": """
+        SELECT s.cnpj_cpf_socio, COUNT(DISTINCT s.cnpj_basico) AS controladas
+        FROM socios s
+        JOIN empresas e ON s.cnpj_basico = e.cnpj_basico
+        WHERE s.identificador_socio = 1
+        GROUP BY ALL HAVING COUNT(DISTINCT s.cnpj_basico) >= 2
+    """,
+    "busca_cnpj": """
+        SELECT * FROM estabelecimentos WHERE cnpj_basico = ?
+    """,
+    "cnae_secundario": """
+        SELECT CNPJ FROM estabelecimentos
+        WHERE cnae_fiscal_principal = '4781400' OR cnae_fiscal_secundario LIKE '%4781400%'
+    """,
+    "cnae_secundario_ponte": """
+        SELECT CNPJ FROM estabelecimento_cnae WHERE cnae = '4781400'
+    """,
+    "contagem_por_porte_cubo": """
+        SELECT porte_empresa, SUM(quantidade) FROM cubo_empresas GROUP BY ALL
+    """,
+    "top_cnaes_ativas_cubo": """
+        SELECT cnae_fiscal_principal, SUM(quantidade) AS quantidade
+        FROM cubo_estabelecimentos_uf
+        WHERE situacao_cadastral = '02'
+        GROUP BY ALL ORDER BY quantidade DESC LIMIT 50
+    """,
+    "uf_porte_capital_cubo": """
+        SELECT uf, porte_empresa, SUM(quantidade), SUM(capital_social_soma) / SUM(capital_social_contagem)
+        FROM cubo_estabelecimentos_uf
+        WHERE identificador_matriz = 1
+        GROUP BY ALL
+    """
+}
+
+# Consultas parametrizadas: recebem um cnpj_basico sorteado a cada repetição
+PARAMETRIZADAS = {"busca_cnpj"}
+
+
+def conectar_parquets(diretorio=Path("database"), diretorio_cubos=None):
+    """Conexão DuckDB com uma view por entidade sobre os Parquets finais
+
+    Se database/dataset/ estiver atualizado (main_etl.py --dataset), a view
+    lê as partições, e filtros por UF/situação descartam diretórios inteiros.
+    A ponte database/estabelecimento_cnae.parquet vira a view estabelecimento_cnae
+    e cada cubo em database/cubos/<nome>.parquet a view cubo_<nome>.
+    """
+    con = duckdb.connect()
+    for entidade in ("empresas", "estabelecimentos", "socios"):
+        if parquet_final(entidade, diretorio).exists():
+            con.execute(f"CREATE VIEW {entidade} AS SELECT * FROM {fonte_parquet(entidade, diretorio)}")
+    ponte = Path(diretorio) / "estabelecimento_cnae.parquet"
+    if ponte.exists():
+        con.execute(f"CREATE VIEW estabelecimento_cnae AS SELECT * FROM read_parquet('{ponte.as_posix()}')")
+    for arquivo in sorted(Path(diretorio_cubos or Path(diretorio) / "cubos").glob("*.parquet")):
+        con.execute(f"CREATE VIEW cubo_{arquivo.stem} AS SELECT * FROM read_parquet('{arquivo.as_posix()}')")
+    return con
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir_consultas(con, repeticoes=5, aquecimento=1, consultas=None):
+    """Executa cada consulta aquecimento + repeticoes vezes; retorna os tempos por consulta
+
+    Consultas sobre entidades ausentes são registradas com o erro, sem interromper as demais.
+    """
+    consultas = consultas or CONSULTAS
+    chaves = []
+    if PARAMETRIZADAS & set(consultas):
+        try:
+            chaves = [linha[0] for linha in con.execute(
+                f"SELECT cnpj_basico FROM empresas USING SAMPLE {aquecimento + repeticoes} ROWS").fetchall()]
+        except duckdb.Error:
+            chaves = []
+
+    resultados = {}
+    for nome, sql in consultas.items():
+        tempos, linhas = [], 0
+        try:
+            for i in range(aquecimento + repeticoes):
+                params = [chaves[i % len(chaves)]] if nome in PARAMETRIZADAS and chaves else None
+                inicio = time.perf_counter()
+                linhas = len(con.execute(sql, params).fetchall())
+                if i >= aquecimento:
+                    tempos.append(time.perf_counter() - inicio)
+        except duckdb.Error as e:
+            resultados[nome] = {"erro": str(e).splitlines()[0]}
+            continue
+        resultados[nome] = {
+            "segundos": [round(t, 6) for t in tempos],
+            "mediana_s": round(statistics.median(tempos), 6),
+            "p95_s": round(_percentil(tempos, 95), 6),
+            "linhas": linhas
+        }
+    return resultados
+
+
+def exibir_consultas(resultados):
+    for nome, resultado in resultados.items():
+        if "erro" in resultado:
+            print(f"   ⚠️  {nome}: {resultado['erro']}")
+        else:
+            print(f"   {nome}: mediana {resultado['mediana_s'] * 1000:.1f}ms, "
+                  f"p95 {resultado['p95_s'] * 1000:.1f}ms ({resultado['linhas']:,} linhas)")
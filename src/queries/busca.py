@@ -0,0 +1,269 @@
+"""
+Busca de empresas por nome (razão social e nome fantasia) no índice da ETL
+
+Lê database/indice_busca/ (src/processors/indice_busca.py) com mmap. Todos os
+termos da busca precisam aparecer (E); o último é tratado como prefixo, então
+"padaria sao jo" encontra "PADARIA SÃO JOÃO". Palavras vazias e termos de uma
+letra só são descartados nos termos completos: o prefixo "sa" ainda encontra
+"SANTOS". Cada termo é uma busca binária
+no vocabulário e uma fatia de postings ordenadas: os candidatos saem do termo
+mais raro e os demais termos são conferidos só para eles.
+
+O score soma, por termo, o IDF do termo encontrado ponderado pelo campo em
+que aparece (razão social pesa mais que nome fantasia; os dois juntos, mais).
+
+Um prefixo é resolvido por completo quando as postings da sua faixa cabem em
+MAX_POSTINGS_PREFIXO. Acima disso (prefixos de uma ou duas letras em bases
+grandes) só os termos mais frequentes da faixa são usados e o resultado vem
+com completo=False: pode faltar empresa, e mais letras resolvem.
+Uso: python src/queries/busca.py padaria sao jo [--limite 20] [--sem-prefixo] [--nomes]
+"""
+
+import json
+import mmap
+import sys
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+import numpy as np
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.dataset import parquet_final
+from src.processors.indice_busca import ARQUIVOS_BUSCA, DIRETORIO_BUSCA, normalizar_termos
+
+# Peso por campos (bits: 1 razão social, 2 nome fantasia)
+PESOS_CAMPOS = np.array([0.0, 1.0, 0.8, 1.2])
+# Postings lidas de uma vez para resolver a faixa inteira de um prefixo
+MAX_POSTINGS_PREFIXO = 2000000
+# Acima disso: termos do vocabulário considerados (os mais frequentes) e teto de candidatos
+MAX_EXPANSOES = 64
+MAX_CANDIDATOS = 500000
+
+
+class Vocabulario:
+    """Sequência ordenada dos termos do índice, lida de termos.bin sem carregá-lo"""
+
+    def __init__(self, diretorio):
+        self._arquivo = open(diretorio / "termos.bin", "rb")
+        self._dados = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._inicios = np.load(diretorio / "termos_inicios.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self._inicios) - 1
+
+    def __getitem__(self, i):
+        return self._dados[int(self._inicios[i]):int(self._inicios[i + 1])]
+
+    def faixa(self, prefixo):
+        """Índices [inicio, fim) dos termos que começam com o prefixo"""
+        prefixo = prefixo.encode("ascii")
+        return bisect_left(self, prefixo), bisect_left(self, prefixo + b"\xff")
+
+    def posicao(self, termo):
+        """Índice do termo exato, ou None"""
+        termo = termo.encode("ascii")
+        i = bisect_left(self, termo)
+        return i if i < len(self) and self[i] == termo else None
+
+    def fechar(self):
+        self._dados.close()
+        self._arquivo.close()
+
+
+class ResultadoBusca(list):
+    """Resultados de uma busca; completo=False se um prefixo foi truncado e pode faltar empresa"""
+
+    def __init__(self, resultados=(), completo=True):
+        super().__init__(resultados)
+        self.completo = completo
+
+
+class IndiceBusca:
+    """Consulta ao índice de nomes; a instância pode ser compartilhada entre threads"""
+
+    def __init__(self, diretorio=DIRETORIO_BUSCA):
+        diretorio = Path(diretorio)
+        faltando = [nome for nome in ARQUIVOS_BUSCA if not (diretorio / nome).exists()]
+        if faltando:
+            raise FileNotFoundError(f"Índice de busca incompleto em {diretorio} "
+                                    f"(execute main_etl.py --search-index): {', '.join(faltando)}")
+        with open(diretorio / "indice.json", encoding="utf-8") as f:
+            self.resumo = json.load(f)
+        self.vocabulario = Vocabulario(diretorio)
+        self._inicios = np.load(diretorio / "postings_inicios.npy", mmap_mode="r")
+        self._postings = np.load(diretorio / "postings.npy", mmap_mode="r")
+        self._campos = np.load(diretorio / "campos.npy", mmap_mode="r")
+
+    def _frequencia(self, termo_id):
+        return int(self._inicios[termo_id + 1] - self._inicios[termo_id])
+
+    def _idf(self, termo_id):
+        return float(np.log(1 + self.resumo["documentos"] / max(1, self._frequencia(termo_id))))
+
+    def _faixa(self, termo, prefixo):
+        """Ids [inicio, fim) dos termos do vocabulário que atendem a um termo da busca"""
+        if not prefixo:
+            posicao = self.vocabulario.posicao(termo)
+            return (0, 0) if posicao is None else (posicao, posicao + 1)
+        return self.vocabulario.faixa(termo)
+
+    def _total_postings(self, faixa):
+        """Postings de todos os termos da faixa (contíguas em postings.npy)"""
+        return int(self._inicios[faixa[1]] - self._inicios[faixa[0]])
+
+    def _mais_frequentes(self, inicio, fim):
+        if fim - inicio <= MAX_EXPANSOES:
+            return list(range(inicio, fim))
+        frequencias = np.diff(self._inicios[inicio:fim + 1])
+        return sorted(inicio + int(i) for i in np.argpartition(-frequencias, MAX_EXPANSOES)[:MAX_EXPANSOES])
+
+    def _postings_termo(self, termo_id):
+        """CNPJs, pontos e campos de todas as empresas com o termo"""
+        inicio, fim = int(self._inicios[termo_id]), int(self._inicios[termo_id + 1])
+        campos = np.asarray(self._campos[inicio:fim])
+        return np.asarray(self._postings[inicio:fim]), self._idf(termo_id) * PESOS_CAMPOS[campos], campos
+
+    def _candidatos(self, inicio, fim):
+        """(CNPJs, pontos, campos, completo) da união dos termos da faixa"""
+        if fim - inicio == 1:
+            return (*self._postings_termo(inicio), True)
+        if self._total_postings((inicio, fim)) <= MAX_POSTINGS_PREFIXO:
+            candidatos = np.unique(np.asarray(self._postings[self._inicios[inicio]:self._inicios[fim]]))
+            return (candidatos, *self._pontuar_faixa(candidatos, inicio, fim))
+        # Faixa grande demais: só os termos mais frequentes, até MAX_CANDIDATOS postings
+        termo_ids, fatias, total = self._mais_frequentes(inicio, fim), [], 0
+        for termo_id in sorted(termo_ids, key=self._frequencia, reverse=True):
+            fatias.append(self._postings[self._inicios[termo_id]:self._inicios[termo_id + 1]])
+            total += len(fatias[-1])
+            if total >= MAX_CANDIDATOS:
+                break
+        candidatos = np.unique(np.concatenate(fatias))
+        return (candidatos, *self._pontuar(candidatos, termo_ids), len(fatias) == fim - inicio)
+
+    def _pontuar(self, candidatos, termo_ids):
+        """Maior contribuição do grupo para cada candidato e os campos onde apareceu (0 = ausente)"""
+        pontos = np.zeros(len(candidatos))
+        campos = np.zeros(len(candidatos), dtype=np.int8)
+        for termo_id in termo_ids:
+            inicio, fim = int(self._inicios[termo_id]), int(self._inicios[termo_id + 1])
+            postings = self._postings[inicio:fim]
+            posicoes = np.minimum(np.searchsorted(postings, candidatos), len(postings) - 1)
+            encontrados = postings[posicoes] == candidatos
+            campos_termo = np.where(encontrados, self._campos[inicio:fim][posicoes], 0)
+            contribuicao = self._idf(termo_id) * PESOS_CAMPOS[campos_termo]
+            melhor = contribuicao > pontos
+            pontos[melhor] = contribuicao[melhor]
+            campos |= campos_termo.astype(np.int8)
+        return pontos, campos
+
+    def _pontuar_postings(self, candidatos, inicio, fim):
+        """O mesmo que _pontuar para toda a faixa, percorrendo suas postings contíguas de uma vez"""
+        primeira, ultima = int(self._inicios[inicio]), int(self._inicios[fim])
+        postings = np.asarray(self._postings[primeira:ultima])
+        campos_postings = np.asarray(self._campos[primeira:ultima])
+        frequencias = np.diff(self._inicios[inicio:fim + 1])
+        idf = np.log(1 + self.resumo["documentos"] / np.maximum(1, frequencias))
+        contribuicao = np.repeat(idf, frequencias) * PESOS_CAMPOS[campos_postings]
+        posicoes = np.minimum(np.searchsorted(candidatos, postings), len(candidatos) - 1)
+        encontrados = candidatos[posicoes] == postings
+        pontos = np.zeros(len(candidatos))
+        campos = np.zeros(len(candidatos), dtype=np.int8)
+        np.maximum.at(pontos, posicoes[encontrados], contribuicao[encontrados])
+        np.bitwise_or.at(campos, posicoes[encontrados], campos_postings[encontrados])
+        return pontos, campos
+
+    def _pontuar_faixa(self, candidatos, inicio, fim):
+        """(pontos, campos, completo) da faixa para os candidatos; truncada só se grande demais"""
+        if fim - inicio <= MAX_EXPANSOES:
+            return (*self._pontuar(candidatos, range(inicio, fim)), True)
+        if self._total_postings((inicio, fim)) <= MAX_POSTINGS_PREFIXO:
+            return (*self._pontuar_postings(candidatos, inicio, fim), True)
+        return (*self._pontuar(candidatos, self._mais_frequentes(inicio, fim)), False)
+
+    def buscar(self, texto, limite=20, prefixo=True):
+        """Empresas com todos os termos do texto, da maior para a menor relevância
+
+        Retorna um ResultadoBusca (lista) de {'cnpj_basico', 'score', 'campos'};
+        campos indica onde os termos foram encontrados ('razao_social',
+        'nome_fantasia') e .completo é False se um prefixo curto foi truncado.
+        """
+        termos = normalizar_termos(texto, prefixo)
+        if not termos:
+            return ResultadoBusca()
+        faixas = [self._faixa(termo, prefixo and i == len(termos) - 1) for i, termo in enumerate(termos)]
+        if any(inicio == fim for inicio, fim in faixas):
+            return ResultadoBusca()
+
+        # Os candidatos saem da faixa mais rara; as demais só são conferidas para eles
+        faixas.sort(key=self._total_postings)
+        candidatos, score, campos, completo = self._candidatos(*faixas[0])
+        for inicio, fim in faixas[1:]:
+            pontos, campos_faixa, completa = self._pontuar_faixa(candidatos, inicio, fim)
+            completo = completo and completa
+            manter = campos_faixa > 0
+            candidatos, score = candidatos[manter], score[manter] + pontos[manter]
+            campos = campos[manter] | campos_faixa[manter]
+            if not len(candidatos):
+                return ResultadoBusca(completo=completo)
+
+        melhores = self._melhores(candidatos, score, limite)
+        return ResultadoBusca(
+            [{"cnpj_basico": f"{int(candidatos[i]):08d}", "score": round(float(score[i]), 4),
+              "campos": [nome for bit, nome in ((1, "razao_social"), (2, "nome_fantasia")) if campos[i] & bit]}
+             for i in melhores], completo)
+
+    @staticmethod
+    def _melhores(candidatos, score, limite):
+        """Posições dos `limite` maiores scores; empates vão para o menor cnpj_basico"""
+        if len(score) > limite:
+            corte = -np.partition(-score, limite - 1)[limite - 1]
+            acima = np.flatnonzero(score > corte)
+            # Candidatos estão em ordem de CNPJ, então os primeiros empatados são os menores
+            empatados = np.flatnonzero(score == corte)[:limite - len(acima)]
+            melhores = np.concatenate([acima, empatados])
+        else:
+            melhores = np.arange(len(score))
+        return melhores[np.lexsort((candidatos[melhores], -score[melhores]))]
+
+    def fechar(self):
+        self.vocabulario.fechar()
+
+
+def com_nomes(resultados, diretorio=Path("database")):
+    """Acrescenta a razão social de cada resultado, lida do Parquet de empresas"""
+    if not resultados:
+        return resultados
+    tabela = pq.read_table(parquet_final("empresas", diretorio), columns=["cnpj_basico", "razao_social"],
+                           filters=[("cnpj_basico", "in", [r["cnpj_basico"] for r in resultados])])
+    nomes = dict(zip(tabela.column("cnpj_basico").to_pylist(), tabela.column("razao_social").to_pylist()))
+    return [{**resultado, "razao_social": nomes.get(resultado["cnpj_basico"])} for resultado in resultados]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Busca de empresas por razão social e nome fantasia')
+    parser.add_argument('texto', nargs='+')
+    parser.add_argument('--limite', type=int, default=20)
+    parser.add_argument('--sem-prefixo', dest='prefixo', action='store_false',
+                        help='Último termo exato, em vez de prefixo')
+    parser.add_argument('--nomes', action='store_true', help='Mostra a razão social (lê empresas_final.parquet)')
+    parser.add_argument('--indice', default=str(DIRETORIO_BUSCA))
+    args = parser.parse_args()
+
+    indice = IndiceBusca(args.indice)
+    inicio = time.perf_counter()
+    resultados = indice.buscar(" ".join(args.texto), args.limite, args.prefixo)
+    segundos = time.perf_counter() - inicio
+    completo = resultados.completo
+    if args.nomes:
+        resultados = com_nomes(resultados)
+    for resultado in resultados:
+        print(f"{resultado['cnpj_basico']}  {resultado['score']:8.3f}  {','.join(resultado['campos']):26s}"
+              f"  {resultado.get('razao_social') or ''}")
+    print(f"\n🔎 {len(resultados)} resultados em {segundos * 1000:.1f}ms")
+    if not completo:
+        print("⚠️  Prefixo curto truncado aos termos mais frequentes: podem faltar empresas (digite mais letras)")
+    indice.fechar()
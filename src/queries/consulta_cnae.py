@@ -0,0 +1,109 @@
+"""
+Estabelecimentos por CNAE, principal ou secundário, pelo índice invertido da ETL
+
+Lê database/indice_cnae/ (src/processors/ponte_cnae.py) com mmap: cada CNAE é
+uma busca binária em cnaes.npy e uma fatia contínua de cnpjs.npy, sem varrer
+estabelecimentos nem abrir a ponte. As descrições dos CNAEs vêm da referência
+compilada das tabelas auxiliares (database/referencia/).
+Uso: python src/queries/consulta_cnae.py 4781400 [4782201 ...] [--principal|--secundario] [--todos]
+"""
+
+import sys
+import time
+from functools import reduce
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.ponte_cnae import ARQUIVOS_INDICE, DIRETORIO_INDICE
+from src.processors.referencia import abrir_referencia
+
+
+def normalizar_cnae(cnae):
+    """Código CNAE como inteiro; aceita formatações como 4781-4/00"""
+    digitos = "".join(c for c in str(cnae) if c.isdigit())
+    if len(digitos) != 7:
+        raise ValueError(f"CNAE deve ter 7 dígitos: {cnae}")
+    return int(digitos)
+
+
+def formatar_cnpjs(cnpjs):
+    """CNPJs do índice (int64) como texto de 14 dígitos"""
+    return [f"{cnpj:014d}" for cnpj in np.asarray(cnpjs).tolist()]
+
+
+class IndiceCnae:
+    """Índice invertido CNAE → CNPJs, mapeado em memória
+
+    Os CNPJs de cada CNAE vêm ordenados, então uniões e interseções entre
+    CNAEs são feitas sobre arrays já ordenados.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_INDICE):
+        diretorio = Path(diretorio)
+        faltando = [nome for nome in ARQUIVOS_INDICE if not (diretorio / f"{nome}.npy").exists()]
+        if faltando:
+            raise FileNotFoundError(f"Índice incompleto em {diretorio} (execute main_etl.py): "
+                                    f"{', '.join(faltando)}")
+        self.cnaes = np.load(diretorio / "cnaes.npy")
+        self.inicios = np.load(diretorio / "inicios.npy")
+        self._cnpjs = np.load(diretorio / "cnpjs.npy", mmap_mode="r")
+        self._principal = np.load(diretorio / "principal.npy", mmap_mode="r")
+
+    def _faixa(self, cnae):
+        codigo = normalizar_cnae(cnae)
+        posicao = int(np.searchsorted(self.cnaes, codigo))
+        if posicao == len(self.cnaes) or self.cnaes[posicao] != codigo:
+            return 0, 0
+        return int(self.inicios[posicao]), int(self.inicios[posicao + 1])
+
+    def cnpjs(self, cnae, principal=None):
+        """CNPJs (int64, ordenados) com o CNAE; principal=True/False restringe ao principal/secundário"""
+        inicio, fim = self._faixa(cnae)
+        cnpjs = self._cnpjs[inicio:fim]
+        if principal is not None:
+            cnpjs = cnpjs[self._principal[inicio:fim] == int(principal)]
+        return np.asarray(cnpjs)
+
+    def contar(self, cnae, principal=None):
+        if principal is None:
+            inicio, fim = self._faixa(cnae)
+            return fim - inicio
+        return len(self.cnpjs(cnae, principal))
+
+    def algum(self, cnaes, principal=None):
+        """CNPJs com pelo menos um dos CNAEs"""
+        return reduce(np.union1d, (self.cnpjs(cnae, principal) for cnae in cnaes), np.empty(0, np.int64))
+
+    def todos(self, cnaes, principal=None):
+        """CNPJs com todos os CNAEs"""
+        return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True),
+                      (self.cnpjs(cnae, principal) for cnae in cnaes))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Estabelecimentos por CNAE pelo índice invertido')
+    parser.add_argument('cnaes', nargs='+')
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--principal', dest='principal', action='store_const', const=True, default=None,
+                       help='Só o CNAE principal')
+    grupo.add_argument('--secundario', dest='principal', action='store_const', const=False,
+                       help='Só CNAEs secundários')
+    parser.add_argument('--todos', action='store_true', help='Exige todos os CNAEs (padrão: qualquer um)')
+    parser.add_argument('--limite', type=int, default=20, help='CNPJs exibidos')
+    parser.add_argument('--indice', default=str(DIRETORIO_INDICE))
+    args = parser.parse_args()
+
+    indice = IndiceCnae(args.indice)
+    cnaes = abrir_referencia().tabela("cnaes")
+    for cnae in args.cnaes:
+        print(f"📋 {cnae}: {cnaes.descricao(normalizar_cnae(cnae)) or 'CNAE fora da tabela auxiliar'}")
+    inicio = time.perf_counter()
+    cnpjs = (indice.todos if args.todos else indice.algum)(args.cnaes, args.principal)
+    segundos = time.perf_counter() - inicio
+    for cnpj in formatar_cnpjs(cnpjs[:args.limite]):
+        print(cnpj)
+    print(f"\n🔎 {len(cnpjs):,} estabelecimentos em {segundos * 1000:.1f}ms")
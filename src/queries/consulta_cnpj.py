@@ -0,0 +1,129 @@
+"""
+Consulta pontual de CNPJ: empresa, estabelecimentos e sócios em milissegundos
+
+Usa o banco DuckDB gerado na ETL (python main_etl.py --duckdb-db), cujas tabelas
+estão ordenadas por cnpj_basico: os zonemaps levam cada consulta direto ao
+trecho da chave, sem varrer os Parquets.
+Uso: python src/queries/consulta_cnpj.py [--porta 8080]  (GET /cnpj/<cnpj>)
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote
+
+import duckdb
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.dataset import BANCO_DUCKDB
+
+ENTIDADES = ("empresas", "estabelecimentos", "socios")
+
+
+def normalizar_cnpj(cnpj):
+    """Mantém só os dígitos; aceita CNPJ básico (8) ou completo (14)"""
+    digitos = "".join(c for c in str(cnpj) if c.isdigit())
+    if len(digitos) not in (8, 14):
+        raise ValueError(f"CNPJ deve ter 8 ou 14 dígitos: {cnpj}")
+    return digitos
+
+
+class ConsultaCNPJ:
+    """Perfil completo de um CNPJ a partir do banco DuckDB da ETL
+
+    A conexão é aberta somente leitura uma vez; cada thread usa seu próprio
+    cursor, então a instância pode ser compartilhada por um servidor com threads.
+    """
+
+    def __init__(self, banco=BANCO_DUCKDB):
+        banco = Path(banco)
+        if not banco.exists():
+            raise FileNotFoundError(f"Banco não encontrado: {banco} (execute main_etl.py --duckdb-db)")
+        self.con = duckdb.connect(str(banco), read_only=True)
+        tabelas = {linha[0] for linha in self.con.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+        self.entidades = [entidade for entidade in ENTIDADES if entidade in tabelas]
+        self._local = threading.local()
+
+    def _cursor(self):
+        if not hasattr(self._local, "cursor"):
+            self._local.cursor = self.con.cursor()
+        return self._local.cursor
+
+    def _linhas(self, entidade, cnpj_basico):
+        cursor = self._cursor()
+        cursor.execute(f"SELECT * FROM {entidade} WHERE cnpj_basico = ?", [cnpj_basico])
+        colunas = [descricao[0] for descricao in cursor.description]
+        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+    def consultar(self, cnpj):
+        """Retorna o perfil do CNPJ ou None se não encontrado
+
+        Com 14 dígitos apenas o estabelecimento informado é devolvido.
+        """
+        cnpj = normalizar_cnpj(cnpj)
+        perfil = {entidade: self._linhas(entidade, cnpj[:8]) for entidade in self.entidades}
+        if len(cnpj) == 14 and "estabelecimentos" in perfil:
+            perfil["estabelecimentos"] = [e for e in perfil["estabelecimentos"] if e.get("CNPJ") == cnpj]
+        if not any(perfil.values()):
+            return None
+
+        empresas = perfil.pop("empresas", [])
+        return {"cnpj_basico": cnpj[:8], "empresa": empresas[0] if empresas else None, **perfil}
+
+    def amostra_cnpjs(self, quantidade):
+        """CNPJs básicos existentes, para testes de carga"""
+        tabela = "empresas" if "empresas" in self.entidades else self.entidades[0]
+        return [linha[0] for linha in self._cursor().execute(
+            f"SELECT cnpj_basico FROM {tabela} USING SAMPLE {int(quantidade)} ROWS").fetchall()]
+
+    def fechar(self):
+        self.con.close()
+
+
+def criar_servidor(consulta, host="127.0.0.1", porta=8080):
+    """Servidor HTTP local: GET /cnpj/<cnpj> devolve o perfil em JSON"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            partes = unquote(self.path).strip("/").split("/")
+            if len(partes) != 2 or partes[0] != "cnpj":
+                return self._responder(404, {"erro": "use /cnpj/<cnpj>"})
+            try:
+                perfil = consulta.consultar(partes[1])
+            except ValueError as e:
+                return self._responder(400, {"erro": str(e)})
+            if perfil is None:
+                return self._responder(404, {"erro": "CNPJ não encontrado"})
+            self._responder(200, perfil)
+
+        def log_message(self, formato, *args):
+            pass
+
+    return ThreadingHTTPServer((host, porta), Handler)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Servidor local de consulta de CNPJ')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--banco', default=str(BANCO_DUCKDB))
+    args = parser.parse_args()
+
+    servidor = criar_servidor(ConsultaCNPJ(args.banco), args.host, args.porta)
+    print(f"🔎 Consulta de CNPJ em http://{args.host}:{args.porta}/cnpj/<cnpj>")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
@@ -0,0 +1,132 @@
+"""
+Consultas agregadas respondidas pelos cubos pré-calculados na ETL
+
+ConsultaAgregada.agrupar monta o GROUP BY pedido sobre uma entidade base. Se
+algum cubo dela cobre todas as colunas agrupadas e filtradas, a consulta é
+reescrita sobre o menor desses cubos, somando as medidas aditivas; senão roda
+sobre os Parquets finais. O resultado é o mesmo nos dois caminhos e
+resultado.attrs["origem"] informa qual foi usado.
+Uso: python src/queries/cubos.py estabelecimentos uf porte_empresa --filtro situacao_cadastral=02
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.cubos import BASES, CUBOS, DIRETORIO_CUBOS, parquet_cubo
+from src.queries.benchmark import conectar_parquets
+
+# Medida: (expressão sobre o cubo, expressão sobre a base), com o mesmo tipo nos dois
+MEDIDAS_CONSULTA = {
+    "quantidade": ("CAST(SUM(quantidade) AS BIGINT)", "CAST(COUNT(*) AS BIGINT)"),
+    "capital_social_soma": ("CAST(SUM(capital_social_soma) AS DECIMAL(38,2))",
+                            "CAST(SUM(capital_social) AS DECIMAL(38,2))"),
+    "capital_social_media": ("CAST(SUM(capital_social_soma) / NULLIF(SUM(capital_social_contagem), 0) AS DOUBLE)",
+                             "CAST(AVG(capital_social) AS DOUBLE)")
+}
+
+
+class ConsultaAgregada:
+    """Agrupamentos por entidade base, roteados para o menor cubo que os cobre"""
+
+    def __init__(self, diretorio=Path("database"), diretorio_cubos=DIRETORIO_CUBOS):
+        self.con = conectar_parquets(diretorio, diretorio_cubos)
+        # Linhas de cada cubo disponível, para escolher o menor
+        self.cubos = {nome: pq.read_metadata(parquet_cubo(nome, diretorio_cubos)).num_rows
+                      for nome in CUBOS if parquet_cubo(nome, diretorio_cubos).exists()}
+        self._colunas = {}
+
+    def colunas(self, base):
+        """Colunas aceitas em agrupamentos e filtros da base"""
+        if base not in self._colunas:
+            cursor = self.con.execute(f"SELECT * FROM {BASES[base]} LIMIT 0")
+            self._colunas[base] = {descricao[0] for descricao in cursor.description}
+        return self._colunas[base]
+
+    def escolher_cubo(self, base, colunas):
+        """Menor cubo da base com todas as colunas como dimensão, ou None"""
+        candidatos = [nome for nome in self.cubos
+                      if CUBOS[nome].base == base and set(colunas) <= set(CUBOS[nome].dimensoes)]
+        return min(candidatos, key=self.cubos.get, default=None)
+
+    def montar(self, base, por, filtros=None, medidas=("quantidade",), ordem=None, limite=None):
+        """Retorna (sql, parâmetros, origem) do agrupamento
+
+        filtros é {coluna: valor}; listas e tuplas viram IN e None vira IS NULL.
+        ordem é uma coluna ou medida, com '-' na frente para ordem decrescente.
+        """
+        if base not in BASES:
+            raise ValueError(f"Base desconhecida: {base} (use {', '.join(BASES)})")
+        por, filtros = list(por), dict(filtros or {})
+        desconhecidas = (set(por) | set(filtros)) - self.colunas(base)
+        if desconhecidas:
+            raise ValueError(f"Colunas desconhecidas em {base}: {', '.join(sorted(desconhecidas))}")
+        invalidas = set(medidas) - set(MEDIDAS_CONSULTA)
+        if invalidas:
+            raise ValueError(f"Medidas desconhecidas: {', '.join(sorted(invalidas))}")
+
+        cubo = self.escolher_cubo(base, por + list(filtros))
+        origem = f"cubo_{cubo}" if cubo else BASES[base]
+        selecao = por + [f"{MEDIDAS_CONSULTA[m][0 if cubo else 1]} AS {m}" for m in medidas]
+
+        condicoes, params = [], []
+        for coluna, valor in filtros.items():
+            if valor is None:
+                condicoes.append(f"{coluna} IS NULL")
+            elif isinstance(valor, (list, tuple, set)):
+                condicoes.append(f"{coluna} IN ({', '.join('?' * len(valor))})")
+                params.extend(valor)
+            else:
+                condicoes.append(f"{coluna} = ?")
+                params.append(valor)
+
+        sql = f"SELECT {', '.join(selecao)} FROM {origem}"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        if por:
+            sql += f" GROUP BY {', '.join(por)}"
+        if ordem:
+            coluna = ordem.lstrip("-")
+            if coluna not in por and coluna not in medidas:
+                raise ValueError(f"Ordem por coluna fora do resultado: {coluna}")
+            sql += f" ORDER BY {coluna} {'DESC' if ordem.startswith('-') else 'ASC'}"
+        if limite:
+            sql += f" LIMIT {int(limite)}"
+        return sql, params, ("cubo " + cubo) if cubo else "base"
+
+    def agrupar(self, base, por, filtros=None, medidas=("quantidade",), ordem=None, limite=None):
+        """Executa o agrupamento e devolve um DataFrame (attrs: origem, sql, segundos)"""
+        sql, params, origem = self.montar(base, por, filtros, medidas, ordem, limite)
+        inicio = time.perf_counter()
+        resultado = self.con.execute(sql, params).df()
+        resultado.attrs.update(origem=origem, sql=sql, segundos=time.perf_counter() - inicio)
+        return resultado
+
+    def fechar(self):
+        self.con.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Agrupamentos respondidos pelos cubos da ETL')
+    parser.add_argument('base', choices=list(BASES))
+    parser.add_argument('por', nargs='*', help='Colunas agrupadas')
+    parser.add_argument('--filtro', action='append', default=[], metavar='COLUNA=VALOR[,VALOR]')
+    parser.add_argument('--medidas', nargs='+', default=['quantidade'], choices=list(MEDIDAS_CONSULTA))
+    parser.add_argument('--ordem', default=None, help='Coluna ou medida; prefixo - para decrescente (--ordem=-quantidade)')
+    parser.add_argument('--limite', type=int, default=None)
+    args = parser.parse_args()
+
+    filtros = {}
+    for filtro in args.filtro:
+        coluna, _, valor = filtro.partition('=')
+        filtros[coluna] = valor.split(',') if ',' in valor else valor
+
+    consulta = ConsultaAgregada()
+    resultado = consulta.agrupar(args.base, args.por, filtros, args.medidas, args.ordem, args.limite)
+    print(resultado.to_string(index=False))
+    print(f"\n⏱️  {resultado.attrs['segundos'] * 1000:.1f}ms via {resultado.attrs['origem']}")
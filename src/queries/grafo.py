@@ -0,0 +1,179 @@
+"""
+Consultas ao grafo societário: participações em vários níveis, grupo econômico e controladoras finais
+
+Lê database/grafo_societario/ (src/processors/grafo_societario.py) com mmap.
+Cada nível de um percurso é uma única leitura vetorizada das listas CSR da
+fronteira, sem laço por empresa. Como a Receita não informa percentuais,
+"controladora" é qualquer sócia pessoa jurídica.
+Uso: python src/queries/grafo.py 12345678 [--controladas|--controladoras|--finais|--grupo] [--profundidade 3] [--nomes]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.grafo_societario import ARQUIVOS_GRAFO, DIRETORIO_GRAFO
+from src.queries.busca import com_nomes
+
+
+def normalizar_cnpj_basico(cnpj):
+    """cnpj_basico como inteiro; aceita CNPJ completo (14 dígitos) ou formatado"""
+    digitos = "".join(c for c in str(cnpj) if c.isdigit())
+    if len(digitos) not in (8, 14):
+        raise ValueError(f"CNPJ deve ter 8 ou 14 dígitos: {cnpj}")
+    return int(digitos[:8])
+
+
+def vizinhos(inicios, adjacencias, nos):
+    """Vizinhos de todos os nós de uma vez, concatenados (pode haver repetidos)"""
+    comecos, fins = inicios[nos], inicios[nos + 1]
+    tamanhos = fins - comecos
+    total = int(tamanhos.sum())
+    if not total:
+        return np.empty(0, dtype=np.int32)
+    deslocamentos = np.repeat(comecos - np.cumsum(tamanhos) + tamanhos, tamanhos) + np.arange(total)
+    return np.asarray(adjacencias[deslocamentos])
+
+
+class GrafoSocietario:
+    """Grafo de participações entre empresas, mapeado em memória"""
+
+    def __init__(self, diretorio=DIRETORIO_GRAFO):
+        diretorio = Path(diretorio)
+        faltando = [nome for nome in ARQUIVOS_GRAFO if not (diretorio / nome).exists()]
+        if faltando:
+            raise FileNotFoundError(f"Grafo societário incompleto em {diretorio} "
+                                    f"(execute main_etl.py --ownership-graph): {', '.join(faltando)}")
+        with open(diretorio / "grafo.json", encoding="utf-8") as f:
+            self.resumo = json.load(f)
+        carregar = lambda nome: np.load(diretorio / f"{nome}.npy", mmap_mode="r")
+        self.nos = carregar("nos")
+        self._sentidos = {
+            "controladas": (carregar("controladas_inicios"), carregar("controladas")),
+            "controladoras": (carregar("controladoras_inicios"), carregar("controladoras"))
+        }
+        self._componentes = carregar("componentes")
+        self._grupos_inicios = carregar("grupos_inicios")
+        self._grupos = carregar("grupos")
+
+    def _no(self, cnpj):
+        """Id do nó da empresa, ou None se ela não tem sócias nem participações PJ"""
+        codigo = normalizar_cnpj_basico(cnpj)
+        posicao = int(np.searchsorted(self.nos, codigo))
+        return posicao if posicao < len(self.nos) and self.nos[posicao] == codigo else None
+
+    def _cnpjs(self, ids):
+        return [f"{int(cnpj):08d}" for cnpj in np.asarray(self.nos[np.asarray(ids)]).tolist()]
+
+    def _percorrer(self, cnpj, sentido, profundidade):
+        """(ids, níveis) alcançados a partir da empresa, em busca em largura"""
+        origem = self._no(cnpj)
+        if origem is None:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        inicios, adjacencias = self._sentidos[sentido]
+        visitados = np.array([origem])
+        fronteira, ids, niveis, nivel = visitados, [], [], 0
+        while len(fronteira) and (profundidade is None or nivel < profundidade):
+            nivel += 1
+            proximos = np.unique(vizinhos(inicios, adjacencias, fronteira))
+            fronteira = np.setdiff1d(proximos, visitados, assume_unique=True)
+            visitados = np.union1d(visitados, fronteira)
+            ids.append(fronteira)
+            niveis.append(np.full(len(fronteira), nivel))
+        if not ids:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        return np.concatenate(ids), np.concatenate(niveis)
+
+    def _listar(self, ids, niveis):
+        return [{"cnpj_basico": cnpj, "profundidade": int(nivel)}
+                for cnpj, nivel in zip(self._cnpjs(ids), niveis.tolist())]
+
+    def controladas(self, cnpj, profundidade=1):
+        """Empresas em que a empresa participa, direta (1) ou indiretamente; profundidade=None vai até o fim"""
+        return self._listar(*self._percorrer(cnpj, "controladas", profundidade))
+
+    def controladoras(self, cnpj, profundidade=1):
+        """Sócias PJ da empresa, diretas (1) ou indiretas; profundidade=None vai até o fim"""
+        return self._listar(*self._percorrer(cnpj, "controladoras", profundidade))
+
+    def controladoras_finais(self, cnpj):
+        """Controladoras no topo da cadeia: acima da empresa e sem sócias PJ
+
+        Se todas as sócias acima fazem parte de um ciclo de participações
+        cruzadas, não há topo e as empresas do ciclo são retornadas com ciclo=True.
+        """
+        ids, niveis = self._percorrer(cnpj, "controladoras", None)
+        if not len(ids):
+            return []
+        inicios, _ = self._sentidos["controladoras"]
+        topo = (inicios[ids + 1] - inicios[ids]) == 0
+        ciclo = not topo.any()
+        if ciclo:
+            topo[:] = True
+        return [{**item, "ciclo": ciclo} for item in self._listar(ids[topo], niveis[topo])]
+
+    def grupo(self, cnpj):
+        """cnpj_basico de todas as empresas do grupo econômico (ligadas por participações em qualquer sentido)"""
+        no = self._no(cnpj)
+        if no is None:
+            return []
+        componente = int(self._componentes[no])
+        inicio, fim = int(self._grupos_inicios[componente]), int(self._grupos_inicios[componente + 1])
+        return self._cnpjs(np.sort(self._grupos[inicio:fim]))
+
+    def maiores_grupos(self, quantidade=10):
+        """[{'grupo', 'empresas', 'exemplo'}] dos maiores grupos econômicos"""
+        tamanhos = np.diff(self._grupos_inicios[:quantidade + 1])
+        return [{"grupo": grupo, "empresas": int(tamanho),
+                 "exemplo": self._cnpjs([self._grupos[int(self._grupos_inicios[grupo])]])[0]}
+                for grupo, tamanho in enumerate(tamanhos.tolist())]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Participações societárias entre empresas')
+    parser.add_argument('cnpj', nargs='?', help='cnpj_basico (8 dígitos) ou CNPJ completo')
+    consulta = parser.add_mutually_exclusive_group()
+    consulta.add_argument('--controladas', dest='consulta', action='store_const', const='controladas',
+                          default='controladas', help='Empresas em que participa (padrão)')
+    consulta.add_argument('--controladoras', dest='consulta', action='store_const', const='controladoras',
+                          help='Sócias PJ')
+    consulta.add_argument('--finais', dest='consulta', action='store_const', const='finais',
+                          help='Controladoras no topo da cadeia')
+    consulta.add_argument('--grupo', dest='consulta', action='store_const', const='grupo',
+                          help='Todas as empresas do grupo econômico')
+    parser.add_argument('--profundidade', type=int, default=1, help='Níveis percorridos (0 = sem limite)')
+    parser.add_argument('--maiores', type=int, default=0, help='Lista os N maiores grupos econômicos')
+    parser.add_argument('--limite', type=int, default=50, help='Empresas exibidas')
+    parser.add_argument('--nomes', action='store_true', help='Mostra a razão social (lê empresas_final.parquet)')
+    parser.add_argument('--grafo', default=str(DIRETORIO_GRAFO))
+    args = parser.parse_args()
+
+    grafo = GrafoSocietario(args.grafo)
+    if args.maiores or not args.cnpj:
+        for item in grafo.maiores_grupos(args.maiores or 10):
+            print(f"grupo {item['grupo']:6d}  {item['empresas']:8,} empresas  (ex.: {item['exemplo']})")
+        sys.exit(0)
+
+    inicio = time.perf_counter()
+    profundidade = args.profundidade or None
+    if args.consulta == 'grupo':
+        resultados = [{"cnpj_basico": cnpj} for cnpj in grafo.grupo(args.cnpj)]
+    elif args.consulta == 'finais':
+        resultados = grafo.controladoras_finais(args.cnpj)
+    else:
+        resultados = getattr(grafo, args.consulta)(args.cnpj, profundidade)
+    segundos = time.perf_counter() - inicio
+    exibidos = resultados[:args.limite]
+    if args.nomes:
+        exibidos = com_nomes(exibidos)
+    for resultado in exibidos:
+        nivel = f"  nível {resultado['profundidade']}" if "profundidade" in resultado else ""
+        ciclo = "  (ciclo)" if resultado.get("ciclo") else ""
+        print(f"{resultado['cnpj_basico']}{nivel}{ciclo}  {resultado.get('razao_social') or ''}")
+    print(f"\n🕸️  {len(resultados):,} empresas em {segundos * 1000:.1f}ms")
@@ -4,12 +4,16 @@ Para usar com banco de dados MySQL configurado
 """
 
 import sys
-import os
 import mysql.connector
+from mysql.connector import errorcode
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 from config.config_db import DB_CONFIG
+from src.database.connection import iterar_query, obter_pool
+
+# Cubos carregados no MySQL, descobertos na primeira consulta (ver invalidar_cubos)
+_cubos = None
 
 def conectar_mysql():
     """Conecta ao banco MySQL"""
@@ -21,23 +25,64 @@ def conectar_mysql():
         print(f"❌ Erro ao conectar: {e}")
         return None
 
-def executar_query(query, params=None):
-    """Executa uma query no banco"""
-    connection = conectar_mysql()
-    if not connection:
-        return None
-    
-    try:
+def _cubos_carregados(connection):
+    """Tabelas cubo_* presentes no banco (consultado uma vez por processo)"""
+    global _cubos
+    if _cubos is None:
         cursor = connection.cursor()
+        cursor.execute("SELECT table_name FROM information_schema.tables "
+                       "WHERE table_schema = DATABASE() AND table_name LIKE 'cubo\\_%'")
+        _cubos = {linha[0] for linha in cursor.fetchall()}
+        cursor.close()
+    return _cubos
+
+def invalidar_cubos():
+    """Esquece os cubos descobertos; a próxima consulta volta a olhar o information_schema
+
+    Chame depois de carregar ou remover cubos com o processo em execução.
+    """
+    global _cubos
+    _cubos = None
+
+def _consultar(connection, query, params):
+    cursor = connection.cursor()
+    try:
         cursor.execute(query, params or ())
-        result = cursor.fetchall()
-        return result
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+def executar_query(query, params=None, usar_cubos=True):
+    """Executa uma query no banco usando uma conexão do pool compartilhado
+
+    Queries com equivalente em QUERIES_CUBO são respondidas pelo cubo
+    pré-agregado quando ele foi carregado no MySQL (src.database.loader.carregar_tudo).
+    Se o cubo sumiu desde a descoberta, o cache é invalidado e a query original é usada.
+    """
+    try:
+        with obter_pool().conexao() as connection:
+            if usar_cubos and query in QUERIES_CUBO:
+                tabela, query_cubo = QUERIES_CUBO[query]
+                if tabela in _cubos_carregados(connection):
+                    try:
+                        return _consultar(connection, query_cubo, params)
+                    except mysql.connector.Error as e:
+                        if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                            raise
+                        invalidar_cubos()
+            return _consultar(connection, query, params)
     except Exception as e:
         print(f"❌ Erro na query: {e}")
         return None
-    finally:
-        if connection.is_connected():
-            connection.close()
+
+def exportar_query_csv(query, caminho, params=None, tamanho_lote=50000):
+    """Exporta o resultado de uma query para CSV em lotes, sem carregá-lo inteiro"""
+    total = 0
+    with open(caminho, 'w', encoding='utf-8', newline='') as destino:
+        for lote in iterar_query(query, params, tamanho_lote, formato='pandas'):
+            lote.to_csv(destino, sep=';', index=False, header=total == 0)
+            total += len(lote)
+    return total
 
 # Queries de exemplo
 QUERY_EMPRESAS_POR_PORTE = """
@@ -55,3 +100,65 @@ GROUP BY qualificacao_responsavel
 ORDER BY total DESC 
 LIMIT 10
 """
+
+# Estabelecimentos com um CNAE (principal ou secundário) pela ponte estabelecimento_cnae:
+# a chave (cnae, CNPJ) leva direto às linhas do CNAE, sem LIKE em cnae_fiscal_secundario
+QUERY_ESTABELECIMENTOS_POR_CNAE = """
+SELECT e.CNPJ, e.nome_fantasia, e.uf, e.municipio, ec.principal
+FROM estabelecimento_cnae ec
+JOIN estabelecimentos e ON e.CNPJ = ec.CNPJ
+WHERE ec.cnae = %s
+ORDER BY ec.principal DESC, e.CNPJ
+"""
+
+QUERY_CNAES_POR_UF = """
+SELECT e.uf, COUNT(*) as total, SUM(ec.principal) as como_principal
+FROM estabelecimento_cnae ec
+JOIN estabelecimentos e ON e.CNPJ = ec.CNPJ
+WHERE ec.cnae = %s AND e.situacao_cadastral = '02'
+GROUP BY e.uf
+ORDER BY total DESC
+"""
+
+# Empresas e capital social médio por UF da matriz e porte
+QUERY_UF_PORTE_CAPITAL = """
+SELECT e.uf, q.porte_empresa, COUNT(*) as empresas, AVG(q.capital_social) as capital_medio
+FROM estabelecimentos e
+LEFT JOIN empresas_qualificacoes q ON q.cnpj_basico = e.cnpj_basico
+WHERE e.identificador_matriz = 1
+GROUP BY e.uf, q.porte_empresa
+ORDER BY e.uf, q.porte_empresa
+"""
+
+# Mesmas consultas sobre os cubos pré-agregados (src/processors/cubos.py)
+QUERY_EMPRESAS_POR_PORTE_CUBO = """
+SELECT porte_empresa, SUM(quantidade) as total
+FROM cubo_empresas
+GROUP BY porte_empresa
+ORDER BY total DESC
+"""
+
+QUERY_TOP_QUALIFICACOES_CUBO = """
+SELECT qualificacao_responsavel, SUM(quantidade) as total
+FROM cubo_empresas
+WHERE qualificacao_responsavel IS NOT NULL
+GROUP BY qualificacao_responsavel
+ORDER BY total DESC
+LIMIT 10
+"""
+
+QUERY_UF_PORTE_CAPITAL_CUBO = """
+SELECT uf, porte_empresa, SUM(quantidade) as empresas,
+       SUM(capital_social_soma) / NULLIF(SUM(capital_social_contagem), 0) as capital_medio
+FROM cubo_estabelecimentos_uf
+WHERE identificador_matriz = 1
+GROUP BY uf, porte_empresa
+ORDER BY uf, porte_empresa
+"""
+
+# Query original → (tabela do cubo, query equivalente) usada por executar_query
+QUERIES_CUBO = {
+    QUERY_EMPRESAS_POR_PORTE: ("cubo_empresas", QUERY_EMPRESAS_POR_PORTE_CUBO),
+    QUERY_TOP_QUALIFICACOES: ("cubo_empresas", QUERY_TOP_QUALIFICACOES_CUBO),
+    QUERY_UF_PORTE_CAPITAL: ("cubo_estabelecimentos_uf", QUERY_UF_PORTE_CAPITAL_CUBO)
+}
@@ -0,0 +1,32 @@
+# Tabelas auxiliares em Auxiliar/: arquivos sem cabeçalho no formato "codigo";"descricao"
+AUXILIARES = {
+    "cnaes": ("cnaes.csv", "latin-1"),
+    "motivos": ("motivos.csv", "latin-1"),
+    "municipios": ("municipios.csv", "latin-1"),
+    "naturezas": ("naturezas.csv", "latin-1"),
+    "paises": ("paises.csv", "latin-1"),
+    "qualificacoes": ("qualificacoes_utf8.csv", "utf-8")
+}
+
+AUXILIAR_COLUNAS = ["codigo", "descricao"]
+
+# Tabelas fixas, sem arquivo correspondente em Auxiliar/
+PORTES = {
+    "00": "NÃO INFORMADO",
+    "01": "MICRO EMPRESA",
+    "03": "EMPRESA DE PEQUENO PORTE",
+    "05": "DEMAIS"
+}
+
+SITUACOES_CADASTRAIS = {
+    "01": "NULA",
+    "02": "ATIVA",
+    "03": "SUSPENSA",
+    "04": "INAPTA",
+    "08": "BAIXADA"
+}
+
+TABELAS_FIXAS = {
+    "portes": PORTES,
+    "situacoes": SITUACOES_CADASTRAIS
+}
@@ -7,3 +7,23 @@ EMPRESAS_SCHEMA = [
     "porte_empresa",
     "ente_federativo_responsavel"
 ]
+
+# Tipos por coluna (ver src/schemas/tipos.py)
+EMPRESAS_TIPOS = {
+    "cnpj_basico": "codigo(8)",
+    "razao_social": "texto(200)",
+    "natureza_juridica": "categoria(4)",
+    "qualificacao_responsavel": "categoria(2)",
+    "capital_social": "decimal",
+    "porte_empresa": "categoria(2)",
+    "ente_federativo_responsavel": "texto(100)"
+}
+
+# Chave de uma empresa entre releases (atualização incremental)
+EMPRESAS_CHAVE = ["cnpj_basico"]
+
+# (coluna de código, tabela auxiliar, coluna de descrição gerada)
+EMPRESAS_ENRIQUECIMENTO = [
+    ("porte_empresa", "portes", "descricao_porte"),
+    ("natureza_juridica", "naturezas", "descricao_natureza_juridica")
+]
@@ -30,3 +30,61 @@ ESTABELECIMENTOS_SCHEMA = [
     "data_situacao_especial",
     "cnae_fiscal_secundario"
 ]
+
+# Tipos por coluna (ver src/schemas/tipos.py); CNPJ é montado no enriquecimento
+ESTABELECIMENTOS_TIPOS = {
+    "cnpj_basico": "codigo(8)",
+    "cnpj_ordem": "codigo(4)",
+    "cnpj_dv": "codigo(2)",
+    "identificador_matriz": "inteiro",
+    "nome_fantasia": "texto(200)",
+    "situacao_cadastral": "categoria(2)",
+    "data_situacao_cadastral": "data",
+    "motivo_situacao_cadastral": "categoria(2)",
+    "nome_da_cidade_no_exterior": "texto(100)",
+    "pais": "categoria(3)",
+    "data_inicio_atividade": "data",
+    "cnae_fiscal_principal": "categoria(7)",
+    "tipo_logradouro": "texto(30)",
+    "logradouro": "texto(200)",
+    "numero": "texto(20)",
+    "complemento": "texto(200)",
+    "bairro": "texto(100)",
+    "cep": "codigo(8)",
+    "uf": "categoria(2)",
+    "municipio": "categoria(4)",
+    "ddd1": "texto(4)",
+    "telefone1": "texto(9)",
+    "ddd2": "texto(4)",
+    "telefone2": "texto(9)",
+    "dddfax": "texto(4)",
+    "fax": "texto(9)",
+    "email": "texto(200)",
+    "situacao_especial": "texto(100)",
+    "data_situacao_especial": "data",
+    "cnae_fiscal_secundario": "texto",
+    "CNPJ": "codigo(14)"
+}
+
+# Chave de um estabelecimento entre releases (atualização incremental)
+ESTABELECIMENTOS_CHAVE = ["CNPJ"]
+
+# Ponte estabelecimento × CNAE (src/processors/ponte_cnae.py): principal e secundários,
+# uma linha por par, principal = 1 ou 0
+ESTABELECIMENTO_CNAE_SCHEMA = ["cnae", "CNPJ", "cnpj_basico", "principal"]
+
+ESTABELECIMENTO_CNAE_TIPOS = {
+    "cnae": "codigo(7)",
+    "CNPJ": "codigo(14)",
+    "cnpj_basico": "codigo(8)",
+    "principal": "inteiro"
+}
+
+# (coluna de código, tabela auxiliar, coluna de descrição gerada)
+ESTABELECIMENTOS_ENRIQUECIMENTO = [
+    ("situacao_cadastral", "situacoes", "descricao_situacao_cadastral"),
+    ("municipio", "municipios", "descricao_municipio"),
+    ("cnae_fiscal_principal", "cnaes", "descricao_cnae_principal"),
+    ("pais", "paises", "descricao_pais"),
+    ("motivo_situacao_cadastral", "motivos", "descricao_motivo_situacao")
+]
@@ -11,3 +11,28 @@ SOCIOS_SCHEMA = [
     "qualificacao_representante",
     "faixa_etaria"
 ]
+
+# Tipos por coluna (ver src/schemas/tipos.py)
+SOCIOS_TIPOS = {
+    "cnpj_basico": "codigo(8)",
+    "identificador_socio": "inteiro",
+    "nome_socio": "texto(200)",
+    "cnpj_cpf_socio": "texto(14)",
+    "qualificacao_socio": "categoria(2)",
+    "data_entrada_sociedade": "data",
+    "pais": "categoria(3)",
+    "representante_legal": "texto(11)",
+    "nome_do_representante": "texto(200)",
+    "qualificacao_representante": "categoria(2)",
+    "faixa_etaria": "inteiro"
+}
+
+# Identidade de um sócio entre releases (atualização incremental); o CPF vem
+# mascarado pela Receita, por isso o nome e a qualificação também compõem a chave
+SOCIOS_CHAVE = ["cnpj_basico", "identificador_socio", "cnpj_cpf_socio", "nome_socio", "qualificacao_socio"]
+
+# (coluna de código, tabela auxiliar, coluna de descrição gerada)
+SOCIOS_ENRIQUECIMENTO = [
+    ("qualificacao_socio", "qualificacoes", "descricao_qualificacao_socio"),
+    ("pais", "paises", "descricao_pais")
+]
@@ -0,0 +1,154 @@
+"""
+Tipos de coluna declarados nos schemas e sua tradução para pandas, Arrow/Parquet,
+DuckDB e MySQL
+
+Vocabulário (larguras entre parênteses são opcionais):
+    texto(n)      texto livre; VARCHAR(n) no MySQL, TEXT sem largura
+    codigo(n)     código numérico de largura fixa, completado com zeros à esquerda
+    categoria(n)  código de baixa cardinalidade, mantido como categórico/dicionário
+    inteiro       inteiro pequeno anulável (Int16)
+    data          data AAAAMMDD da Receita, gravada como date32
+    decimal       valor monetário com vírgula decimal, gravado como decimal(18,2)
+    contagem      contagem agregada (int64), usada nos cubos
+    soma          soma de valores monetários, decimal(38,2), usada nos cubos
+
+Colunas sem tipo declarado são tratadas como texto, ou como categoria
+quando já chegam categóricas do enriquecimento
+"""
+
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+PADRAO_TIPO = re.compile(r"^(\w+)(?:\((\d+)\))?$")
+
+TIPOS_ARROW = {
+    "texto": pa.string(),
+    "codigo": pa.string(),
+    "categoria": pa.dictionary(pa.int32(), pa.string()),
+    "inteiro": pa.int16(),
+    "data": pa.date32(),
+    "decimal": pa.decimal128(18, 2),
+    "contagem": pa.int64(),
+    "soma": pa.decimal128(38, 2),
+}
+
+# Valores aceitos antes do cast; o restante vira nulo em vez de abortar o chunk
+PADRAO_DECIMAL = r"^-?\d{1,16}(\.\d{1,2})?$"
+PADRAO_INTEIRO = r"^-?\d{1,4}$"
+
+
+def tipo_base(tipo):
+    """Separa um tipo declarado em (nome, largura); largura é None se omitida"""
+    encontrado = PADRAO_TIPO.match(tipo or "texto")
+    if not encontrado or encontrado.group(1) not in TIPOS_ARROW:
+        raise ValueError(f"Tipo de coluna desconhecido: {tipo}")
+    nome, largura = encontrado.groups()
+    return nome, int(largura) if largura else None
+
+
+def schema_arrow(colunas, tipos=None):
+    """Monta o schema Arrow para as colunas, usando os tipos declarados"""
+    tipos = tipos or {}
+    return pa.schema([(coluna, TIPOS_ARROW[tipo_base(tipos.get(coluna))[0]]) for coluna in colunas])
+
+
+def dtypes_leitura(colunas, tipos=None):
+    """dtypes do read_csv: categorias já na leitura, demais colunas como texto Arrow"""
+    tipos = tipos or {}
+    return {coluna: "category" if tipo_base(tipos.get(coluna))[0] == "categoria" else "string[pyarrow]"
+            for coluna in colunas}
+
+
+def _serie_arrow(serie, array):
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=serie.index, name=serie.name)
+
+
+def _somente_validos(array, padrao):
+    return pc.if_else(pc.match_substring_regex(array, padrao), array, pa.scalar(None, pa.string()))
+
+
+def converter_coluna(serie, tipo):
+    """Converte uma coluna lida como texto para o tipo declarado
+
+    Colunas que já estão no tipo de destino são devolvidas sem alteração.
+    """
+    nome, largura = tipo_base(tipo)
+    if nome == "categoria":
+        return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype("category")
+    if nome == "codigo":
+        return serie.str.pad(largura, fillchar="0") if largura else serie
+    if nome == "texto":
+        return serie
+    if isinstance(serie.dtype, pd.ArrowDtype) and serie.dtype.pyarrow_dtype == TIPOS_ARROW[nome]:
+        return serie
+
+    texto = pa.array(serie.astype("string[pyarrow]"), type=pa.string(), from_pandas=True)
+    if nome in ("contagem", "soma"):
+        # Medidas dos cubos: nunca vêm dos arquivos da Receita, já chegam limpas
+        return _serie_arrow(serie, texto.cast(TIPOS_ARROW[nome]))
+    if nome == "data":
+        # A Receita grava datas como AAAAMMDD; '0' e '00000000' indicam ausência
+        datas = pc.strptime(texto, format="%Y%m%d", unit="s", error_is_null=True)
+        return _serie_arrow(serie, datas.cast(pa.date32()))
+    if nome == "decimal":
+        texto = pc.replace_substring(texto, ",", ".")
+        return _serie_arrow(serie, _somente_validos(texto, PADRAO_DECIMAL).cast(TIPOS_ARROW[nome]))
+    return _serie_arrow(serie, _somente_validos(texto, PADRAO_INTEIRO).cast(TIPOS_ARROW[nome]))
+
+
+def converter_chunk(chunk, tipos=None):
+    """Aplica os tipos declarados às colunas presentes no chunk"""
+    for coluna, tipo in (tipos or {}).items():
+        if coluna in chunk.columns:
+            chunk[coluna] = converter_coluna(chunk[coluna], tipo)
+    return chunk
+
+
+def tabela_arrow(chunk, tipos=None):
+    """Converte um chunk do pandas em uma tabela Arrow com o schema declarado"""
+    tipos = dict(tipos or {})
+    for coluna, dtype in chunk.dtypes.items():
+        if coluna not in tipos and isinstance(dtype, pd.CategoricalDtype):
+            tipos[coluna] = "categoria"
+    schema = schema_arrow(chunk.columns, tipos)
+
+    colunas = []
+    for campo in schema:
+        serie = converter_coluna(chunk[campo.name], tipos.get(campo.name, "texto"))
+        colunas.append(pa.array(serie, from_pandas=True).cast(campo.type))
+
+    return pa.Table.from_arrays(colunas, schema=schema)
+
+
+def tipo_mysql(tipo):
+    """Tipo MySQL correspondente a um tipo declarado"""
+    nome, largura = tipo_base(tipo)
+    if nome == "texto":
+        return f"VARCHAR({largura})" if largura else "TEXT"
+    if nome in ("codigo", "categoria"):
+        return f"CHAR({largura})" if largura else "VARCHAR(20)"
+    if nome == "inteiro":
+        return "SMALLINT"
+    if nome == "contagem":
+        return "BIGINT"
+    if nome == "data":
+        return "DATE"
+    if nome == "soma":
+        return "DECIMAL(38,2)"
+    return "DECIMAL(18,2)"
+
+
+def ddl_mysql(tabela, colunas, tipos=None, chave_primaria=None, indices=()):
+    """Monta o CREATE TABLE MySQL de uma entidade a partir do schema tipado"""
+    tipos = tipos or {}
+    definicoes = [f"{coluna} {tipo_mysql(tipos.get(coluna))}" for coluna in colunas]
+    if chave_primaria:
+        chave = [chave_primaria] if isinstance(chave_primaria, str) else list(chave_primaria)
+        definicoes.append(f"PRIMARY KEY ({', '.join(chave)})")
+    definicoes += [f"INDEX idx_{coluna} ({coluna})" for coluna in indices]
+
+    return (f"CREATE TABLE IF NOT EXISTS {tabela} (\n    " + ",\n    ".join(definicoes) +
+            "\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci")
@@ -0,0 +1,280 @@
+"""
+Motor de download compartilhado para os arquivos da Receita Federal
+Downloads concorrentes, gravação em streaming, retomada via HTTP Range
+e métricas de throughput por arquivo
+
+A retomada só acontece se o arquivo no servidor ainda é o mesmo do .part: o
+ETag (ou Last-Modified) da primeira resposta fica em {arquivo}.part.json e
+vai no If-Range, e o Content-Range das respostas 206/416 é conferido contra
+o tamanho do .part. Um .part que não confere é descartado e o download
+recomeça do zero.
+"""
+
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import requests
+from dateutil.relativedelta import relativedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.processors.metricas import contar, em_contexto
+
+URL_RECEITA = "https://arquivos.receitafederal.gov.br/dados/cnpj/dados_abertos_cnpj/{ano}-{mes:02d}/"
+
+TAMANHO_BLOCO = 1024 * 1024  # 1 MB por escrita em disco
+TIMEOUT = 30
+
+PADRAO_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+PADRAO_RANGE_INSATISFEITO = re.compile(r"bytes \*/(\d+)")
+
+
+@dataclass
+class ResultadoDownload:
+    """Resultado e métricas do download de um arquivo"""
+    nome: str
+    status: str  # baixado, existente, nao_encontrado ou erro
+    bytes: int = 0
+    segundos: float = 0.0
+    retomado_de: int = 0
+    erro: str = ""
+
+    @property
+    def ok(self):
+        return self.status in ("baixado", "existente")
+
+    @property
+    def mb_por_segundo(self):
+        if self.segundos <= 0:
+            return 0.0
+        return self.bytes / (1024 ** 2) / self.segundos
+
+
+def criar_sessao(conexoes=4, tentativas=3):
+    """Cria uma sessão HTTP keep-alive com pool de conexões e retentativas"""
+    retry = Retry(total=tentativas, backoff_factor=1,
+                  status_forcelist=(500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes, max_retries=retry)
+
+    sessao = requests.Session()
+    sessao.mount("http://", adapter)
+    sessao.mount("https://", adapter)
+    return sessao
+
+
+def _arquivo_validador(parcial):
+    return parcial.with_name(parcial.name + ".json")
+
+
+def _ler_validador(parcial):
+    """ETag e Last-Modified da resposta que iniciou o .part, ou None se não foram gravados"""
+    try:
+        with open(_arquivo_validador(parcial), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_validador(parcial, response):
+    with open(_arquivo_validador(parcial), "w", encoding="utf-8") as f:
+        json.dump({"etag": response.headers.get("ETag"),
+                   "last_modified": response.headers.get("Last-Modified")}, f)
+
+
+def _if_range(validador):
+    """Valor do If-Range: o ETag forte ou, na falta dele, o Last-Modified"""
+    etag = validador.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return validador.get("last_modified")
+
+
+def _descartar_parcial(parcial):
+    parcial.unlink(missing_ok=True)
+    _arquivo_validador(parcial).unlink(missing_ok=True)
+
+
+def _concluir(parcial, destino):
+    parcial.replace(destino)
+    _arquivo_validador(parcial).unlink(missing_ok=True)
+
+
+def baixar_arquivo(sessao, url, destino: Path, tamanho_bloco=TAMANHO_BLOCO, timeout=TIMEOUT):
+    """Baixa uma URL em streaming para destino, retomando um .part existente"""
+    destino = Path(destino)
+    if destino.exists():
+        return ResultadoDownload(destino.name, "existente")
+
+    resultado = _baixar(sessao, url, destino, tamanho_bloco, timeout)
+    if resultado is None:
+        # O .part não era do arquivo atual no servidor e foi descartado
+        resultado = _baixar(sessao, url, destino, tamanho_bloco, timeout)
+    return resultado
+
+
+def _baixar(sessao, url, destino, tamanho_bloco, timeout):
+    """Uma tentativa de download; None se o .part não confere e precisa recomeçar do zero"""
+    parcial = destino.with_name(destino.name + ".part")
+    inicio = parcial.stat().st_size if parcial.exists() else 0
+    validador = _ler_validador(parcial) if inicio else None
+    if inicio and validador is None:
+        # .part sem validador gravado: não há como saber se é do mesmo arquivo
+        _descartar_parcial(parcial)
+        inicio = 0
+
+    headers = {}
+    if inicio:
+        headers["Range"] = f"bytes={inicio}-"
+        if _if_range(validador):
+            headers["If-Range"] = _if_range(validador)
+
+    t0 = time.perf_counter()
+    baixados = 0
+    total = None
+
+    try:
+        with sessao.get(url, stream=True, timeout=timeout, headers=headers) as response:
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code == 416 and inicio:
+                insatisfeito = PADRAO_RANGE_INSATISFEITO.fullmatch(content_range)
+                if insatisfeito and int(insatisfeito.group(1)) == inicio:
+                    # O .part já contém o arquivo inteiro
+                    _concluir(parcial, destino)
+                    return ResultadoDownload(destino.name, "baixado", retomado_de=inicio)
+                # .part maior que o arquivo, ou tamanho não informado
+                _descartar_parcial(parcial)
+                return None
+
+            if response.status_code == 404:
+                return ResultadoDownload(destino.name, "nao_encontrado")
+
+            if response.status_code == 206:
+                faixa = PADRAO_CONTENT_RANGE.fullmatch(content_range)
+                if not inicio or not faixa or int(faixa.group(1)) != inicio:
+                    _descartar_parcial(parcial)
+                    if inicio:
+                        return None
+                    return ResultadoDownload(destino.name, "erro",
+                                             erro=f"Resposta parcial inesperada: {content_range!r}")
+                total = None if faixa.group(3) == "*" else int(faixa.group(3))
+                modo = "ab"
+            elif response.status_code == 200:
+                # Servidor ignorou o Range ou o arquivo mudou (If-Range): recomeça do zero
+                modo, inicio = "wb", 0
+                _gravar_validador(parcial, response)
+            else:
+                return ResultadoDownload(destino.name, "erro",
+                                         erro=f"Status {response.status_code}")
+
+            esperado = response.headers.get("Content-Length")
+
+            with open(parcial, modo) as f:
+                for bloco in response.iter_content(chunk_size=tamanho_bloco):
+                    f.write(bloco)
+                    baixados += len(bloco)
+
+        if esperado is not None and baixados != int(esperado):
+            return ResultadoDownload(destino.name, "erro", baixados,
+                                     time.perf_counter() - t0, inicio,
+                                     erro=f"Incompleto: {baixados} de {esperado} bytes")
+        if total is not None and parcial.stat().st_size != total:
+            return ResultadoDownload(destino.name, "erro", baixados,
+                                     time.perf_counter() - t0, inicio,
+                                     erro=f"Incompleto: {parcial.stat().st_size} de {total} bytes")
+
+        _concluir(parcial, destino)
+        return ResultadoDownload(destino.name, "baixado", baixados,
+                                 time.perf_counter() - t0, inicio)
+
+    except requests.RequestException as e:
+        # O .part fica em disco para ser retomado na próxima execução
+        return ResultadoDownload(destino.name, "erro", baixados,
+                                 time.perf_counter() - t0, inicio, erro=str(e))
+
+
+def _exibir_resultado(resultado):
+    if resultado.status == "baixado":
+        retomada = f" (retomado de {resultado.retomado_de / 1024 ** 2:.1f}MB)" if resultado.retomado_de else ""
+        print(f"✅ {resultado.nome} baixado: {resultado.bytes / 1024 ** 2:.1f}MB em "
+              f"{resultado.segundos:.1f}s ({resultado.mb_por_segundo:.1f}MB/s){retomada}")
+    elif resultado.status == "existente":
+        print(f"⚠️ Arquivo {resultado.nome} já existe. Pulando...")
+    elif resultado.status == "nao_encontrado":
+        print(f"❌ Erro ao baixar {resultado.nome}: Status 404")
+    elif resultado.status == "erro":
+        print(f"❌ Erro ao baixar {resultado.nome}: {resultado.erro}")
+
+
+def baixar_lote(downloads, workers=4, sessao=None):
+    """Baixa uma lista de (url, destino) com um pool limitado de threads"""
+    sessao_propria = sessao is None
+    if sessao_propria:
+        sessao = criar_sessao(conexoes=workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futuros = [pool.submit(em_contexto(baixar_arquivo), sessao, url, destino) for url, destino in downloads]
+            resultados = []
+            for futuro in futuros:
+                resultado = futuro.result()
+                _exibir_resultado(resultado)
+                if resultado.status == "baixado":
+                    contar("arquivos_baixados")
+                    contar("bytes_baixados", resultado.bytes)
+                resultados.append(resultado)
+    finally:
+        if sessao_propria:
+            sessao.close()
+
+    return resultados
+
+
+def resumir_downloads(resultados):
+    """Exibe o throughput agregado de um lote de downloads"""
+    baixados = [r for r in resultados if r.status == "baixado"]
+    if not baixados:
+        return
+
+    total_mb = sum(r.bytes for r in baixados) / 1024 ** 2
+    maior_tempo = max(r.segundos for r in baixados)
+    taxa = total_mb / maior_tempo if maior_tempo > 0 else 0.0
+    print(f"📦 {len(baixados)} arquivos, {total_mb:.1f}MB baixados ({taxa:.1f}MB/s agregado)")
+
+
+def baixar_release(prefixo, partes, diretorio: Path, workers=4, url_base=URL_RECEITA, meses=11):
+    """Baixa as partes {prefixo}{j}.zip do release mais recente disponível
+
+    Percorre os últimos meses até encontrar um release com arquivos publicados.
+    Retorna a lista de ResultadoDownload do release encontrado.
+    """
+    diretorio.mkdir(exist_ok=True)
+    data_atual = datetime.now()
+
+    with criar_sessao(conexoes=workers) as sessao:
+        for i in range(meses):
+            data_download = data_atual - relativedelta(months=i)
+            ano = data_download.year
+            mes = data_download.month
+
+            print(f"📅 Tentando {ano}-{mes:02d}...")
+
+            base = url_base.format(ano=ano, mes=mes)
+            downloads = [
+                (f"{base}{prefixo}{j}.zip", diretorio / f"{prefixo}{j}_{ano}_{mes:02d}.zip")
+                for j in partes
+            ]
+
+            resultados = baixar_lote(downloads, workers, sessao)
+            resumir_downloads(resultados)
+
+            if any(r.ok for r in resultados):
+                print(f"✅ Encontrados arquivos para {ano}-{mes:02d}")
+                return resultados
+
+    print(f"❌ Nenhum arquivo de {prefixo} encontrado nos últimos {meses} meses")
+    return []
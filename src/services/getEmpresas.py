@@ -1,6 +1,3 @@
-import requests
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
 from pathlib import Path
 import sys
 import zipfile
@@ -8,9 +5,12 @@ import pandas as pd
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 from src.schemas.empSchema import EMPRESAS_SCHEMA as COLUMNS
+from src.processors.checkpoint import ConsolidacaoCsv, consolidacao_retomavel
+from src.processors.metricas import contar, etapa
+from src.services.downloader import URL_RECEITA, baixar_release
 
 def extrair_e_limpar(diretorio: Path):
-    zips = list(diretorio.glob("*.zip"))
+    zips = list(diretorio.glob("Empresas*.zip"))
     contador_csv = 1
 
     for zip_path in zips:
@@ -21,6 +21,7 @@ def extrair_e_limpar(diretorio: Path):
                     
                     if file_info.filename.endswith('.EMPRECSV'):
                         zip_ref.extract(file_info, diretorio)
+                        contar("bytes_extraidos", file_info.file_size)
                         
                         novo_nome = diretorio / f"empresas{contador_csv}.csv"
                         extracted_path.rename(novo_nome)
@@ -32,69 +33,30 @@ def extrair_e_limpar(diretorio: Path):
         finally:
             zip_path.unlink()
 
-def baixar_arquivos_empresas():
+def baixar_arquivos_empresas(workers=4, url_base=URL_RECEITA):
     print("🏢 Baixando arquivos de empresas...")
-    
-    url_base = "https://arquivos.receitafederal.gov.br/dados/cnpj/dados_abertos_cnpj/{ano}-{mes:02d}/"
-    diretorio_download = Path("Data")
-    diretorio_download.mkdir(exist_ok=True)
-    
-    data_atual = datetime.now()
-    
-    for i in range(11):
-        data_download = data_atual - relativedelta(months=i)
-        ano = data_download.year
-        mes = data_download.month
-        
-        print(f"📅 Tentando {ano}-{mes:02d}...")
-        
-        for j in range(0, 12):
-            url = f"{url_base}Empresas{j}.zip".format(ano=ano, mes=mes)
-            nome_arquivo = f"Empresas{j}_{ano}_{mes:02d}.zip"
-            caminho_arquivo = diretorio_download / nome_arquivo
-            
-            if caminho_arquivo.exists():
-                print(f"⚠️ Arquivo {nome_arquivo} já existe. Pulando...")
-                continue
-            
-            try:
-                response = requests.get(url, timeout=30)
-                if response.status_code == 200:
-                    with open(caminho_arquivo, 'wb') as f:
-                        f.write(response.content)
-                    print(f"✅ {nome_arquivo} baixado com sucesso")
-                else:
-                    print(f"❌ Erro ao baixar {nome_arquivo}: Status {response.status_code}")
-                    
-            except requests.RequestException as e:
-                print(f"❌ Erro de conexão para {nome_arquivo}: {e}")
-                continue
-        
-        if any((diretorio_download / f"Empresas{j}_{ano}_{mes:02d}.zip").exists() for j in range(1, 12)):
-            print(f"✅ Encontrados arquivos para {ano}-{mes:02d}")
-            break
-    else:
-        print("❌ Nenhum arquivo de empresas encontrado nos últimos 11 meses")
+    return baixar_release("Empresas", range(0, 12), Path("Data"), workers=workers, url_base=url_base)
+
+def processar_empresas(retomar=False):
+    """Processa arquivos CSV de empresas e consolida em um único arquivo usando chunks
 
-def processar_empresas():
-    """Processa arquivos CSV de empresas e consolida em um único arquivo usando chunks"""
+    retomar=True pula os arquivos já consolidados por uma execução interrompida.
+    """
     print("⚙️ Processando arquivos de empresas com chunks...")
     
     diretorio = Path("Data")
-    arquivos_csv = list(diretorio.glob("empresas*.csv"))
+    arquivos_csv = sorted(a for a in diretorio.glob("empresas*.csv") if a.name != "empresas_final.csv")
     
     if not arquivos_csv:
         print("❌ Nenhum arquivo CSV de empresas encontrado")
         return
     
-    caminho_saida = Path("database") / "empresas_final.csv"
+    caminho_saida = diretorio / "empresas_final.csv"
     caminho_saida.parent.mkdir(exist_ok=True)
     
-    # Remove arquivo existente se houver
-    if caminho_saida.exists():
-        caminho_saida.unlink()
-    
-    total_registros = 0
+    # O final anterior só é substituído quando a nova consolidação termina
+    checkpoint = ConsolidacaoCsv(caminho_saida, arquivos_csv, retomar)
+    total_registros = checkpoint.registros
     chunk_size = 50000  # Processa 50k registros por vez
     
     print(f"📁 Encontrados {len(arquivos_csv)} arquivos para processar")
@@ -103,6 +65,10 @@ def processar_empresas():
     for i, arquivo in enumerate(arquivos_csv, 1):
         print(f"📄 Processando arquivo {i}/{len(arquivos_csv)}: {arquivo.name}")
         
+        if checkpoint.concluido(arquivo):
+            print(f"  ⏭️  {arquivo.name}: já consolidado")
+            continue
+        
         try:
             # Lê o arquivo em chunks
             chunk_iter = pd.read_csv(
@@ -119,9 +85,9 @@ def processar_empresas():
             arquivo_registros = 0
             
             for chunk_num, chunk in enumerate(chunk_iter, 1):
-                # Salva o chunk no arquivo final
+                # Salva o chunk no arquivo parcial (vira o final ao terminar)
                 chunk.to_csv(
-                    caminho_saida, 
+                    checkpoint.parcial, 
                     mode='a',  # Modo append
                     header=(total_registros == 0),  # Header apenas no primeiro chunk
                     index=False, 
@@ -131,17 +97,23 @@ def processar_empresas():
                 
                 arquivo_registros += len(chunk)
                 total_registros += len(chunk)
+                contar("linhas_lidas", len(chunk))
                 
                 # Mostra progresso
                 print(f"  📊 Chunk {chunk_num}: +{len(chunk):,} registros (Total: {total_registros:,})")
             
+            checkpoint.confirmar(arquivo, arquivo_registros)
             print(f"  ✅ {arquivo.name}: {arquivo_registros:,} registros processados")
             
         except Exception as e:
+            # Sem publicar um final incompleto: o parcial volta ao último arquivo confirmado e
+            # as entradas ficam em Data/, então a consolidação continua daqui com --resume
             print(f"❌ Erro ao processar {arquivo}: {e}")
-            continue
+            checkpoint.descartar()
+            raise
     
     if total_registros > 0:
+        checkpoint.finalizar()
         print(f"✅ Consolidação concluída!")
         print(f"📊 Total de registros processados: {total_registros:,}")
         print(f"💾 Arquivo salvo: {caminho_saida}")
@@ -154,11 +126,25 @@ def processar_empresas():
     else:
         print("❌ Nenhum arquivo foi processado com sucesso")
 
-def baixar_empresas():
-    """Função principal para baixar e processar dados de empresas"""
-    baixar_arquivos_empresas()
-    extrair_e_limpar(Path("Data"))
-    processar_empresas()
+def baixar_empresas(download_workers=4, extrair=True, retomar=False):
+    """Função principal para baixar e processar dados de empresas
+
+    Com extrair=False os zips são mantidos em Data/ para leitura direta
+    pelo empresasConstructor(origem='zip').
+    """
+    if extrair and retomar and consolidacao_retomavel(Path("Data") / "empresas_final.csv"):
+        # Os zips já foram extraídos e apagados; os CSVs da consolidação interrompida estão em Data/
+        print("♻️  Consolidação interrompida encontrada: download e extração pulados")
+        with etapa("consolidacao_empresas"):
+            processar_empresas(retomar)
+        return
+    with etapa("download_empresas"):
+        baixar_arquivos_empresas(workers=download_workers)
+    if extrair:
+        with etapa("extracao_empresas"):
+            extrair_e_limpar(Path("Data"))
+        with etapa("consolidacao_empresas"):
+            processar_empresas(retomar)
 
 # Mantém compatibilidade com código antigo
 getEmp = baixar_empresas
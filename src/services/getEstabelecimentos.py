@@ -1,6 +1,3 @@
-import requests
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
 from pathlib import Path
 import sys
 import zipfile
@@ -8,9 +5,12 @@ import pandas as pd
 
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 from src.schemas.estabSchema import ESTABELECIMENTOS_SCHEMA as COLUMNS
+from src.processors.checkpoint import ConsolidacaoCsv, consolidacao_retomavel
+from src.processors.metricas import contar, etapa
+from src.services.downloader import URL_RECEITA, baixar_release
 
 def extrair_e_limpar(diretorio: Path):
-    zips = list(diretorio.glob("*.zip"))
+    zips = list(diretorio.glob("Estabelecimentos*.zip"))
     contador_csv = 1
 
     for zip_path in zips:
@@ -19,6 +19,7 @@ def extrair_e_limpar(diretorio: Path):
                 for file_info in zip_ref.infolist():
                     extracted_path = diretorio / file_info.filename
                     zip_ref.extract(file_info, path=diretorio)
+                    contar("bytes_extraidos", file_info.file_size)
 
                     if file_info.filename.upper().endswith(".ESTABELE"):
                         new_name = Path(file_info.filename).with_suffix(".csv")
@@ -45,9 +46,12 @@ def extrair_e_limpar(diretorio: Path):
         except Exception as e:
             print(f"Erro ao processar {zip_path.name}: {e}")
 
-def aplicar_schema_estabelecimentos(diretorio: Path, colunas: list[str], chunk_size_csv=50000):
-    """Aplica schema aos arquivos CSV de estabelecimentos usando chunks eficientes"""
-    all_csv_files = list(diretorio.glob("estabelecimentos*.csv"))
+def aplicar_schema_estabelecimentos(diretorio: Path, colunas: list[str], chunk_size_csv=50000, retomar=False):
+    """Aplica schema aos arquivos CSV de estabelecimentos usando chunks eficientes
+
+    retomar=True pula os arquivos já consolidados por uma execução interrompida.
+    """
+    all_csv_files = sorted(diretorio.glob("estabelecimentos[0-9]*.csv"))
     
     if not all_csv_files:
         print("❌ Nenhum arquivo CSV de estabelecimentos encontrado")
@@ -55,19 +59,21 @@ def aplicar_schema_estabelecimentos(diretorio: Path, colunas: list[str], chunk_s
     
     print(f"📂 Encontrados {len(all_csv_files)} arquivos CSV para processar")
     
-    caminho_saida = Path("database") / "estabelecimentos_final.csv"
+    caminho_saida = diretorio / "estabelecimentos_final.csv"
     caminho_saida.parent.mkdir(exist_ok=True)
     
-    # Remove arquivo existente se houver
-    if caminho_saida.exists():
-        caminho_saida.unlink()
-    
-    total_registros = 0
+    # O final anterior só é substituído quando a nova consolidação termina
+    checkpoint = ConsolidacaoCsv(caminho_saida, all_csv_files, retomar)
+    total_registros = checkpoint.registros
     
     # Processa cada arquivo em chunks
     for i, csv_file in enumerate(all_csv_files, 1):
         print(f"📄 Processando arquivo {i}/{len(all_csv_files)}: {csv_file.name}")
         
+        if checkpoint.concluido(csv_file):
+            print(f"  ⏭️  {csv_file.name}: já consolidado")
+            continue
+        
         try:
             # Lê o arquivo em chunks
             chunk_iter = pd.read_csv(
@@ -84,9 +90,9 @@ def aplicar_schema_estabelecimentos(diretorio: Path, colunas: list[str], chunk_s
             arquivo_registros = 0
             
             for chunk_num, chunk in enumerate(chunk_iter, 1):
-                # Salva o chunk no arquivo final
+                # Salva o chunk no arquivo parcial (vira o final ao terminar)
                 chunk.to_csv(
-                    caminho_saida, 
+                    checkpoint.parcial, 
                     mode='a',  # Modo append
                     header=(total_registros == 0),  # Header apenas no primeiro chunk
                     index=False, 
@@ -96,89 +102,75 @@ def aplicar_schema_estabelecimentos(diretorio: Path, colunas: list[str], chunk_s
                 
                 arquivo_registros += len(chunk)
                 total_registros += len(chunk)
+                contar("linhas_lidas", len(chunk))
                 
                 # Mostra progresso
                 print(f"  📊 Chunk {chunk_num}: +{len(chunk):,} registros (Total: {total_registros:,})")
             
+            checkpoint.confirmar(csv_file, arquivo_registros)
             print(f"  ✅ {csv_file.name}: {arquivo_registros:,} registros processados")
             
         except Exception as e:
+            # Sem publicar um final incompleto: o parcial volta ao último arquivo confirmado e
+            # as entradas ficam em Data/, então a consolidação continua daqui com --resume
             print(f"❌ Erro ao processar {csv_file.name}: {e}")
-            continue
+            checkpoint.descartar()
+            raise
     
     if total_registros > 0:
+        checkpoint.finalizar()
         print(f"✅ Consolidação concluída!")
         print(f"📊 Total de registros processados: {total_registros:,}")
         print(f"💾 Arquivo salvo: {caminho_saida}")
         
-        # Lê o resultado final para retornar
-        return pd.read_csv(caminho_saida, sep=';', encoding='utf-8', dtype=str)
+        return total_registros
     else:
         print("❌ Nenhum arquivo foi processado com sucesso")
         return None
 
-def baixar_arquivos_estabelecimentos():
+def baixar_arquivos_estabelecimentos(workers=4, url_base=URL_RECEITA):
     print("🏢 Baixando arquivos de estabelecimentos...")
+    return baixar_release("Estabelecimentos", range(0, 11), Path("Data"), workers=workers, url_base=url_base)
+
+def baixar_estabelecimentos(download_workers=4, extrair=True, retomar=False):
+    """Função principal para baixar e processar dados de estabelecimentos
+
+    Com extrair=False os zips são mantidos em Data/ para leitura direta
+    pelo estabelecimentoConstructor(origem='zip').
+    """
+    if extrair and retomar and consolidacao_retomavel(Path("Data") / "estabelecimentos_final.csv"):
+        # Os zips já foram extraídos e apagados; os CSVs da consolidação interrompida estão em Data/
+        print("♻️  Consolidação interrompida encontrada: download e extração pulados")
+        with etapa("consolidacao_estabelecimentos") as registro:
+            registro["linhas"] = consolidar_estabelecimentos(retomar)
+        return
+    with etapa("download_estabelecimentos"):
+        baixar_arquivos_estabelecimentos(workers=download_workers)
+    if not extrair:
+        return
     
-    url_base = "https://arquivos.receitafederal.gov.br/dados/cnpj/dados_abertos_cnpj/{ano}-{mes:02d}/"
-    diretorio_download = Path("Data")
-    diretorio_download.mkdir(exist_ok=True)
-    
-    data_atual = datetime.now()
+    with etapa("extracao_estabelecimentos"):
+        extrair_e_limpar(Path("Data"))
     
-    for i in range(11):
-        data_download = data_atual - relativedelta(months=i)
-        ano = data_download.year
-        mes = data_download.month
-        
-        print(f"📅 Tentando {ano}-{mes:02d}...")
-        
-        for j in range(0, 11):
-            url = f"{url_base}Estabelecimentos{j}.zip".format(ano=ano, mes=mes)
-            nome_arquivo = f"Estabelecimentos{j}_{ano}_{mes:02d}.zip"
-            caminho_arquivo = diretorio_download / nome_arquivo
-            
-            if caminho_arquivo.exists():
-                print(f"⚠️ Arquivo {nome_arquivo} já existe. Pulando...")
-                continue
-            
-            try:
-                response = requests.get(url, timeout=30)
-                if response.status_code == 200:
-                    with open(caminho_arquivo, 'wb') as f:
-                        f.write(response.content)
-                    print(f"✅ {nome_arquivo} baixado com sucesso")
-                else:
-                    print(f"❌ Erro ao baixar {nome_arquivo}: Status {response.status_code}")
-                    
-            except requests.RequestException as e:
-                print(f"❌ Erro de conexão para {nome_arquivo}: {e}")
-                continue
-        
-        if any((diretorio_download / f"Estabelecimentos{j}_{ano}_{mes:02d}.zip").exists() for j in range(1, 11)):
-            print(f"✅ Encontrados arquivos para {ano}-{mes:02d}")
-            break
-    else:
-        print("❌ Nenhum arquivo de estabelecimentos encontrado nos últimos 11 meses")
+    with etapa("consolidacao_estabelecimentos") as registro:
+        registro["linhas"] = consolidar_estabelecimentos(retomar)
 
-def baixar_estabelecimentos():
-    """Função principal para baixar e processar dados de estabelecimentos"""
-    baixar_arquivos_estabelecimentos()
-    extrair_e_limpar(Path("Data"))
-    
+def consolidar_estabelecimentos(retomar=False):
+    """Aplica o schema aos CSVs extraídos, grava Data/estabelecimentos_final.csv e remove os temporários"""
     # Aplica schema e processa em chunks (já salva o arquivo final)
-    df_final = aplicar_schema_estabelecimentos(Path("Data"), COLUMNS)
+    total_registros = aplicar_schema_estabelecimentos(Path("Data"), COLUMNS, retomar=retomar)
     
-    if df_final is not None and not df_final.empty:
+    if total_registros:
         print(f"✅ Processamento de estabelecimentos concluído!")
         
         # Remove arquivos CSV temporários
         print("🧹 Limpando arquivos temporários...")
-        arquivos_csv = list(Path("Data").glob("estabelecimentos*.csv"))
+        arquivos_csv = list(Path("Data").glob("estabelecimentos[0-9]*.csv"))
         for arquivo in arquivos_csv:
             arquivo.unlink()
     else:
         print("❌ Nenhum dado foi processado")
+    return total_registros
 
 # Mantém compatibilidade com código antigo
 getEstab = baixar_estabelecimentos
@@ -0,0 +1,484 @@
+"""
+Gerador de releases sintéticos no layout bruto da Receita Federal
+
+Grava Empresas{j}_AAAA_MM.zip, Estabelecimentos{j}_AAAA_MM.zip e
+Socios{j}_AAAA_MM.zip com as colunas de src/schemas (separador ';', campos
+entre aspas, latin1), para medir o pipeline sem baixar os dados reais.
+
+As distribuições imitam o release real (PerfilSintetico): poucas empresas com
+muitas filiais (Zipf), UF/CNAE/município concentrados, sócios PJ apontando
+para um conjunto de holdings, nomes acentuados, aspas e ';' dentro de campos,
+CNPJs com dígitos verificadores válidos e uma fração de linhas malformadas
+(campos a mais) que a leitura com on_bad_lines='skip' descarta.
+Os códigos (CNAE, município, país...) são sorteados das tabelas de Auxiliar/.
+"""
+
+import io
+import sys
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.processors.auxiliares import DIRETORIO_AUXILIAR, ler_auxiliar
+from src.processors.fontes import ENTRADAS
+from src.schemas.empSchema import EMPRESAS_SCHEMA
+from src.schemas.estabSchema import ESTABELECIMENTOS_SCHEMA
+from src.schemas.sociosSchema import SOCIOS_SCHEMA
+
+# Participação aproximada de cada UF no total de estabelecimentos
+PESOS_UF = {
+    "SP": 28.0, "MG": 11.0, "RJ": 8.0, "PR": 7.0, "RS": 6.5, "SC": 5.0, "BA": 5.0, "GO": 3.5,
+    "PE": 3.0, "CE": 3.0, "DF": 2.0, "ES": 2.0, "PA": 2.0, "MT": 2.0, "MS": 1.5, "MA": 1.5,
+    "PB": 1.2, "RN": 1.1, "AL": 1.0, "PI": 1.0, "AM": 1.0, "SE": 0.8, "RO": 0.8, "TO": 0.6,
+    "AC": 0.3, "AP": 0.3, "RR": 0.3
+}
+UFS = sorted(PESOS_UF)
+
+PESOS_SITUACAO = {"01": 0.5, "02": 45.0, "03": 1.5, "04": 8.0, "08": 45.0}
+PESOS_PORTE = {"00": 3.0, "01": 60.0, "03": 7.0, "05": 30.0}
+PESOS_NATUREZA = {"2135": 50.0, "2062": 35.0, "2305": 4.0, "2240": 2.0}
+PESOS_QUALIFICACAO_SOCIO = {"49": 55.0, "22": 30.0, "05": 5.0, "16": 3.0}
+
+PRENOMES = ["JOÃO", "JOSÉ", "MARIA", "ANTÔNIO", "FRANCISCO", "ANA", "LUÍS", "PAULO", "CARLOS", "MÁRCIA",
+            "SEBASTIÃO", "CONCEIÇÃO", "FÁBIO", "LÚCIA", "ANDRÉ", "JOSÉFA", "CÉSAR", "INÊS", "RAIMUNDO", "VÂNIA"]
+SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "PEREIRA", "LIMA", "CARVALHO", "ARAÚJO", "GONÇALVES",
+              "GALVÃO", "LOURENÇO", "MACHADO", "ROMÃO", "BRANDÃO", "FALCÃO", "SIMÕES", "ASSUNÇÃO", "MELO",
+              "NOGUEIRA", "AZEVEDO"]
+ATIVIDADES = ["COMÉRCIO DE ALIMENTOS", "CONSTRUÇÕES", "SERVIÇOS MÉDICOS", "TRANSPORTES", "AUTO PEÇAS",
+              "INDÚSTRIA METALÚRGICA", "PADARIA E CONFEITARIA", "AÇOUGUE", "CONFECÇÕES", "INFORMÁTICA",
+              "MATERIAIS DE CONSTRUÇÃO", "ADMINISTRAÇÃO DE IMÓVEIS", "SERVIÇOS DE LIMPEZA", "DISTRIBUIDORA",
+              "AGROPECUÁRIA", "EDUCAÇÃO INFANTIL", "FARMÁCIA", "ÓTICA", "SALÃO DE BELEZA", "LOGÍSTICA"]
+SUFIXOS = ["LTDA", "LTDA", "LTDA", "EIRELI", "S.A.", "ME", "EPP", "& CIA LTDA"]
+FANTASIAS = ["BOM PREÇO", "SÃO JORGE", "NOSSA SENHORA APARECIDA", "PÃO QUENTE", "CENTRAL", "DO POVO",
+             "ESTRELA", "PRIMAVERA", "UNIÃO", "ÁGUIA DOURADA", "TRÊS IRMÃOS", "BOA VISTA", "PARAÍSO",
+             "SÃO FRANCISCO", "LIDER", "CAPITAL", "EXPRESSO", "REAL", "NOVA ERA", "PÉ DE MOLEQUE"]
+TIPOS_FANTASIA = ["MERCADINHO", "PADARIA", "AUTO ELÉTRICA", "FARMÁCIA", "LOJA", "BAR E LANCHONETE",
+                  "OFICINA", "MADEIREIRA", "DROGARIA", "RESTAURANTE"]
+TIPOS_LOGRADOURO = ["RUA", "RUA", "RUA", "AVENIDA", "TRAVESSA", "ESTRADA", "RODOVIA", "ALAMEDA", "PRAÇA"]
+COMPLEMENTOS = ["SALA 1", "LOJA 2", "ANDAR 3", "BLOCO B; SALA 104", "GALPÃO", "FUNDOS", "APTO 201",
+                "QUADRA 5; LOTE 12", "BOX 7", "TÉRREO"]
+BAIRROS = ["CENTRO", "JARDIM AMÉRICA", "VILA NOVA", "SÃO JOSÉ", "BELA VISTA", "SANTA LÚCIA", "CONCEIÇÃO",
+           "PLANALTO", "JARDIM PAULISTA", "VILA SÃO JOÃO", "LIBERDADE", "ALTO DA BOA VISTA"]
+
+# Escalas nomeadas do benchmark, em número de estabelecimentos
+ESCALAS = {"100k": 100_000, "1M": 1_000_000, "10M": 10_000_000, "100M": 100_000_000}
+
+LINHAS_POR_BLOCO = 200000
+
+# Bijeção i -> (A*i + B) mod 10^8 espalha os cnpj_basico sem repetir (A é primo com 10^8)
+_A, _B, _MODULO = 48271, 12345678, 10 ** 8
+
+# Pesos dos dígitos verificadores do CNPJ
+_PESOS_DV1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+_PESOS_DV2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+
+
+@dataclass
+class PerfilSintetico:
+    """Distribuições de cardinalidade e qualidade dos dados gerados"""
+    fracao_com_filiais: float = 0.03      # empresas com mais de um estabelecimento
+    expoente_filiais: float = 2.2         # Zipf do número de filiais dessas empresas
+    max_estabelecimentos: int = 5000      # teto por empresa (cnpj_ordem tem 4 dígitos)
+    fracao_com_socios: float = 0.25       # empresas com QSA (MEIs em geral não têm)
+    media_socios: float = 1.6             # sócios por empresa com QSA (geométrica)
+    fracao_socios_pj: float = 0.05        # sócios pessoa jurídica
+    fracao_socios_estrangeiros: float = 0.005
+    fracao_holdings: float = 0.002        # empresas que concentram as participações PJ
+    expoente_cnae: float = 1.1            # Zipf dos CNAEs (poucos muito frequentes)
+    expoente_municipio: float = 1.0       # Zipf dos municípios
+    fracao_mei: float = 0.4               # razão social "NOME CPF" dos empresários individuais
+    fracao_malformadas: float = 0.0001    # linhas com campos a mais, descartadas na leitura
+    pesos_uf: dict = field(default_factory=lambda: dict(PESOS_UF))
+    pesos_situacao: dict = field(default_factory=lambda: dict(PESOS_SITUACAO))
+    pesos_porte: dict = field(default_factory=lambda: dict(PESOS_PORTE))
+
+
+def interpretar_escala(texto):
+    """'1M', '10M', '250k' ou um inteiro → número de estabelecimentos"""
+    if texto in ESCALAS:
+        return ESCALAS[texto]
+    multiplicadores = {"k": 1_000, "m": 1_000_000}
+    sufixo = texto[-1].lower()
+    if sufixo in multiplicadores:
+        return int(float(texto[:-1]) * multiplicadores[sufixo])
+    return int(texto)
+
+
+def cnpj_basico_numerico(indices):
+    return (np.asarray(indices, dtype=np.int64) * _A + _B) % _MODULO
+
+
+def cnpj_basico(indices):
+    """cnpj_basico (8 dígitos) da empresa de cada índice"""
+    return _texto_numero(cnpj_basico_numerico(indices), 8)
+
+
+def digitos_verificadores(basico, ordem):
+    """Dígitos verificadores (0-99) dos CNPJs formados por cnpj_basico e cnpj_ordem numéricos"""
+    numero = np.asarray(basico, dtype=np.int64) * 10000 + np.asarray(ordem, dtype=np.int64)
+    digitos = (numero[:, None] // 10 ** np.arange(11, -1, -1, dtype=np.int64)) % 10
+
+    def dv(digitos, pesos):
+        resto = (digitos * pesos).sum(axis=1) % 11
+        return np.where(resto < 2, 0, 11 - resto)
+
+    dv1 = dv(digitos, _PESOS_DV1)
+    dv2 = dv(np.column_stack([digitos, dv1]), _PESOS_DV2)
+    return dv1 * 10 + dv2
+
+
+def _texto_numero(valores, digitos):
+    return pc.utf8_lpad(pa.array(np.asarray(valores)).cast(pa.string()), digitos, "0")
+
+
+def _numero(rng, n, digitos):
+    return _texto_numero(rng.integers(0, 10 ** digitos, n), digitos)
+
+
+def _escolha(rng, valores, n, pesos=None):
+    if pesos is None:
+        posicoes = rng.integers(0, len(valores), n)
+    else:
+        posicoes = rng.choice(len(valores), n, p=pesos)
+    return pa.array(valores, pa.string()).take(pa.array(posicoes))
+
+
+def _pesos(codigos, preferidos, peso_restante=5.0):
+    """Pesos normalizados: os códigos preferidos com seus pesos, o resto dividindo peso_restante"""
+    presentes = [c for c in codigos if c in preferidos]
+    outros = len(codigos) - len(presentes)
+    pesos = np.array([preferidos[c] if c in preferidos else peso_restante / max(outros, 1)
+                      for c in codigos], dtype=np.float64)
+    return pesos / pesos.sum()
+
+
+def _zipf(quantidade, expoente, semente):
+    """Pesos Zipf sobre uma permutação fixa, para que os mais frequentes variem com a semente"""
+    pesos = 1.0 / np.arange(1, quantidade + 1, dtype=np.float64) ** expoente
+    pesos = pesos[np.random.default_rng(semente).permutation(quantidade)]
+    return pesos / pesos.sum()
+
+
+def _hash(indices, sal):
+    """splitmix64: sorteio determinístico por índice, independente do bloco ou da parte"""
+    x = np.asarray(indices, dtype=np.uint64) + np.uint64(sal * 0x9E3779B97F4A7C15 % 2 ** 64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _da_lista(valores, indices, sal):
+    posicoes = (_hash(indices, sal) % np.uint64(len(valores))).astype(np.int64)
+    return pa.array(valores, pa.string()).take(pa.array(posicoes))
+
+
+def _nome_pessoa(indices, sal):
+    return pc.binary_join_element_wise(_da_lista(PRENOMES, indices, sal),
+                                       _da_lista(SOBRENOMES, indices, sal + 1),
+                                       _da_lista(SOBRENOMES, indices, sal + 2), " ")
+
+
+def razao_social(indices, fracao_mei=0.4):
+    """Razão social determinística da empresa de cada índice
+
+    Empresários individuais seguem o padrão da Receita, "NOME CPF"; as demais
+    combinam sobrenome, atividade e sufixo societário.
+    """
+    mei = (_hash(indices, 11) % np.uint64(10000)).astype(np.int64) < fracao_mei * 10000
+    cpf = _texto_numero((_hash(indices, 12) % np.uint64(10 ** 11)).astype(np.int64), 11)
+    individual = pc.binary_join_element_wise(_nome_pessoa(indices, 13), cpf, " ")
+    sociedade = pc.binary_join_element_wise(_da_lista(SOBRENOMES, indices, 16),
+                                            _da_lista(ATIVIDADES, indices, 17),
+                                            _da_lista(SUFIXOS, indices, 18), " ")
+    return pc.if_else(pa.array(mei), individual, sociedade)
+
+
+def _data(rng, n, inicio="1966-01-01", fim="2025-01-01"):
+    inicio, fim = np.datetime64(inicio, "D"), np.datetime64(fim, "D")
+    datas = inicio + (rng.random(n) * (fim - inicio).astype(np.int64)).astype("timedelta64[D]")
+    return datas
+
+
+def _texto_data(datas):
+    return pc.strftime(pa.array(np.asarray(datas).astype("datetime64[s]")), format="%Y%m%d")
+
+
+def _com_nulos(rng, valores, fracao_preenchida):
+    return pc.if_else(pa.array(rng.random(len(valores)) < fracao_preenchida), valores, pa.nulls(len(valores), pa.string()))
+
+
+def _vazio(n):
+    return pa.nulls(n, pa.string())
+
+
+class Codigos:
+    """Códigos válidos das tabelas auxiliares e os pesos com que são sorteados"""
+
+    def __init__(self, diretorio=DIRETORIO_AUXILIAR, perfil=None, semente=0):
+        perfil = perfil or PerfilSintetico()
+
+        def codigos(nome):
+            return ler_auxiliar(nome, diretorio)["codigo"].dropna().tolist()
+
+        self.cnaes = codigos("cnaes")
+        self.municipios = codigos("municipios")
+        self.paises = codigos("paises")
+        self.motivos = [c for c in codigos("motivos") if c != "00"] or ["00"]
+        self.naturezas = codigos("naturezas")
+        self.qualificacoes = codigos("qualificacoes")
+
+        self.pesos_cnae = _zipf(len(self.cnaes), perfil.expoente_cnae, semente)
+        self.pesos_municipio = _zipf(len(self.municipios), perfil.expoente_municipio, semente + 1)
+        self.pesos_natureza = _pesos(self.naturezas, PESOS_NATUREZA)
+        self.pesos_qualificacao = _pesos(self.qualificacoes, PESOS_QUALIFICACAO_SOCIO)
+
+        def normalizar(pesos):
+            total = sum(pesos.values())
+            return list(pesos), np.array(list(pesos.values())) / total
+
+        self.ufs, self.pesos_uf = normalizar(perfil.pesos_uf)
+        self.situacoes, self.pesos_situacao = normalizar(perfil.pesos_situacao)
+        self.portes, self.pesos_porte = normalizar(perfil.pesos_porte)
+
+
+def estabelecimentos_por_empresa(rng, n, perfil):
+    """Quantidade de estabelecimentos de cada empresa: 1 para a maioria, cauda Zipf para as demais"""
+    quantidades = np.ones(n, dtype=np.int64)
+    com_filiais = rng.random(n) < perfil.fracao_com_filiais
+    extras = rng.zipf(perfil.expoente_filiais, int(com_filiais.sum()))
+    quantidades[com_filiais] += np.minimum(extras, perfil.max_estabelecimentos - 1)
+    return quantidades
+
+
+def socios_por_empresa(rng, n, perfil):
+    quantidades = rng.geometric(1 / max(perfil.media_socios, 1.0), n)
+    return np.where(rng.random(n) < perfil.fracao_com_socios, quantidades, 0)
+
+
+def media_estabelecimentos(perfil):
+    """Média exata de estabelecimentos por empresa do perfil (Zipf truncada no teto)"""
+    teto = perfil.max_estabelecimentos - 1
+    k = np.arange(1, 10 ** 6, dtype=np.float64)
+    massa = k ** -perfil.expoente_filiais
+    zeta = massa.sum() + 10.0 ** (6 * (1 - perfil.expoente_filiais)) / (perfil.expoente_filiais - 1)
+    abaixo = massa[:teto - 1]
+    extras = (k[:teto - 1] * abaixo).sum() / zeta + teto * (1 - abaixo.sum() / zeta)
+    return 1 + perfil.fracao_com_filiais * extras
+
+
+def bloco_empresas(rng, codigos, indices, perfil):
+    n = len(indices)
+    # Capital social log-normal: maioria com poucos milhares, cauda de grandes empresas
+    capital = np.minimum(np.exp(rng.normal(9.0, 2.5, n)), 1e11)
+    centavos = np.round(capital * 100).astype(np.int64)
+    texto_capital = pc.binary_join_element_wise(pa.array(centavos // 100).cast(pa.string()),
+                                                _texto_numero(centavos % 100, 2), ",")
+    return pa.table({
+        "cnpj_basico": cnpj_basico(indices),
+        "razao_social": razao_social(indices, perfil.fracao_mei),
+        "natureza_juridica": _escolha(rng, codigos.naturezas, n, codigos.pesos_natureza),
+        "qualificacao_responsavel": _escolha(rng, ["50", "49", "65", "16", "05"], n),
+        "capital_social": texto_capital,
+        "porte_empresa": _escolha(rng, codigos.portes, n, codigos.pesos_porte),
+        "ente_federativo_responsavel": _vazio(n)
+    }).select(EMPRESAS_SCHEMA)
+
+
+def bloco_estabelecimentos(rng, codigos, indices, quantidades, perfil, fim="2025-01-01"):
+    # Uma linha por estabelecimento; a ordem 0001 é a matriz e as seguintes são filiais
+    empresa = np.repeat(indices, quantidades)
+    n = len(empresa)
+    inicio_grupo = np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+    ordem = np.arange(n) - inicio_grupo + 1
+    basico = cnpj_basico_numerico(empresa)
+
+    # Filiais ficam na UF da matriz em 80% dos casos
+    uf_matriz = rng.choice(len(codigos.ufs), len(indices), p=codigos.pesos_uf)
+    uf = np.repeat(uf_matriz, quantidades)
+    muda = (ordem > 1) & (rng.random(n) < 0.2)
+    uf[muda] = rng.choice(len(codigos.ufs), int(muda.sum()), p=codigos.pesos_uf)
+
+    situacao = _escolha(rng, codigos.situacoes, n, codigos.pesos_situacao)
+    ativa = pc.equal(situacao, "02")
+    inicio_atividade = _data(rng, n, fim=fim)
+    data_situacao = inicio_atividade + (rng.random(n) * (np.datetime64(fim, "D") - inicio_atividade)
+                                        .astype(np.int64)).astype("timedelta64[D]")
+
+    fantasia = pc.binary_join_element_wise(_escolha(rng, TIPOS_FANTASIA, n), _escolha(rng, FANTASIAS, n), " ")
+    # Aspas dentro do campo aparecem no dado real e são escritas dobradas ("")
+    com_aspas = pc.binary_join_element_wise(_escolha(rng, TIPOS_FANTASIA, n),
+                                            pc.binary_join_element_wise('"', _escolha(rng, FANTASIAS, n), '"', ""), " ")
+    fantasia = pc.if_else(pa.array(rng.random(n) < 0.02), com_aspas, fantasia)
+
+    # Até 5 CNAEs secundários distintos entre si e do principal, separados por vírgula
+    principal = rng.choice(len(codigos.cnaes), n, p=codigos.pesos_cnae)
+    quantidade_secundarios = rng.integers(0, 6, n)
+    posicoes = (principal[:, None] + np.cumsum(rng.integers(1, 40, (n, 5)), axis=1)) % len(codigos.cnaes)
+    offsets = np.concatenate([[0], np.cumsum(quantidade_secundarios)]).astype(np.int32)
+    valores = pa.array(codigos.cnaes, pa.string()).take(pa.array(posicoes[np.arange(5) < quantidade_secundarios[:, None]]))
+    secundarios = pc.binary_join(pa.ListArray.from_arrays(offsets, valores), ",")
+    texto_secundarios = pc.if_else(pa.array(quantidade_secundarios > 0), secundarios, _vazio(n))
+
+    email = pc.binary_join_element_wise("CONTATO", pa.array(basico).cast(pa.string()), "@EMAIL.COM.BR", "")
+    exterior = rng.random(n) < 0.001
+
+    return pa.table({
+        "cnpj_basico": _texto_numero(basico, 8),
+        "cnpj_ordem": _texto_numero(ordem, 4),
+        "cnpj_dv": _texto_numero(digitos_verificadores(basico, ordem), 2),
+        "identificador_matriz": pa.array(np.where(ordem == 1, "1", "2")),
+        "nome_fantasia": _com_nulos(rng, fantasia, 0.45),
+        "situacao_cadastral": situacao,
+        "data_situacao_cadastral": _texto_data(data_situacao),
+        "motivo_situacao_cadastral": pc.if_else(ativa, pa.scalar("00"), _escolha(rng, codigos.motivos, n)),
+        "nome_da_cidade_no_exterior": _vazio(n),
+        "pais": pc.if_else(pa.array(exterior), _escolha(rng, codigos.paises, n), _vazio(n)),
+        "data_inicio_atividade": _texto_data(inicio_atividade),
+        "cnae_fiscal_principal": pa.array(codigos.cnaes, pa.string()).take(pa.array(principal)),
+        "tipo_logradouro": _escolha(rng, TIPOS_LOGRADOURO, n),
+        "logradouro": pc.binary_join_element_wise(_escolha(rng, PRENOMES, n), _escolha(rng, SOBRENOMES, n), " "),
+        "numero": pc.if_else(pa.array(rng.random(n) < 0.05), pa.scalar("S/N"),
+                             pa.array(rng.integers(1, 5000, n)).cast(pa.string())),
+        "complemento": _com_nulos(rng, _escolha(rng, COMPLEMENTOS, n), 0.3),
+        "bairro": _escolha(rng, BAIRROS, n),
+        "cep": _numero(rng, n, 8),
+        "uf": pa.array(codigos.ufs, pa.string()).take(pa.array(uf)),
+        "municipio": _escolha(rng, codigos.municipios, n, codigos.pesos_municipio),
+        "ddd1": _com_nulos(rng, _texto_numero(rng.integers(11, 100, n), 2), 0.8),
+        "telefone1": _com_nulos(rng, _numero(rng, n, 8), 0.8),
+        "ddd2": _vazio(n),
+        "telefone2": _vazio(n),
+        "dddfax": _vazio(n),
+        "fax": _vazio(n),
+        "email": _com_nulos(rng, email, 0.4),
+        "situacao_especial": _vazio(n),
+        "data_situacao_especial": _vazio(n),
+        "cnae_fiscal_secundario": texto_secundarios
+    }).select(ESTABELECIMENTOS_SCHEMA)
+
+
+def bloco_socios(rng, codigos, indices, quantidades, total_empresas, perfil):
+    empresa = np.repeat(indices, quantidades)
+    n = len(empresa)
+    sorteio = rng.random(n)
+    pessoa_juridica = sorteio < perfil.fracao_socios_pj
+    estrangeiro = ~pessoa_juridica & (sorteio < perfil.fracao_socios_pj + perfil.fracao_socios_estrangeiros)
+
+    # Sócios PJ são, em sua maioria, holdings sorteadas por Zipf: formam grupos e cadeias de controle
+    holdings = max(1, int(total_empresas * perfil.fracao_holdings))
+    controladora = np.where(rng.random(n) < 0.8,
+                            np.minimum(rng.zipf(1.5, n), holdings) - 1,
+                            rng.integers(0, total_empresas, n))
+    controladora = np.where(controladora == empresa, (controladora + 1) % total_empresas, controladora)
+    basico_pj = cnpj_basico_numerico(controladora)
+    documento_pj = pc.binary_join_element_wise(_texto_numero(basico_pj, 8), "0001",
+                                               _texto_numero(digitos_verificadores(basico_pj, np.ones(n)), 2), "")
+    documento_pf = pc.binary_join_element_wise("***", _numero(rng, n, 6), "**", "")
+
+    nome_pf = _nome_pessoa(rng.integers(0, 2 ** 62, n), 21)
+    identificador = np.where(pessoa_juridica, "1", np.where(estrangeiro, "3", "2"))
+    return pa.table({
+        "cnpj_basico": cnpj_basico(empresa),
+        "identificador_socio": pa.array(identificador),
+        "nome_socio": pc.if_else(pa.array(pessoa_juridica), razao_social(controladora, perfil.fracao_mei), nome_pf),
+        "cnpj_cpf_socio": pc.if_else(pa.array(pessoa_juridica), documento_pj,
+                                     pc.if_else(pa.array(estrangeiro), _vazio(n), documento_pf)),
+        "qualificacao_socio": pc.if_else(pa.array(pessoa_juridica), pa.scalar("22"),
+                                         _escolha(rng, codigos.qualificacoes, n, codigos.pesos_qualificacao)),
+        "data_entrada_sociedade": _texto_data(_data(rng, n, "1990-01-01")),
+        "pais": pc.if_else(pa.array(estrangeiro), _escolha(rng, codigos.paises, n), _vazio(n)),
+        "representante_legal": pa.array(np.full(n, "***000000**")),
+        "nome_do_representante": _vazio(n),
+        "qualificacao_representante": pa.array(np.full(n, "00")),
+        "faixa_etaria": pa.array(np.where(pessoa_juridica, "0", rng.integers(1, 10, n).astype(str)))
+    }).select(SOCIOS_SCHEMA)
+
+
+def _csv_receita(tabela, rng=None, fracao_malformadas=0.0):
+    """Serializa como na Receita: ';', campos entre aspas, vazios sem aspas, latin1
+
+    Uma fração das linhas ganha um campo a mais; retorna (bytes, linhas malformadas).
+    """
+    buffer = io.BytesIO()
+    pa_csv.write_csv(tabela, buffer, pa_csv.WriteOptions(
+        include_header=False, delimiter=";", quoting_style="all_valid"))
+    dados = buffer.getvalue()
+
+    malformadas = 0
+    if rng is not None and fracao_malformadas > 0 and tabela.num_rows:
+        malformadas = int(rng.binomial(tabela.num_rows, fracao_malformadas))
+        if malformadas:
+            linhas = dados.split(b"\n")
+            for i in rng.choice(tabela.num_rows, malformadas, replace=False):
+                linhas[i] += b';"CAMPO EXCEDENTE"'
+            dados = b"\n".join(linhas)
+    return dados.decode("utf-8").encode("latin-1", errors="replace"), malformadas
+
+
+def _nome_membro(parte, release, sufixo):
+    return f"K3241.K03200Y{parte}.D{release.replace('_', '')}{sufixo}"
+
+
+def gerar_release(diretorio, linhas, release="2025_01", partes=2, semente=0,
+                  diretorio_auxiliar=DIRETORIO_AUXILIAR, perfil=None):
+    """Gera as três entidades para cerca de `linhas` estabelecimentos; retorna {entidade: linhas válidas}
+
+    As empresas são divididas em `partes` faixas; cada faixa grava os três zips
+    de mesmo índice em um único passe, bloco a bloco, com memória constante.
+    """
+    perfil = perfil or PerfilSintetico()
+    codigos = Codigos(diretorio_auxiliar, perfil, semente)
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    total_empresas = max(1, int(round(linhas / media_estabelecimentos(perfil))))
+    fim_release = f"{release[:4]}-{release[5:7]}-01"
+    contagens = dict.fromkeys(ENTRADAS, 0)
+    malformadas = dict.fromkeys(ENTRADAS, 0)
+    inicio_geracao = time.perf_counter()
+
+    limites = np.linspace(0, total_empresas, partes + 1).astype(np.int64)
+    for parte, (inicio_parte, fim_parte) in enumerate(zip(limites, limites[1:])):
+        rng = np.random.default_rng([semente, parte])
+        arquivos, membros = {}, {}
+        try:
+            for entidade, (_, prefixo, sufixo) in ENTRADAS.items():
+                arquivos[entidade] = zipfile.ZipFile(diretorio / f"{prefixo}{parte}_{release}.zip", "w",
+                                                     zipfile.ZIP_DEFLATED, compresslevel=1)
+                membros[entidade] = arquivos[entidade].open(_nome_membro(parte, release, sufixo), "w",
+                                                            force_zip64=True)
+
+            # Blocos de empresas pequenos o bastante para que filiais e sócios caibam em memória
+            passo = max(1, int(LINHAS_POR_BLOCO / media_estabelecimentos(perfil)))
+            for inicio in range(int(inicio_parte), int(fim_parte), passo):
+                indices = np.arange(inicio, min(inicio + passo, int(fim_parte)), dtype=np.int64)
+                tabelas = {
+                    "empresas": bloco_empresas(rng, codigos, indices, perfil),
+                    "estabelecimentos": bloco_estabelecimentos(
+                        rng, codigos, indices, estabelecimentos_por_empresa(rng, len(indices), perfil),
+                        perfil, fim_release),
+                    "socios": bloco_socios(rng, codigos, indices, socios_por_empresa(rng, len(indices), perfil),
+                                           total_empresas, perfil)
+                }
+                for entidade, tabela in tabelas.items():
+                    dados, ruins = _csv_receita(tabela, rng, perfil.fracao_malformadas)
+                    membros[entidade].write(dados)
+                    contagens[entidade] += tabela.num_rows - ruins
+                    malformadas[entidade] += ruins
+        finally:
+            for entidade in membros:
+                membros[entidade].close()
+            for entidade in arquivos:
+                arquivos[entidade].close()
+
+    for entidade, quantidade in contagens.items():
+        print(f"🧪 {entidade}: {quantidade:,} linhas sintéticas (+{malformadas[entidade]:,} malformadas)")
+    print(f"⏱️  Release sintético {release} gerado em {time.perf_counter() - inicio_geracao:.1f}s")
+    return contagens
@@ -0,0 +1,196 @@
+"""
+Testes da retomada de download (src/services/downloader.py) contra um servidor HTTP local
+
+O servidor imita a Receita com suporte a Range, If-Range (ETag) e 416, e pode
+ser configurado para ignorar o Range ou responder com um Content-Range errado.
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.services.downloader import baixar_arquivo, criar_sessao
+
+CONTEUDO = bytes(range(256)) * 400  # 100 KB
+ETAG = '"v1"'
+
+
+class EstadoServidor:
+    def __init__(self):
+        self.conteudo = CONTEUDO
+        self.etag = ETAG
+        self.ignorar_range = False
+        self.deslocamento = 0  # somado ao início do Content-Range (resposta errada)
+        self.requisicoes = []
+
+
+@pytest.fixture
+def servidor():
+    estado = EstadoServidor()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            estado.requisicoes.append(dict(self.headers))
+            if not self.path.endswith("/Empresas0.zip"):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            dados, faixa = estado.conteudo, self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            if faixa and not estado.ignorar_range and if_range in (None, estado.etag):
+                inicio = int(faixa.removeprefix("bytes=").rstrip("-"))
+                if inicio >= len(dados):
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(dados)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                inicio += estado.deslocamento
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {inicio}-{len(dados) - 1}/{len(dados)}")
+                corpo = dados[inicio:]
+            else:
+                self.send_response(200)
+                corpo = dados
+            self.send_header("ETag", estado.etag)
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            pass
+
+    http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=http.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True).start()
+    estado.url = f"http://127.0.0.1:{http.server_address[1]}/2024-01/Empresas0.zip"
+    yield estado
+    http.shutdown()
+    http.server_close()
+
+
+@pytest.fixture
+def sessao():
+    with criar_sessao(conexoes=1) as sessao:
+        yield sessao
+
+
+def _parcial(destino, dados, etag=ETAG):
+    """Cria o .part (e o validador, se etag) como uma execução interrompida deixaria"""
+    parcial = destino.with_name(destino.name + ".part")
+    parcial.write_bytes(dados)
+    if etag is not None:
+        with open(parcial.with_name(parcial.name + ".json"), "w", encoding="utf-8") as f:
+            json.dump({"etag": etag, "last_modified": None}, f)
+    return parcial
+
+
+def _sem_restos(destino):
+    return not list(destino.parent.glob(destino.name + ".part*"))
+
+
+def test_download_completo(servidor, sessao, tmp_path):
+    destino = tmp_path / "Empresas0.zip"
+    resultado = baixar_arquivo(sessao, servidor.url, destino)
+
+    assert resultado.status == "baixado"
+    assert resultado.bytes == len(CONTEUDO) and resultado.retomado_de == 0
+    assert destino.read_bytes() == CONTEUDO
+    assert _sem_restos(destino)
+
+
+def test_retoma_com_range_e_if_range(servidor, sessao, tmp_path):
+    destino = tmp_path / "Empresas0.zip"
+    _parcial(destino, CONTEUDO[:30000])
+
+    resultado = baixar_arquivo(sessao, servidor.url, destino)
+
+    assert resultado.status == "baixado"
+    assert resultado.retomado_de == 30000 and resultado.bytes == len(CONTEUDO) - 30000
+    assert destino.read_bytes() == CONTEUDO
+    assert servidor.requisicoes[0]["Range"] == "bytes=30000-"
+    assert servidor.requisicoes[0]["If-Range"] == ETAG
+    assert _sem_restos(destino)
+
+
+def test_arquivo_mudou_no_servidor_recomeca(servidor, sessao, tmp_path):
+    destino = tmp_path / "Empresas0.zip"
+    _parcial(destino, b"x" * 30000, etag='"antigo"')
+
+    resultado = baixar_arquivo(sessao, servidor.url, destino)
+
+    assert resultado.status == "baixado" and resultado.retomado_de == 0
+    assert destino.read_bytes() == CONTEUDO
+
+
+def test_416_com_part_completo_promove(servidor, sessao, tmp_path):
+    destino = tmp_path / "Empresas0.zip"
+    _parcial(destino, CONTEUDO)
+
+    resultado = baixar_arquivo(sessao, servidor.url, destino)
+
+    assert resultado.status == "baixado" and resultado.bytes == 0
+    assert destino.read_bytes() == CONTEUDO
+    assert len(servidor.requisicoes) == 1
+    assert _sem_restos(destino)
+
+
+def test_416_com_part_maior_recomeca(servidor, sessao, tmp_path):
+    destino = tmp_path / "Empresas0.zip"
+    _parcial(destino, CONTEUDO + b"lixo")
+
+    resultado = baixar_arquivo(sessao, servidor.url, destino)
+
+    assert resultado.status == "baixado" and resultado.retomado_de == 0
+    assert destino.read_bytes() == CONTEUDO
+    assert "Range" not in servidor.requisicoes[-1]
+
+
+def test_servidor_ignora_range_recomeca_com_200(servidor, sessao, tmp_path):
+    servidor.ignorar_range = True
+    destino = tmp_path / "Empresas0.zip"
+    _parcial(destino, CONTEUDO[:30000])
+
+    resultado = baixar_arquivo(sessao, servidor.url, destino)
+
+    assert resultado.status == "baixado" and resultado.retomado_de == 0
+    assert resultado.bytes == len(CONTEUDO)
+    assert destino.read_bytes() == CONTEUDO
+
+
+def test_content_range_inesperado_descarta_part(servidor, sessao, tmp_path):
+    servidor.deslocamento = 1000
+    destino = tmp_path / "Empresas0.zip"
+    _parcial(destino, CONTEUDO[:30000])
+
+    resultado = baixar_arquivo(sessao, servidor.url, destino)
+
+    # A segunda tentativa vai sem Range e recebe o arquivo inteiro
+    assert resultado.status == "baixado" and resultado.retomado_de == 0
+    assert destino.read_bytes() == CONTEUDO
+    assert len(servidor.requisicoes) == 2 and "Range" not in servidor.requisicoes[1]
+
+
+def test_part_sem_validador_nao_e_retomado(servidor, sessao, tmp_path):
+    destino = tmp_path / "Empresas0.zip"
+    _parcial(destino, b"x" * 30000, etag=None)
+
+    resultado = baixar_arquivo(sessao, servidor.url, destino)
+
+    assert resultado.status == "baixado" and resultado.retomado_de == 0
+    assert "Range" not in servidor.requisicoes[0]
+    assert destino.read_bytes() == CONTEUDO
+
+
+def test_inexistente(servidor, sessao, tmp_path):
+    url = servidor.url.replace("Empresas0.zip", "Empresas9.zip")
+    resultado = baixar_arquivo(sessao, url, tmp_path / "Empresas9.zip")
+
+    assert resultado.status == "nao_encontrado"
+    assert not resultado.ok
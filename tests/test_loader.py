@@ -0,0 +1,248 @@
+"""
+Testes da carga em massa no MySQL (src/database/loader.py)
+
+Os lotes, o SQL gerado e o CSV do LOAD DATA LOCAL INFILE são conferidos com
+uma conexão falsa que registra os comandos (e lê o CSV antes de ele ser
+apagado). O teste de integração usa o servidor de config/config_db.py e é
+pulado quando ele não está disponível.
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from mysql.connector.errors import InternalError
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.database import loader
+
+COLUNAS = ["id", "nome", "uf"]
+TIPOS = {"id": "codigo(4)", "nome": "texto(40)", "uf": "categoria(2)"}
+NOMES = ["PADARIA", 'ACME "SA", LTDA', None, "JOSÉ", "A;B", "", "X", "Y", "Z", "W"]
+UFS = ["SP", "RJ", "SP", "MG", "SP", None, "BA", "SP", "RJ", "SP"]
+
+
+class CursorFalso:
+    """Cursor sem buffer, como os do pool de carga: linhas não lidas impedem novo execute ou close"""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self._resultado = None
+
+    def _conferir_lido(self):
+        # Como no mysql.connector, o resultado só é dado por lido quando o fim dele é alcançado
+        if self._resultado is not None:
+            raise InternalError("Unread result found")
+
+    def execute(self, sql, params=None):
+        self._conferir_lido()
+        sql = " ".join(sql.split())
+        comando = {"sql": sql, "params": params}
+        if sql.startswith("LOAD DATA"):
+            comando["csv"] = Path(params[0]).read_text(encoding="utf-8")
+        with self.conexao.lock:
+            self.conexao.comandos.append(comando)
+        if "@@GLOBAL.local_infile" in sql:
+            self._resultado = [(self.conexao.local_infile,)]
+        elif "information_schema.statistics" in sql:
+            self._resultado = [(indice,) for indice in self.conexao.indices]
+
+    def fetchone(self):
+        if not self._resultado:
+            self._resultado = None
+            return None
+        return self._resultado.pop(0)
+
+    def fetchall(self):
+        linhas, self._resultado = self._resultado or [], None
+        return linhas
+
+    def close(self):
+        self._conferir_lido()
+
+
+class ConexaoFalsa:
+    """Conexão DB-API mínima que só registra os comandos recebidos"""
+
+    def __init__(self, local_infile=1, indices=()):
+        self.local_infile = local_infile
+        self.indices = indices
+        self.comandos = []
+        self.commits = 0
+        self.lock = threading.Lock()
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        with self.lock:
+            self.commits += 1
+
+    def sql(self, prefixo):
+        return [comando for comando in self.comandos if comando["sql"].startswith(prefixo)]
+
+
+class PoolFalso:
+    def __init__(self, conexao):
+        self._conexao = conexao
+
+    @contextmanager
+    def conexao(self):
+        yield self._conexao
+
+
+@pytest.fixture
+def entidade(monkeypatch):
+    """Entidade de teste registrada em TABELAS_MYSQL (chave id, índice em uf e nome)"""
+    monkeypatch.setitem(loader.TABELAS_MYSQL, "teste", ("teste_carga", COLUNAS, TIPOS, "id", ["uf", "nome"]))
+    return "teste"
+
+
+@pytest.fixture
+def parquet(tmp_path):
+    """10 linhas em 4 row groups, com uf como dicionário, aspas, vírgula e nulos"""
+    tabela = pa.table({
+        "id": [f"{i:04d}" for i in range(10)],
+        "nome": pa.array(NOMES, pa.string()),
+        "uf": pa.array(UFS, pa.string()).dictionary_encode()
+    })
+    caminho = tmp_path / "teste.parquet"
+    pq.write_table(tabela, caminho, row_group_size=3)
+    return caminho
+
+
+def _lote(parquet):
+    return pq.read_table(parquet).combine_chunks().to_batches()[0]
+
+
+def _ids_inseridos(conexao):
+    """ids enviados nos INSERTs, na ordem (o id é o primeiro de cada trio de parâmetros)"""
+    return [valor for comando in conexao.sql("INSERT") for valor in comando["params"][::len(COLUNAS)]]
+
+
+def _ids_infile(conexao):
+    return [linha.split(",")[0].strip('"') for comando in conexao.sql("LOAD DATA")
+            for linha in comando["csv"].splitlines()]
+
+
+def test_insert_em_blocos_de_linhas(parquet):
+    conexao = ConexaoFalsa()
+    loader._carregar_lote_insert(conexao.cursor(), "t", COLUNAS, _lote(parquet), linhas_por_insert=4)
+
+    inserts = conexao.sql("INSERT")
+    assert [len(comando["params"]) // len(COLUNAS) for comando in inserts] == [4, 4, 2]
+    assert inserts[0]["sql"] == ("INSERT INTO t (id, nome, uf) VALUES "
+                                 "(%s, %s, %s), (%s, %s, %s), (%s, %s, %s), (%s, %s, %s)")
+    assert inserts[0]["params"][:6] == ["0000", "PADARIA", "SP", "0001", 'ACME "SA", LTDA', "RJ"]
+    # Nulos seguem como None (NULL no driver)
+    assert inserts[0]["params"][6:9] == ["0002", None, "SP"]
+
+
+def test_infile_csv_e_sql(parquet, tmp_path):
+    conexao = ConexaoFalsa()
+    loader._carregar_lote_infile(conexao.cursor(), "t", COLUNAS, _lote(parquet), tmp_path)
+
+    (comando,) = conexao.sql("LOAD DATA")
+    assert comando["sql"].startswith("LOAD DATA LOCAL INFILE %s INTO TABLE t CHARACTER SET utf8mb4")
+    assert "FIELDS TERMINATED BY ',' ENCLOSED BY '\"' ESCAPED BY ''" in comando["sql"]
+    assert comando["sql"].endswith("(id, nome, uf)")
+    linhas = comando["csv"].splitlines()
+    assert len(linhas) == 10
+    # Tudo entre aspas, aspas internas duplicadas, NULL sem aspas, dicionário como texto
+    assert linhas[0] == '"0000","PADARIA","SP"'
+    assert linhas[1] == '"0001","ACME ""SA"", LTDA","RJ"'
+    assert linhas[2] == '"0002",NULL,"SP"'
+    assert linhas[5] == '"0005","",NULL'
+    # O CSV temporário é apagado depois do envio
+    assert not Path(comando["params"][0]).exists()
+
+
+def test_row_groups_em_lotes(parquet):
+    conexao = ConexaoFalsa()
+    total = loader._carregar_row_groups(PoolFalso(conexao), parquet, "t", COLUNAS, [0, 2], "insert", lote=2)
+
+    assert total == 6
+    assert _ids_inseridos(conexao) == ["0000", "0001", "0002", "0006", "0007", "0008"]
+    # Um commit por lote lido do Parquet
+    assert conexao.commits == len(conexao.sql("INSERT"))
+
+
+def test_carregar_entidade_com_infile(monkeypatch, entidade, parquet):
+    conexao = ConexaoFalsa(local_infile=1)
+    monkeypatch.setattr(loader, "pool_carga", lambda conexoes: PoolFalso(conexao))
+
+    assert loader.carregar_entidade(entidade, conexoes=3, lote=2, parquet_file=parquet) == 10
+
+    comandos = [comando["sql"] for comando in conexao.comandos]
+    assert comandos[:3] == ["SELECT @@GLOBAL.local_infile", "DROP TABLE IF EXISTS teste_carga",
+                            comandos[2]]
+    assert comandos[2].startswith("CREATE TABLE") and "teste_carga" in comandos[2]
+    assert not conexao.sql("INSERT")
+    # Cada linha vai exatamente uma vez, qualquer que seja a conexão
+    assert sorted(_ids_infile(conexao)) == [f"{i:04d}" for i in range(10)]
+    # Índices secundários só depois da carga, em um único ALTER TABLE
+    assert comandos[-1] == "ALTER TABLE teste_carga ADD INDEX idx_uf (uf), ADD INDEX idx_nome (nome)"
+
+
+def test_carregar_entidade_sem_local_infile_usa_insert(monkeypatch, entidade, parquet):
+    conexao = ConexaoFalsa(local_infile=0)
+    monkeypatch.setattr(loader, "pool_carga", lambda conexoes: PoolFalso(conexao))
+
+    assert loader.carregar_entidade(entidade, conexoes=2, parquet_file=parquet) == 10
+
+    assert not conexao.sql("LOAD DATA")
+    assert sorted(_ids_inseridos(conexao)) == [f"{i:04d}" for i in range(10)]
+
+
+def test_criar_indices_so_os_inexistentes(entidade):
+    conexao = ConexaoFalsa(indices=("PRIMARY", "idx_uf"))
+
+    assert loader.criar_indices(conexao, entidade) == 1
+    assert conexao.comandos[-1]["sql"] == "ALTER TABLE teste_carga ADD INDEX idx_nome (nome)"
+
+    conexao = ConexaoFalsa(indices=("PRIMARY", "idx_uf", "idx_nome"))
+    assert loader.criar_indices(conexao, entidade) == 0
+    assert not conexao.sql("ALTER")
+
+
+@pytest.fixture
+def mysql():
+    """Conexão ao MySQL/MariaDB de config/config_db.py; pula o teste se não houver servidor"""
+    import mysql.connector
+    from config.config_db import DB_CONFIG
+
+    try:
+        connection = mysql.connector.connect(**dict(DB_CONFIG, connection_timeout=3))
+    except mysql.connector.Error as e:
+        pytest.skip(f"MySQL indisponível: {e}")
+    yield connection
+    cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS teste_carga")
+    cursor.close()
+    connection.close()
+
+
+def test_suporta_local_infile_le_o_resultado_inteiro():
+    for valor in (0, 1):
+        assert loader.suporta_local_infile(ConexaoFalsa(local_infile=valor)) is bool(valor)
+
+
+@pytest.mark.parametrize("modo", ["infile", "insert", None])
+def test_carga_no_servidor(mysql, entidade, parquet, modo):
+    # modo=None detecta o local_infile pelo pool de carga (sem buffer), como scripts/insert_to_database.py
+    if modo == "infile" and not loader.suporta_local_infile(mysql):
+        pytest.skip("Servidor sem local_infile")
+
+    assert loader.carregar_entidade(entidade, conexoes=2, modo=modo, parquet_file=parquet) == 10
+
+    cursor = mysql.cursor()
+    cursor.execute("SELECT id, nome, uf FROM teste_carga ORDER BY id")
+    linhas = cursor.fetchall()
+    cursor.close()
+    assert [linha[0] for linha in linhas] == [f"{i:04d}" for i in range(10)]
+    assert [linha[1] for linha in linhas] == NOMES
+    assert [linha[2] for linha in linhas] == UFS